@@ -1,35 +1,473 @@
+"""Reproducible benchmarks for syslogcef.
+
+Generates a synthetic corpus per source type (or reads a log file), times the
+pipeline stages separately and end to end in single, thread and process mode,
+and prints the results as JSON::
+
+    python scripts/bench.py --events 20000 --output bench.json
+    python scripts/bench.py tests/data/cisco-ios.log --source cisco --lines 10000
+    python scripts/bench.py --compare bench.json   # exit 1 on a >10% throughput drop
+"""
+
 from __future__ import annotations
 
 import argparse
+import json
+import os
+import platform
+import random
+import re
+import resource
+import sys
+import tempfile
 import time
+from collections.abc import Callable, Iterable, Sequence
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from itertools import islice
 from pathlib import Path
+from typing import Any
+
+from syslogcef._datetime import clear_timestamp_cache, smart_parse, timestamp_cache_info
+from syslogcef._json import get_backend
+from syslogcef.converters import BatchConverter, _parse_line_to_event
+from syslogcef.ingest import read_line_batches
+from syslogcef.mappings import get_mapping
+from syslogcef.parsing import clear_template_cache
+from syslogcef.pipeline import ordered_map
+
+CORPORA = ("rfc5424", "rfc3164", "cisco", "f5", "vmware", "auditd", "json")
+STAGES = ("parse", "timestamp", "map", "encode", "io")
+MODES = ("single", "thread", "process")
+MAPPINGS = {"cisco": "cisco", "f5": "f5", "vmware": "vmware", "auditd": "linux"}
+
+_MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+_WORDS = ("alpha", "bravo", "charlie", "delta", "echo", "foxtrot", "golf", "hotel", "india")
+_TIMESTAMP_RE = re.compile(
+    r"\d{4}-\d{2}-\d{2}T[\d:.]+(?:Z|[+-]\d{2}:\d{2})|[A-Z][a-z]{2} [ \d]\d \d{2}:\d{2}:\d{2}"
+)
+
+
+# -- corpus -----------------------------------------------------------------
+
+
+def _ip(rng: random.Random) -> str:
+    return f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}"
+
+
+def _bsd_time(rng: random.Random) -> str:
+    month = _MONTHS[rng.randrange(12)]
+    return f"{month} {rng.randint(1, 28):2d} {rng.randrange(24):02d}:{rng.randrange(60):02d}:00"
+
+
+def _extra(rng: random.Random, fields: int) -> str:
+    return " ".join(f"k{index}={rng.choice(_WORDS)}" for index in range(fields))
+
+
+def _rfc5424(rng: random.Random, fields: int) -> str:
+    params = " ".join(f'p{index}="{rng.choice(_WORDS)}"' for index in range(fields))
+    stamp = f"2024-05-{rng.randint(1, 28):02d}T{rng.randrange(24):02d}:{rng.randrange(60):02d}"
+    return (
+        f"<{rng.randrange(192)}>1 {stamp}:00.123Z host{rng.randrange(50)} app "
+        f"{rng.randrange(1, 65535)} ID47 [meta@32473 {params}] user login {rng.choice(_WORDS)}"
+    )
+
+
+def _rfc3164(rng: random.Random, fields: int) -> str:
+    return (
+        f"<{rng.randrange(192)}>{_bsd_time(rng)} host{rng.randrange(50)} "
+        f"sshd[{rng.randrange(1, 65535)}]: Accepted publickey for user {_extra(rng, fields)}"
+    )
+
+
+def _cisco(rng: random.Random, fields: int) -> str:
+    action = rng.choice(("Deny", "Built", "Teardown", "permitted"))
+    return (
+        f"<{rng.randrange(160, 192)}>{_bsd_time(rng)} fw{rng.randrange(4)} "
+        f"{rng.randrange(10**6)}: %ASA-6-302013: {action} tcp src={_ip(rng)} dst={_ip(rng)} "
+        f"spt={rng.randrange(1024, 65535)} dpt=443 proto=tcp action={action.lower()} "
+        + _extra(rng, fields)
+    )
+
+
+def _f5(rng: random.Random, fields: int) -> str:
+    return (
+        f"<{rng.randrange(192)}>{_bsd_time(rng)} lb{rng.randrange(4)} tmm[{rng.randrange(99)}]: "
+        f"01070417:5: client_ip={_ip(rng)} client_port={rng.randrange(1024, 65535)} "
+        f"server_ip={_ip(rng)} server_port=443 vip=/Common/web {_extra(rng, fields)}"
+    )
+
+
+def _vmware(rng: random.Random, fields: int) -> str:
+    return (
+        f"<{rng.randrange(192)}>{_bsd_time(rng)} esx{rng.randrange(8)} vpxd: "
+        f"event_id={rng.randrange(1000)} event=VmPoweredOn user=root vm=vm{rng.randrange(99)} "
+        f"ip={_ip(rng)} {_extra(rng, fields)}"
+    )
+
+
+def _auditd(rng: random.Random, fields: int) -> str:
+    return (
+        f"type=SYSCALL msg=audit({1675984375 + rng.randrange(10**5)}.701:{rng.randrange(10**6)}): "
+        f"arch=c000003e syscall=59 success=yes exit=0 pid={rng.randrange(1, 65535)} uid=0 "
+        f'auid=1000 exe="/usr/bin/bash" {_extra(rng, fields)}'
+    )
+
+
+def _json(rng: random.Random, fields: int) -> str:
+    document: dict[str, Any] = {
+        "@timestamp": f"2024-05-{rng.randint(1, 28):02d}T12:{rng.randrange(60):02d}:00Z",
+        "host": f"host{rng.randrange(50)}",
+        "app": "nginx",
+        "message": f"GET /{rng.choice(_WORDS)} 200",
+        "src": _ip(rng),
+    }
+    document.update((f"k{index}", rng.choice(_WORDS)) for index in range(fields))
+    return json.dumps(document)
+
+
+GENERATORS: dict[str, Callable[[random.Random, int], str]] = {
+    "rfc5424": _rfc5424,
+    "rfc3164": _rfc3164,
+    "cisco": _cisco,
+    "f5": _f5,
+    "vmware": _vmware,
+    "auditd": _auditd,
+    "json": _json,
+}
+
+
+def generate(corpus: str, events: int, fields: int, seed: int) -> list[str]:
+    rng = random.Random(f"{seed}:{corpus}")
+    generator = GENERATORS[corpus]
+    return [generator(rng, fields) for _ in range(events)]
+
+
+# -- measurement ------------------------------------------------------------
 
-from syslogcef.converters import convert_line
 
+def _peak_rss_kb() -> dict[str, int]:
+    # ru_maxrss is a high-water mark over the whole run so far, not this row's usage
+    scale = 1024 if sys.platform == "darwin" else 1  # macOS reports bytes
+    return {
+        "process_peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // scale,
+        "children_peak_rss_kb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss // scale,
+    }
 
-def parse_args() -> argparse.Namespace:
+
+def _percentile(samples: Sequence[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+def _result(
+    corpus: str,
+    mapping: str,
+    kind: str,
+    name: str,
+    events: int,
+    seconds: float,
+    latencies_ns: Sequence[float],
+    *,
+    latency: str = "event",
+    **extra: Any,
+) -> dict[str, Any]:
+    # ``latency`` says what one sample is: one event, or one whole batch
+    return {
+        "corpus": corpus,
+        "mapping": mapping,
+        kind: name,
+        "events": events,
+        "seconds": round(seconds, 6),
+        "lines_per_s": round(events / seconds) if seconds else 0,
+        "p50_us": round(_percentile(latencies_ns, 0.50) / 1000, 3),
+        "p99_us": round(_percentile(latencies_ns, 0.99) / 1000, 3),
+        "latency": latency,
+        **extra,
+        **_peak_rss_kb(),
+    }
+
+
+def _timed(items: Iterable[Any], call: Callable[[Any], Any]) -> tuple[float, list[int]]:
+    clock = time.perf_counter_ns
+    latencies: list[int] = []
+    append = latencies.append
+    start = clock()
+    for item in items:
+        before = clock()
+        call(item)
+        append(clock() - before)
+    return (clock() - start) / 1e9, latencies
+
+
+def bench_stages(
+    corpus: str, lines: list[str], mapping_name: str, stages: Sequence[str]
+) -> list[dict[str, Any]]:
+    converter = BatchConverter(mapping_name)
+    mapping, encoder, wanted = converter.mapping, converter.encoder, converter.required_fields
+    results = []
+
+    def parse(line: str) -> Any:
+        event = _parse_line_to_event(line, default_tz=None, fields=wanted)
+        event.fields  # noqa: B018 - materialise lazily parsed fields
+        return event
+
+    if "parse" in stages:
+        # start cold: the timestamp and key/value template caches learn from these lines
+        clear_timestamp_cache()
+        clear_template_cache()
+        seconds, latencies = _timed(lines, parse)
+        results.append(
+            _result(corpus, mapping_name, "stage", "parse", len(lines), seconds, latencies)
+        )
+    events = [parse(line) for line in lines]
+    stamps = [match.group() for line in lines if (match := _TIMESTAMP_RE.search(line))]
+    if "timestamp" in stages and stamps:  # auditd carries epoch stamps only
+        clear_timestamp_cache()
+        seconds, latencies = _timed(stamps, smart_parse)
+        info = timestamp_cache_info()
+        results.append(
+            _result(
+                corpus,
+                mapping_name,
+                "stage",
+                "timestamp",
+                len(stamps),
+                seconds,
+                latencies,
+                cache_hits=info.hits,
+                cache_misses=info.misses,
+            )
+        )
+    if "map" in stages:
+        seconds, latencies = _timed(events, mapping.map)
+        results.append(
+            _result(corpus, mapping_name, "stage", "map", len(events), seconds, latencies)
+        )
+    if "encode" in stages:
+        pairs = [(event, mapping.map(event)) for event in events]
+        seconds, latencies = _timed(pairs, lambda pair: encoder.encode(*pair))
+        results.append(
+            _result(corpus, mapping_name, "stage", "encode", len(pairs), seconds, latencies)
+        )
+    if "io" in stages:
+        results.append(_bench_io(corpus, mapping_name, lines, converter))
+    return results
+
+
+def _bench_io(
+    corpus: str, mapping_name: str, lines: list[str], converter: BatchConverter
+) -> dict[str, Any]:
+    # Block reads and writes only: every line maps to a pre-built record.
+    record = converter.convert(lines[:1]).records[0] + "\n"
+    with tempfile.TemporaryDirectory() as directory:
+        source = Path(directory) / "input.log"
+        source.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        clock = time.perf_counter_ns
+        latencies: list[float] = []
+        start = clock()
+        with source.open("rb") as handle, open(Path(directory) / "output.cef", "wb") as output:
+            for batch in read_line_batches(handle, 1000):
+                before = clock()
+                output.write((record * len(batch)).encode())
+                latencies.append(clock() - before)
+        seconds = (clock() - start) / 1e9
+    return _result(
+        corpus, mapping_name, "stage", "io", len(lines), seconds, latencies, latency="batch"
+    )
+
+
+# Worker state for process mode, built once per process.
+_worker: BatchConverter | None = None
+
+
+def _init_worker(mapping_name: str) -> None:
+    global _worker
+    _worker = BatchConverter(mapping_name)
+
+
+def _convert_with(converter: BatchConverter, batch: list[str]) -> tuple[int, int]:
+    start = time.perf_counter_ns()
+    records = converter.convert(batch).records
+    return len(records), time.perf_counter_ns() - start
+
+
+def _convert_in_worker(batch: list[str]) -> tuple[int, int]:
+    assert _worker is not None
+    return _convert_with(_worker, batch)
+
+
+def bench_modes(
+    corpus: str,
+    lines: list[str],
+    mapping_name: str,
+    modes: Sequence[str],
+    *,
+    workers: int,
+    batch_size: int,
+) -> list[dict[str, Any]]:
+    batches = [lines[start : start + batch_size] for start in range(0, len(lines), batch_size)]
+    results = []
+    for mode in modes:
+        executor: Executor | None = None
+        convert: Callable[[list[str]], tuple[int, int]]
+        if mode == "thread":
+            executor = ThreadPoolExecutor(max_workers=workers)
+            convert = partial(_convert_with, BatchConverter(mapping_name))
+        elif mode == "process":
+            executor = ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_worker, initargs=(mapping_name,)
+            )
+            convert = _convert_in_worker
+        else:
+            _init_worker(mapping_name)
+            convert = _convert_in_worker
+        latencies: list[float] = []
+        start = time.perf_counter()
+        if executor is None:
+            outcomes: Iterable[tuple[int, int]] = map(convert, batches)
+        else:
+            pairs = ordered_map(executor, convert, batches, max_in_flight=workers * 4)
+            outcomes = (outcome for _, outcome in pairs)
+        count = 0
+        for converted, elapsed_ns in outcomes:
+            count += converted
+            latencies.append(elapsed_ns)
+        seconds = time.perf_counter() - start
+        if executor is not None:
+            executor.shutdown()
+        results.append(
+            _result(
+                corpus,
+                mapping_name,
+                "mode",
+                mode,
+                count,
+                seconds,
+                latencies,
+                latency="batch",
+                workers=1 if executor is None else workers,
+                batch_size=batch_size,
+            )
+        )
+    return results
+
+
+# -- driver -----------------------------------------------------------------
+
+
+def compare(results: dict[str, Any], baseline_path: str, threshold: float) -> list[str]:
+    """Return a description of every throughput drop larger than ``threshold``."""
+
+    baseline = json.loads(Path(baseline_path).read_text(encoding="utf-8"))
+
+    def key(row: dict[str, Any]) -> tuple[str, str, str]:
+        return row["corpus"], row.get("stage", ""), row.get("mode", "")
+
+    previous = {key(row): row for row in baseline["results"]}
+    regressions = []
+    for row in results["results"]:
+        before = previous.get(key(row))
+        if not before or not before["lines_per_s"]:
+            continue
+        change = row["lines_per_s"] / before["lines_per_s"] - 1
+        if change < -threshold:
+            label = "/".join(part for part in key(row) if part)
+            regressions.append(
+                f"{label}: {before['lines_per_s']} -> {row['lines_per_s']} lines/s ({change:+.1%})"
+            )
+    return regressions
+
+
+def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Benchmark syslogcef conversion speed")
-    parser.add_argument("path", help="Path to log file")
-    parser.add_argument("--lines", type=int, default=10000, help="Number of lines to read")
-    parser.add_argument("--source", default="default", help="Mapping source to use")
-    return parser.parse_args()
-
-
-def main() -> None:
-    args = parse_args()
-    path = Path(args.path)
-    count = 0
-    start = time.perf_counter()
-    with path.open("r", encoding="utf-8", errors="replace") as handle:
-        for line in handle:
-            convert_line(line, source=args.source)
-            count += 1
-            if count >= args.lines:
-                break
-    elapsed = time.perf_counter() - start
-    rate = count / elapsed if elapsed else 0
-    print(f"processed={count} lines elapsed={elapsed:.3f}s rate={rate:.0f} lines/s")
+    parser.add_argument("path", nargs="?", help="Benchmark a log file instead of synthetic data")
+    parser.add_argument("--lines", type=int, default=10000, help="Lines to read from PATH")
+    parser.add_argument("--source", default="default", help="Mapping used for PATH")
+    parser.add_argument(
+        "--corpus",
+        default=",".join(CORPORA),
+        help=f"Comma separated synthetic corpora ({', '.join(CORPORA)})",
+    )
+    parser.add_argument("--events", type=int, default=10000, help="Events per synthetic corpus")
+    parser.add_argument("--fields", type=int, default=4, help="Extra fields per synthetic event")
+    parser.add_argument("--seed", type=int, default=1, help="Corpus generator seed")
+    parser.add_argument("--stages", default=",".join(STAGES), help="Stages to time, or 'none'")
+    parser.add_argument("--modes", default=",".join(MODES), help="End-to-end modes, or 'none'")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--compare", metavar="BASELINE", help="Fail on regressions vs a report")
+    parser.add_argument(
+        "--threshold", type=float, default=0.10, help="Allowed throughput drop for --compare"
+    )
+    return parser.parse_args(argv)
+
+
+def _choices(value: str, allowed: Sequence[str]) -> list[str]:
+    if value == "none":
+        return []
+    chosen = [item.strip() for item in value.split(",") if item.strip()]
+    unknown = set(chosen) - set(allowed)
+    if unknown:
+        raise SystemExit(f"unknown choice(s): {', '.join(sorted(unknown))}")
+    return chosen
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    args = parse_args(argv)
+    stages = _choices(args.stages, STAGES)
+    modes = _choices(args.modes, MODES)
+    if args.path:
+        with open(args.path, encoding="utf-8", errors="replace") as handle:
+            lines = [line.rstrip("\n") for line in islice(handle, args.lines)]
+        corpora: Iterable[tuple[str, list[str], str]] = [(Path(args.path).name, lines, args.source)]
+    else:
+        # generated one at a time, so the peak RSS of early corpora excludes later ones
+        corpora = (
+            (
+                name,
+                generate(name, args.events, args.fields, args.seed),
+                MAPPINGS.get(name, "default"),
+            )
+            for name in _choices(args.corpus, CORPORA)
+        )
+    report: dict[str, Any] = {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "json_backend": get_backend(),
+        "seed": args.seed,
+        "fields": args.fields,
+        "results": [],
+    }
+    for name, lines, mapping_name in corpora:
+        get_mapping(mapping_name)  # fail early on unknown mappings
+        report["results"] += bench_stages(name, lines, mapping_name, stages)
+        report["results"] += bench_modes(
+            name, lines, mapping_name, modes, workers=args.workers, batch_size=args.batch_size
+        )
+        for row in report["results"]:
+            if row["corpus"] == name:
+                label = row.get("stage") or row.get("mode")
+                sys.stderr.write(
+                    f"{name:>10} {label:>9} {row['lines_per_s']:>10} lines/s "
+                    f"p50={row['p50_us']}us p99={row['p99_us']}us per {row['latency']}\n"
+                )
+        del lines  # let the next corpus replace this one instead of joining it
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+    if args.compare:
+        regressions = compare(report, args.compare, args.threshold)
+        for line in regressions:
+            sys.stderr.write(f"regression {line}\n")
+        return 1 if regressions else 0
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    raise SystemExit(main())
@@ -1,14 +1,29 @@
 """Syslog to ArcSight CEF conversion utilities."""
 
-from .converters import convert_line, from_json, parse_syslog, to_cef
+from ._json import get_backend as get_json_backend
+from ._json import set_backend as set_json_backend
+from .converters import (
+    BatchResult,
+    convert_line,
+    convert_many,
+    convert_stream,
+    from_json,
+    parse_syslog,
+    to_cef,
+)
 from .parsing import ParsedSyslog
 from .utils import ParsedEvent
 
 __all__ = [
+    "BatchResult",
     "ParsedSyslog",
     "ParsedEvent",
     "convert_line",
+    "convert_many",
+    "convert_stream",
     "parse_syslog",
     "from_json",
+    "get_json_backend",
+    "set_json_backend",
     "to_cef",
 ]
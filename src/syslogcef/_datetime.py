@@ -1,13 +1,16 @@
 from __future__ import annotations
 
-from datetime import datetime
-from typing import Any
+import time
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Any, NamedTuple
 
 try:  # pragma: no cover - optional dependency
     from dateutil import parser as date_parser
 except ImportError:  # pragma: no cover - fallback path tested separately
     date_parser = None
 
+__all__ = ["TimestampCacheInfo", "smart_parse", "timestamp_cache_info", "clear_timestamp_cache"]
 
 COMMON_FORMATS = [
     "%b %d %H:%M:%S",
@@ -15,10 +18,178 @@ COMMON_FORMATS = [
     "%Y-%m-%dT%H:%M:%S.%f",
 ]
 
+TIMESTAMP_CACHE_SIZE = 4096
+
+_MONTHS = {
+    name: index
+    for index, name in enumerate(
+        ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"],
+        start=1,
+    )
+}
+_OFFSETS: dict[str, timezone] = {}
+# (year, epoch second at which it ends) for _default_year
+_YEAR = (0, 0.0)
+
+
+class TimestampCacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    currsize: int
+
 
 def smart_parse(text: str) -> datetime | None:
     if not text or text == "-":
         return None
+    if len(text) > 20 and text[19] == "." and text[4] == "-":
+        # Sub-second timestamps rarely repeat, so caching them would only evict
+        # the entries that do; the RFC3339 tier is cheap enough on its own.
+        parsed = _parse_rfc3339(text)
+        if parsed is not None:
+            return parsed
+    # the year is part of the key: BSD stamps carry none and must not keep last year's
+    return _cached_parse(text, _default_year())
+
+
+def timestamp_cache_info() -> TimestampCacheInfo:
+    """Return hit/miss counters of the timestamp cache."""
+
+    info = _cached_parse.cache_info()
+    return TimestampCacheInfo(hits=info.hits, misses=info.misses, currsize=info.currsize)
+
+
+def clear_timestamp_cache() -> None:
+    _cached_parse.cache_clear()
+
+
+def _default_year() -> int:
+    """The year given to timestamps without one (dateutil: this year, strptime: 1900)."""
+
+    global _YEAR
+    if date_parser is None:
+        return 1900
+    year, ends = _YEAR
+    now = time.time()
+    if now >= ends:
+        year = datetime.now().year
+        _YEAR = year, datetime(year + 1, 1, 1).timestamp()
+    return year
+
+
+@lru_cache(maxsize=TIMESTAMP_CACHE_SIZE)
+def _cached_parse(text: str, year: int) -> datetime | None:
+    parsed = _parse_rfc3339(text)
+    if parsed is None:
+        parsed = _parse_bsd(text, year)
+    if parsed is None:
+        parsed = _parse_fallback(text)
+    return parsed
+
+
+def _parse_rfc3339(text: str) -> datetime | None:
+    length = len(text)
+    if (
+        length < 19
+        or text[4] != "-"
+        or text[7] != "-"
+        or text[10] not in "T "
+        or text[13] != ":"
+        or text[16] != ":"
+    ):
+        return None
+    try:
+        return datetime.fromisoformat(text.replace("Z", "+00:00"))
+    except ValueError:
+        pass
+    # fromisoformat on Python 3.10 rejects "+HHMM" offsets; finish by hand.
+    digits = text[0:4] + text[5:7] + text[8:10] + text[11:13] + text[14:16] + text[17:19]
+    if not (digits.isascii() and digits.isdigit()):
+        return None
+    pos = 19
+    microsecond = 0
+    if pos < length and text[pos] == ".":
+        end = pos + 1
+        while end < length and "0" <= text[end] <= "9":
+            end += 1
+        if end == pos + 1:
+            return None
+        microsecond = int(text[pos + 1 : end][:6].ljust(6, "0"))
+        pos = end
+    tz = _parse_offset(text[pos:])
+    if tz is None and pos != length:
+        return None
+    try:
+        return datetime(
+            int(digits[0:4]),
+            int(digits[4:6]),
+            int(digits[6:8]),
+            int(digits[8:10]),
+            int(digits[10:12]),
+            int(digits[12:14]),
+            microsecond,
+            tzinfo=tz,
+        )
+    except ValueError:
+        return None
+
+
+def _parse_offset(text: str) -> timezone | None:
+    if not text:
+        return None
+    if text == "Z":
+        return timezone.utc
+    cached = _OFFSETS.get(text)
+    if cached is not None:
+        return cached
+    if text[0] not in "+-":
+        return None
+    if len(text) == 6 and text[3] == ":":
+        hours, minutes = text[1:3], text[4:6]
+    elif len(text) == 5:
+        hours, minutes = text[1:3], text[3:5]
+    else:
+        return None
+    if not (hours + minutes).isascii() or not (hours + minutes).isdigit():
+        return None
+    if int(hours) > 23 or int(minutes) > 59:
+        return None
+    delta = timedelta(hours=int(hours), minutes=int(minutes))
+    tz = timezone(-delta if text[0] == "-" else delta)
+    _OFFSETS[text] = tz
+    return tz
+
+
+def _parse_bsd(text: str, year: int) -> datetime | None:
+    # "Mmm dd HH:MM:SS" with one or more spaces between month and day.
+    month = _MONTHS.get(text[:3])
+    if month is None or len(text) < 14 or text[3] != " ":
+        return None
+    pos = 4
+    while pos < len(text) and text[pos] == " ":
+        pos += 1
+    day_end = text.find(" ", pos)
+    if day_end == -1 or not 1 <= day_end - pos <= 2:
+        return None
+    clock = text[day_end + 1 :]
+    if len(clock) != 8 or clock[2] != ":" or clock[5] != ":":
+        return None
+    digits = text[pos:day_end] + clock[0:2] + clock[3:5] + clock[6:8]
+    if not (digits.isascii() and digits.isdigit()):
+        return None
+    try:
+        return datetime(
+            year,
+            month,
+            int(text[pos:day_end]),
+            int(clock[0:2]),
+            int(clock[3:5]),
+            int(clock[6:8]),
+        )
+    except ValueError:
+        return None
+
+
+def _parse_fallback(text: str) -> datetime | None:
     if date_parser is not None:
         try:
             parsed: Any = date_parser.parse(text)
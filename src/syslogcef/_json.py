@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import json
+from collections.abc import Callable
+from typing import Any
+
+try:  # pragma: no cover - optional dependency
+    import orjson
+except ImportError:  # pragma: no cover - fallback path tested separately
+    orjson = None  # type: ignore[assignment]
+
+__all__ = ["available_backends", "get_backend", "loads", "set_backend"]
+
+_backend = "json"
+
+
+def _orjson_loads(data: str | bytes) -> Any:
+    try:
+        return orjson.loads(data)
+    except orjson.JSONDecodeError:
+        # NaN/Infinity, integers beyond 64 bits, ...: stay compatible with the
+        # stdlib, which also produces the error message for invalid documents
+        return json.loads(data)
+
+
+loads: Callable[[str | bytes], Any] = json.loads
+
+
+def available_backends() -> list[str]:
+    return ["json", "orjson"] if orjson is not None else ["json"]
+
+
+def get_backend() -> str:
+    return _backend
+
+
+def set_backend(name: str = "auto") -> None:
+    """Select the JSON decoder: ``"orjson"``, ``"json"`` or ``"auto"`` (fastest installed)."""
+
+    global _backend, loads
+    if name == "auto":
+        name = available_backends()[-1]
+    if name not in available_backends():
+        raise ValueError(f"JSON backend {name!r} is not available")
+    _backend = name
+    loads = _orjson_loads if name == "orjson" else json.loads
+
+
+set_backend()
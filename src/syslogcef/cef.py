@@ -1,12 +1,21 @@
 from __future__ import annotations
 
-from collections.abc import Iterable, Mapping
+from collections.abc import Hashable, Iterable, Mapping
 from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+from typing import TYPE_CHECKING, cast
 
-from .utils import sanitize_text
+from .utils import ParsedEvent, sanitize_text
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .mappings.base import Mapping as EventMapping
+    from .mappings.base import MappingResult
 
 __all__ = [
     "CEFHeader",
+    "CEFEncoder",
+    "compile_encoder",
     "escape_cef_header",
     "escape_cef_extension",
     "format_extensions",
@@ -39,8 +48,9 @@ class CEFHeader:
         return "|".join(parts)
 
 
-_HEADER_ESCAPE = str.maketrans({"\\": r"\\\\", "|": r"\|", "=": r"\="})
-_EXTENSION_ESCAPE = str.maketrans({"\\": r"\\\\", "=": r"\="})
+# CEF has no escape for line breaks in the header; in extensions they become \n and \r.
+_HEADER_ESCAPE = str.maketrans({"\\": r"\\\\", "|": r"\|", "=": r"\=", "\n": " ", "\r": " "})
+_EXTENSION_ESCAPE = str.maketrans({"\\": r"\\\\", "=": r"\=", "\n": r"\n", "\r": r"\r"})
 
 
 def escape_cef_header(value: str) -> str:
@@ -60,13 +70,24 @@ def normalize_extension_key(key: str) -> str:
     return "".join(normalized)[:1023]
 
 
+_normalize_key = lru_cache(maxsize=4096)(normalize_extension_key)
+
+
+def _escape_extension_value(text: str) -> str:
+    # Same result as escape_cef_extension() for str input, minus the copies
+    # when nothing needs escaping.
+    if "\\" in text or "=" in text or "\n" in text or "\r" in text or "\u0000" in text:
+        return text.replace("\u0000", "?").translate(_EXTENSION_ESCAPE)
+    return text
+
+
 def format_extensions(pairs: Mapping[str, str] | Iterable[tuple[str, str]]) -> str:
     if isinstance(pairs, Mapping):
         items = [(str(key), str(value)) for key, value in pairs.items()]
     else:
         items = list(pairs)
     return " ".join(
-        f"{normalize_extension_key(key)}={escape_cef_extension(str(value))}"
+        f"{_normalize_key(key)}={escape_cef_extension(str(value))}"
         for key, value in items
         if value is not None and value != ""
     )
@@ -98,3 +119,134 @@ def build_cef(
     if extensions:
         payload += " " + format_extensions(extensions)
     return payload
+
+
+# Extensions derived from the event itself, in the order to_cef has always emitted them.
+_STATIC_KEYS = ("deviceVendor", "deviceProduct", "deviceVersion")
+_EVENT_KEYS = ("end", "deviceHostName", "deviceProcessName", "syslogSeverity")
+_PRESENT_KEYS = [
+    frozenset(_STATIC_KEYS + tuple(key for bit, key in enumerate(_EVENT_KEYS) if mask & (1 << bit)))
+    for mask in range(1 << len(_EVENT_KEYS))
+]
+
+
+class CEFEncoder:
+    """Encoder specialised for one vendor/product/version and mapping.
+
+    Produces exactly the same text as assembling the extension dictionary and
+    calling :func:`build_cef`, but escapes the constant header prefix and
+    device extensions once and writes every extension straight into a single
+    list of fragments.
+    """
+
+    def __init__(
+        self,
+        vendor: str,
+        product: str,
+        version: str,
+        mapping: EventMapping | None = None,
+        *,
+        cef_version: int = 0,
+    ) -> None:
+        self.vendor = vendor
+        self.product = product
+        self.version = version
+        self.mapping = mapping
+        self._prefix = "|".join(
+            [
+                f"CEF:{cef_version}",
+                escape_cef_header(vendor),
+                escape_cef_header(product),
+                escape_cef_header(version),
+                "",
+            ]
+        )
+        self._static = tuple(zip(_STATIC_KEYS, (vendor, product, version), strict=True))
+        self._static_block = [
+            _format_pair(key, value) for key, value in self._static if str(value) != ""
+        ]
+        self._last_end: tuple[datetime | None, str] = (None, "")
+
+    def encode_event(self, event: ParsedEvent) -> str:
+        if self.mapping is None:
+            raise ValueError("encoder was compiled without a mapping")
+        return self.encode(event, self.mapping.map(event))
+
+    def encode(self, event: ParsedEvent, result: MappingResult) -> str:
+        severity = max(0, min(result.severity, 10))
+        header = (
+            f"{self._prefix}{escape_cef_header(result.signature_id)}|"
+            f"{escape_cef_header(result.name)}|{severity}"
+        )
+        extensions = result.extensions
+        if (
+            "deviceVendor" in extensions
+            or "deviceProduct" in extensions
+            or "deviceVersion" in extensions
+        ):
+            parts = [
+                _format_pair(key, extensions[key] if key in extensions else value)
+                for key, value in self._static
+            ]
+            parts = [part for part in parts if part]
+        else:
+            parts = list(self._static_block)
+
+        mask = 0
+        timestamp = event.timestamp
+        if timestamp:
+            mask |= 1
+            if "end" in extensions:
+                parts.append(_format_pair("end", extensions["end"]))
+            else:
+                last_timestamp, last_end = self._last_end
+                if last_timestamp is not timestamp:
+                    last_end = timestamp.isoformat()
+                    self._last_end = (timestamp, last_end)
+                parts.append(_format_pair("end", last_end))
+        host = event.host
+        if host:
+            mask |= 2
+            parts.append(_format_pair("deviceHostName", extensions.get("deviceHostName", host)))
+        app_name = event.app_name
+        if app_name:
+            mask |= 4
+            value = extensions.get("deviceProcessName", app_name)
+            parts.append(_format_pair("deviceProcessName", value))
+        priority = event.priority
+        if priority is not None:
+            mask |= 8
+            value = extensions.get("syslogSeverity", str(priority % 8))
+            parts.append(_format_pair("syslogSeverity", value))
+
+        present = _PRESENT_KEYS[mask]
+        for key, value in extensions.items():
+            if key in present:
+                continue
+            text = str(value)
+            if text:
+                parts.append(f"{_normalize_key(str(key))}={_escape_extension_value(text)}")
+        return header + " " + " ".join(part for part in parts if part)
+
+
+def _format_pair(key: str, value: object) -> str:
+    text = str(value)
+    if not text:
+        return ""
+    return f"{_normalize_key(key)}={_escape_extension_value(text)}"
+
+
+@lru_cache(maxsize=64)
+def _cached_encoder(vendor: str, product: str, version: str, mapping: Hashable) -> CEFEncoder:
+    return CEFEncoder(vendor, product, version, cast("EventMapping | None", mapping))
+
+
+def compile_encoder(
+    vendor: str, product: str, version: str, mapping: EventMapping | None = None
+) -> CEFEncoder:
+    """Return a (cached) :class:`CEFEncoder` for the given header and mapping."""
+
+    try:
+        return _cached_encoder(vendor, product, version, cast(Hashable, mapping))
+    except TypeError:  # unhashable mapping
+        return CEFEncoder(vendor, product, version, mapping)
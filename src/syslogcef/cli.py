@@ -1,16 +1,18 @@
 from __future__ import annotations
 
 import argparse
-import json
+import asyncio
+import re
+import signal
 import sys
 import time
-from collections import defaultdict
-from collections.abc import Iterable, Iterator
-from collections.abc import Mapping as MappingABC
-from concurrent.futures import Executor, ThreadPoolExecutor
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import ExitStack
 from datetime import tzinfo
+from functools import partial
 from pathlib import Path
-from typing import TextIO
+from typing import IO, Any, BinaryIO
 
 try:  # pragma: no cover - optional dependency
     from dateutil import tz as _dateutil_tz
@@ -36,26 +38,272 @@ else:
         return None
 
 
+from ._json import available_backends as available_json_backends
+from ._json import set_backend as set_json_backend
 from .converters import (
     DEFAULT_PRODUCT,
     DEFAULT_VENDOR,
     DEFAULT_VERSION,
-    convert_line,
-    from_json,
-    parse_syslog,
-    to_cef,
+    BatchConverter,
+    BatchResult,
+    ConversionError,
 )
-from .mappings import get_mapping
-from .mappings.base import Mapping, MappingResult, load_mapping_file
-from .utils import ParsedEvent
+from .geoip import DEFAULT_GEOIP_CACHE_SIZE, GeoEnricher, MMDBError, MMDBReader
+from .ingest import DEFAULT_BLOCK_SIZE, read_document_batches, read_line_batches
+from .listener import (
+    DEFAULT_MAX_FRAME,
+    DEFAULT_QUEUE_SIZE,
+    DEFAULT_RCVBUF,
+    SyslogListener,
+    parse_endpoint,
+    serve,
+)
+from .mappings import SourceRouter, find_router, get_mapping
+from .mappings.base import Mapping, load_mapping_file
+from .mappings.declarative import compile_mapping
+from .metrics import (
+    DEFAULT_METRICS_INTERVAL,
+    Metrics,
+    MetricsReporter,
+    MetricsSample,
+    serve_metrics,
+)
+from .multiline import (
+    DEFAULT_FLUSH_TIMEOUT,
+    DEFAULT_MAX_LINES,
+    AuditGrouper,
+    MultilineJoiner,
+    Reassembler,
+    reassemble,
+)
+from .outputs import (
+    DEFAULT_SPOOL_LIMIT,
+    DeadLetterWriter,
+    NetworkOutput,
+    OutputStream,
+    is_network_target,
+)
+from .pipeline import DEFAULT_BATCH_SIZE, batched, ordered_map
+from .policy import PolicyEngine, PolicyStats, compile_policies
+from .sharding import DEFAULT_SHARD_SIZE, Shard, plan_shards, read_shard_lines
+from .suppress import DEFAULT_SUPPRESS_KEYS, Suppressor
+from .tail import FileTailer
+
+# (output block, lines processed, lines that failed to convert)
+Converted = tuple[str | bytes, int, list[ConversionError]]
 
 
 def build_parser() -> argparse.ArgumentParser:
-    parser = argparse.ArgumentParser(description="Convert syslog or JSON events to CEF")
+    parser = argparse.ArgumentParser(
+        description="Convert syslog or JSON events to CEF",
+        epilog="Run 'syslogcef listen --help' to receive syslog over the network instead.",
+    )
     parser.add_argument("--input", "-i", default="-", help="Input file or - for stdin")
-    parser.add_argument("--output", "-o", default="-", help="Output file or - for stdout")
+    _add_output_arguments(parser)
+    _add_conversion_arguments(parser)
+    parser.add_argument("--watch", action="store_true", help="Tail the input file for new lines")
+    parser.add_argument(
+        "--checkpoint",
+        help="With --watch, persist the read offset here and resume from it on restart",
+    )
+    parser.add_argument(
+        "--multiline",
+        choices=["stacktrace", "auditd"],
+        help="Reassemble multi-line events before converting: join indented stack-trace "
+        "lines onto the line that starts them, or merge auditd records by event serial",
+    )
+    parser.add_argument(
+        "--multiline-start",
+        metavar="REGEX",
+        help="Lines matching REGEX start a new event; any other line continues the current one",
+    )
     parser.add_argument(
-        "--format", choices=["syslog", "json"], default=None, help="Force input format"
+        "--multiline-continue",
+        metavar="REGEX",
+        help="Lines matching REGEX continue the current event (default with --multiline "
+        "stacktrace: indented lines, 'Caused by:' and 'Suppressed:')",
+    )
+    parser.add_argument(
+        "--multiline-timeout",
+        type=float,
+        default=DEFAULT_FLUSH_TIMEOUT,
+        help="With --watch, emit a buffered event after this many idle seconds",
+    )
+    parser.add_argument(
+        "--multiline-max-lines",
+        type=int,
+        default=DEFAULT_MAX_LINES,
+        help="Lines (or auditd records) held per event before it is emitted",
+    )
+    parser.add_argument("--workers", type=int, default=1, help="Number of workers")
+    parser.add_argument(
+        "--executor",
+        choices=["thread", "process"],
+        default="thread",
+        help="Worker backend; process workers scale CPU-bound conversion past the GIL",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help="Lines handed to a worker per task",
+    )
+    parser.add_argument(
+        "--max-in-flight",
+        type=int,
+        default=None,
+        help="Maximum batches queued for workers (default: 4 x workers)",
+    )
+    parser.add_argument(
+        "--binary",
+        action="store_true",
+        help="Read input in large byte blocks and write encoded output (fast path for ASCII logs)",
+    )
+    parser.add_argument(
+        "--mmap",
+        action="store_true",
+        help="Memory-map --input and convert newline-aligned byte ranges in parallel",
+    )
+    parser.add_argument(
+        "--shard-size",
+        type=int,
+        default=DEFAULT_SHARD_SIZE,
+        help="Approximate bytes per range in --mmap mode",
+    )
+    parser.add_argument(
+        "--split-output",
+        action="store_true",
+        help="With --mmap, write each range to OUTPUT.NNNNN instead of one file",
+    )
+    parser.add_argument("--stats", action="store_true", help="Print statistics to stderr")
+    _add_metrics_arguments(parser)
+    return parser
+
+
+def build_listen_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="syslogcef listen", description="Receive syslog over UDP/TCP and convert it to CEF"
+    )
+    parser.add_argument(
+        "--udp",
+        action="append",
+        default=[],
+        metavar="[HOST:]PORT",
+        help="Bind a UDP listener (repeatable)",
+    )
+    parser.add_argument(
+        "--tcp",
+        action="append",
+        default=[],
+        metavar="[HOST:]PORT",
+        help="Bind a TCP listener with RFC 6587 octet-counted or newline framing (repeatable)",
+    )
+    _add_output_arguments(parser)
+    _add_conversion_arguments(parser)
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=DEFAULT_QUEUE_SIZE,
+        help="Messages buffered between the sockets and the converter; UDP drops beyond it",
+    )
+    parser.add_argument(
+        "--rcvbuf",
+        type=int,
+        default=DEFAULT_RCVBUF,
+        help="Socket receive buffer size in bytes (capped by net.core.rmem_max)",
+    )
+    parser.add_argument(
+        "--max-frame",
+        type=int,
+        default=DEFAULT_MAX_FRAME,
+        help="Largest accepted TCP frame in bytes",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help="Maximum messages converted per batch",
+    )
+    parser.add_argument(
+        "--binary", action="store_true", help="Write encoded output through a binary writer"
+    )
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        help="Print processed/failed and per-listener drop and queue-depth counters on exit",
+    )
+    _add_metrics_arguments(parser)
+    return parser
+
+
+def _add_output_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--output",
+        "-o",
+        default="-",
+        help="Output file, - for stdout, or tcp://HOST:PORT / udp://HOST:PORT for a collector",
+    )
+    parser.add_argument(
+        "--output-connections",
+        type=int,
+        default=1,
+        help="Persistent connections to a network --output, used round-robin per batch",
+    )
+    parser.add_argument(
+        "--output-framing",
+        choices=["newline", "octet"],
+        default="newline",
+        help="TCP framing for a network --output (octet = RFC 6587 octet counting)",
+    )
+    parser.add_argument(
+        "--spool",
+        help="File that buffers network output while the collector is unreachable",
+    )
+    parser.add_argument(
+        "--spool-limit",
+        type=int,
+        default=DEFAULT_SPOOL_LIMIT,
+        help="Maximum bytes held in --spool; newer events are dropped beyond it",
+    )
+    parser.add_argument(
+        "--dead-letter",
+        metavar="PATH",
+        help="Append lines that fail to convert to PATH (- for stderr) as JSON lines "
+        "instead of writing parse_error events to the output",
+    )
+
+
+def _add_metrics_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--metrics-stderr",
+        action="store_true",
+        help="Print throughput and per-stage latency to stderr every --metrics-interval",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        metavar="PATH",
+        help="Rewrite PATH in Prometheus text format every --metrics-interval",
+    )
+    parser.add_argument(
+        "--metrics-listen",
+        metavar="[HOST:]PORT",
+        help="Serve Prometheus metrics over HTTP at /metrics (HOST defaults to 127.0.0.1)",
+    )
+    parser.add_argument(
+        "--metrics-interval",
+        type=float,
+        default=DEFAULT_METRICS_INTERVAL,
+        help="Seconds between metrics reports",
+    )
+
+
+def _add_conversion_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--format",
+        choices=["syslog", "json", "elastic"],
+        default=None,
+        help="Force input format; elastic streams NDJSON/_bulk files, JSON arrays and "
+        "Elasticsearch exports (hits.hits[]._source) with nested objects flattened",
     )
     parser.add_argument("--vendor", default=DEFAULT_VENDOR)
     parser.add_argument("--product", default=DEFAULT_PRODUCT)
@@ -63,163 +311,621 @@ def build_parser() -> argparse.ArgumentParser:
     parser.add_argument(
         "--source",
         default="default",
-        help="Source mapping to use (cisco, linux, f5, vmware, default)",
+        help="Source mapping to use (cisco, linux, f5, vmware, default, or auto to pick per event)",
+    )
+    parser.add_argument(
+        "--route",
+        action="append",
+        default=[],
+        metavar="NAME=MAPPING",
+        help="With --source auto: send events whose hostname or app-name is NAME to MAPPING",
+    )
+    parser.add_argument(
+        "--json-backend",
+        choices=["auto", *available_json_backends()],
+        default="auto",
+        help="JSON decoder (auto picks orjson when installed)",
     )
-    parser.add_argument("--watch", action="store_true", help="Tail the input file for new lines")
-    parser.add_argument("--workers", type=int, default=1, help="Number of worker threads")
     parser.add_argument("--tz", dest="timezone", help="Default timezone for naive timestamps")
     parser.add_argument("--strict", action="store_true", help="Fail on parse errors")
-    parser.add_argument("--stats", action="store_true", help="Print statistics to stderr")
-    parser.add_argument("--mapping-file", help="Additional mapping overrides (JSON or YAML)")
-    return parser
+    parser.add_argument(
+        "--mapping-file", help="Mapping overrides or a declarative mapping (JSON or YAML)"
+    )
+    parser.add_argument(
+        "--geoip-db",
+        metavar="PATH",
+        help="MaxMind City/Country database (.mmdb): add slat/slong and the country (cs5/cs6) "
+        "for src/dst addresses",
+    )
+    parser.add_argument(
+        "--asn-db",
+        metavar="PATH",
+        help="MaxMind ASN database (.mmdb): add the AS number (cn1/cn2) for src/dst addresses",
+    )
+    parser.add_argument(
+        "--geoip-cache",
+        type=int,
+        default=DEFAULT_GEOIP_CACHE_SIZE,
+        help="Addresses whose GeoIP results are kept in memory (LRU)",
+    )
+    parser.add_argument(
+        "--suppress-window",
+        type=float,
+        metavar="SECONDS",
+        help="Forward the first of repeated events (same host, app, signature and message "
+        "template) and replace the rest of the window with one event carrying cnt=N",
+    )
+    parser.add_argument(
+        "--suppress-key",
+        choices=["template", "exact"],
+        default="template",
+        help="Compare messages with digits removed (template) or verbatim (exact)",
+    )
+    parser.add_argument(
+        "--suppress-max-keys",
+        type=int,
+        default=DEFAULT_SUPPRESS_KEYS,
+        help="Open suppression windows kept in memory; the oldest is closed early beyond it",
+    )
 
 
-class OverrideMapping:
-    def __init__(self, base: Mapping, overrides: dict[str, str]):
-        self.base = base
-        self.overrides = overrides
-        self.name = base.name
-
-    def map(self, event: ParsedEvent) -> MappingResult:
-        base_result: MappingResult = self.base.map(event)
-        extensions = dict(base_result.extensions)
-        if self.overrides:
-            safe_map = defaultdict(str, event.fields)
-            for key, value in self.overrides.items():
-                try:
-                    extensions[key] = str(value).format_map(safe_map)
-                except KeyError:
-                    extensions[key] = value
-        return MappingResult(
-            signature_id=base_result.signature_id,
-            name=base_result.name,
-            severity=base_result.severity,
-            extensions=extensions,
-        )
+def build_mapping(args: argparse.Namespace, spec: dict[str, Any] | None = None) -> Mapping:
+    """Resolve ``--source``/``--route`` and compile ``spec`` (the loaded ``--mapping-file``)."""
+
+    if args.route and args.source.lower() != "auto":
+        raise ValueError("--route needs --source auto")
+    if args.source.lower() == "auto":
+        # a router of its own, so --stats counts only this run
+        routes: dict[str, str] = {}
+        for route in args.route:
+            name, sep, target = route.partition("=")
+            if not sep or not name or not target:
+                raise ValueError(f"expected NAME=MAPPING, got {route!r}")
+            routes[name] = target
+        base_mapping: Mapping = SourceRouter(routes=routes)
+    else:
+        base_mapping = get_mapping(args.source)
+    if spec:
+        return compile_mapping(spec, base=base_mapping)
+    return base_mapping
 
 
 def main(argv: Iterable[str] | None = None) -> int:
+    arguments = list(argv) if argv is not None else sys.argv[1:]
+    if arguments[:1] == ["listen"]:
+        return listen_main(arguments[1:])
     parser = build_parser()
-    args = parser.parse_args(list(argv) if argv is not None else None)
+    args = parser.parse_args(arguments)
 
-    default_tz = _get_timezone(args.timezone)
+    if args.mmap and (args.input == "-" or args.watch):
+        parser.error("--mmap needs a regular --input file and cannot be combined with --watch")
+    if args.split_output and (
+        not args.mmap or args.output == "-" or is_network_target(args.output)
+    ):
+        parser.error("--split-output needs --mmap and an --output path")
+    if args.checkpoint and (not args.watch or args.input == "-"):
+        parser.error("--checkpoint needs --watch and an --input file")
+    if args.format == "elastic" and (args.watch or args.mmap):
+        parser.error("--format elastic cannot be combined with --watch or --mmap")
+    _check_suppression(parser, args)
+    _check_spool(parser, args)
+    if args.suppress_window is not None and (_uses_processes(args) or args.split_output):
+        # every converting process would keep its own windows
+        parser.error(
+            "--suppress-window cannot be combined with --executor process or --split-output"
+        )
+    try:
+        reassembler = build_reassembler(args)
+    except (re.error, ValueError) as exc:
+        parser.error(f"invalid multiline option: {exc}")
+    if reassembler is not None and (args.mmap or args.format == "elastic"):
+        parser.error("multi-line reassembly cannot be combined with --mmap or --format elastic")
 
-    base_mapping = get_mapping(args.source)
-    mapping: Mapping = base_mapping
-    if args.mapping_file:
-        overrides = load_mapping_file(args.mapping_file)
-        mapping = OverrideMapping(base_mapping, overrides)
+    metrics = Metrics() if _metrics_enabled(args) else None
+    try:
+        converter = build_converter(args, metrics, live=args.watch)
+    except MMDBError as exc:
+        parser.error(f"invalid GeoIP database: {exc}")
+    except ValueError as exc:
+        parser.error(f"invalid mapping file: {exc}")
 
-    input_iter = open_input(args.input, watch=args.watch)
-    output_stream: TextIO
-    if args.output == "-":
-        output_stream = sys.stdout
+    items: Iterable[Any]
+    convert: Callable[[Any], Converted]
+    batches: Iterator[list[str]]
+    tailer: FileTailer | None = None
+    input_file: BinaryIO | None = None
+    if args.watch and args.input != "-":
+        tailer = FileTailer(args.input, batch_size=args.batch_size, checkpoint=args.checkpoint)
+        batches = tailer.batches()
+        items = batches if reassembler is None else reassemble(batches, reassembler)
+        convert = partial(convert_batch, converter=converter, encode=args.binary)
+    elif args.format == "elastic":
+        input_file = open_binary_input(args.input)
+        items = read_document_batches(input_file, args.batch_size)
+        convert = partial(convert_document_batch, converter=converter, encode=args.binary)
+    elif args.mmap:
+        items = plan_shards(args.input, args.shard_size)
+        split_prefix = args.output if args.split_output else None
+        convert = partial(
+            convert_shard, converter=converter, encode=args.binary, split_prefix=split_prefix
+        )
     else:
-        output_stream = open(args.output, "w", encoding="utf-8")
+        batches = open_batches(
+            args.input, watch=args.watch, batch_size=args.batch_size, binary=args.binary
+        )
+        items = batches if reassembler is None else reassemble(batches, reassembler)
+        convert = partial(convert_batch, converter=converter, encode=args.binary)
+    output_stream: OutputStream | None = None
+    if not args.split_output:
+        try:
+            output_stream = build_output(args)
+        except ValueError as exc:
+            parser.error(str(exc))
+    dead_letter = DeadLetterWriter(args.dead_letter) if args.dead_letter else None
 
     executor: Executor | None = None
     if args.workers and args.workers > 1:
-        executor = ThreadPoolExecutor(max_workers=args.workers)
+        if _uses_processes(args):
+            executor = ProcessPoolExecutor(
+                max_workers=args.workers, initializer=_init_worker, initargs=(args,)
+            )
+            convert = _convert_worker_item
+        else:
+            executor = ThreadPoolExecutor(max_workers=args.workers)
 
     processed = 0
     failed = 0
+    reporting = ExitStack()
 
     try:
+        if metrics is not None:
+            try:
+                start_metrics(args, metrics, reporting)
+            except (OSError, ValueError) as exc:
+                parser.error(f"cannot start metrics: {exc}")
+        results: Iterator[tuple[Any, Converted]]
         if executor:
-            futures = []
-            for line in input_iter:
-                futures.append(
-                    executor.submit(
-                        convert_single,
-                        line,
-                        mapping,
-                        args,
-                        default_tz,
-                    )
+            max_in_flight = args.max_in_flight or args.workers * 4
+            if metrics is not None:
+                progress = [0, 0]  # batches submitted, batches written
+                items = _count_items(items, progress)
+                metrics.gauge(
+                    "batches_in_flight",
+                    lambda: progress[0] - progress[1],
+                    "Batches queued for or held by workers.",
+                )
+            if _uses_processes(args) and (metrics is not None or converter.policy is not None):
+                reported = ordered_map(
+                    executor, _report_worker_item, items, max_in_flight=max_in_flight
+                )
+                results = _merge_worker_reports(reported, metrics, converter.policy)
+            else:
+                # with suppression, idle markers are converted here so closed windows go out
+                on_flush = convert if converter.suppressor is not None else None
+                results = ordered_map(
+                    executor, convert, items, max_in_flight=max_in_flight, on_flush=on_flush
                 )
-            for future in futures:
-                try:
-                    cef_line = future.result()
-                    processed += 1
-                    failed += int("flexString1=parse_error" in cef_line)
-                    output_stream.write(cef_line + "\n")
-                except Exception:
-                    if args.strict:
-                        raise
-                    failed += 1
         else:
-            for line in input_iter:
-                cef_line = convert_single(line, mapping, args, default_tz)
-                processed += 1
-                failed += int("flexString1=parse_error" in cef_line)
-                output_stream.write(cef_line + "\n")
+            # with suppression, idle markers are converted too so closed windows go out
+            suppressing = converter.suppressor is not None
+            results = ((item, convert(item)) for item in items if len(item) or suppressing)
+        for item, (block, batch_processed, errors) in results:
+            if dead_letter is not None and errors:
+                dead_letter.write(errors, offset=processed)
+                if args.watch:
+                    dead_letter.flush()
+            processed += batch_processed
+            failed += len(errors)
+            if executor and metrics is not None:
+                progress[1] += 1
+            if output_stream is None:
+                continue
+            if metrics is not None:
+                started = time.perf_counter_ns()
+                output_stream.write(block)
+                metrics.observe("write", time.perf_counter_ns() - started)
+            else:
+                output_stream.write(block)
+            if args.watch:
+                output_stream.flush()
+            if tailer is not None:
+                # results arrive in input order, so everything up to here is written
+                tailer.commit(item)
+        if converter.suppressor is not None and output_stream is not None:
+            output_stream.write(release_suppressed(converter, encode=args.binary))
     finally:
-        if output_stream is not sys.stdout:
+        if output_stream is not None and args.output == "-":
+            output_stream.flush()
+        elif output_stream is not None:
             output_stream.close()
+        if dead_letter is not None:
+            dead_letter.close()
         if executor:
-            executor.shutdown()
+            executor.shutdown(cancel_futures=True)
+        if input_file is not None and args.input != "-":
+            input_file.close()
+        reporting.close()
 
     if args.stats:
         sys.stderr.write(f"processed={processed} failed={failed}\n")
+        # process workers route with their own copies of the mapping
+        router = find_router(converter.mapping)
+        if router is not None and not _uses_processes(args):
+            sys.stderr.write(router.stats.format() + "\n")
+        if converter.policy is not None:
+            sys.stderr.write(converter.policy.stats.format() + "\n")
+        if converter.suppressor is not None:
+            sys.stderr.write(converter.suppressor.stats.format() + "\n")
+        if isinstance(output_stream, NetworkOutput):
+            sys.stderr.write(output_stream.stats.format() + "\n")
+    return 0
+
+
+def listen_main(argv: Iterable[str] | None = None) -> int:
+    parser = build_listen_parser()
+    args = parser.parse_args(list(argv) if argv is not None else None)
+    if not args.udp and not args.tcp:
+        parser.error("at least one --udp or --tcp listener is required")
+    try:
+        udp = [parse_endpoint(value) for value in args.udp]
+        tcp = [parse_endpoint(value) for value in args.tcp]
+    except ValueError as exc:
+        parser.error(str(exc))
+    _check_suppression(parser, args)
+    _check_spool(parser, args)
+    listener = SyslogListener(
+        udp=udp,
+        tcp=tcp,
+        queue_size=args.queue_size,
+        rcvbuf=args.rcvbuf,
+        max_frame=args.max_frame,
+    )
+    metrics = Metrics() if _metrics_enabled(args) else None
+    try:
+        converter = build_converter(args, metrics)
+    except MMDBError as exc:
+        parser.error(f"invalid GeoIP database: {exc}")
+    except ValueError as exc:
+        parser.error(f"invalid mapping file: {exc}")
+    try:
+        output_stream = build_output(args)
+    except ValueError as exc:
+        parser.error(str(exc))
+    dead_letter = DeadLetterWriter(args.dead_letter) if args.dead_letter else None
+    totals = [0, 0]
+    reporting = ExitStack()
+    if metrics is not None:
+        metrics.gauge(
+            "queue_depth", lambda: listener.queue_depth, "Messages waiting for the converter."
+        )
+        metrics.gauge(
+            "listener_dropped_total",
+            lambda: sum(stats.dropped + stats.kernel_dropped for stats in listener.stats),
+            "Datagrams dropped because the queue or the socket buffer was full.",
+            kind="counter",
+        )
+        try:
+            start_metrics(args, metrics, reporting)
+        except (OSError, ValueError) as exc:
+            parser.error(f"cannot start metrics: {exc}")
+
+    def handle(batch: list[bytes]) -> None:
+        block, processed, errors = convert_batch(batch, converter, encode=args.binary)
+        if dead_letter is not None and errors:
+            dead_letter.write(errors, offset=totals[0])
+            dead_letter.flush()
+        if block:
+            if metrics is not None:
+                started = time.perf_counter_ns()
+                output_stream.write(block)
+                metrics.observe("write", time.perf_counter_ns() - started)
+            else:
+                output_stream.write(block)
+            output_stream.flush()
+        totals[0] += processed
+        totals[1] += len(errors)
+
+    async def run() -> None:
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signum, stop.set)
+            except (NotImplementedError, RuntimeError):  # pragma: no cover - non-Unix
+                pass
+        await listener.start()
+        # an idle listener still has to emit suppression windows as they close
+        idle = min(args.suppress_window, 1.0) if converter.suppressor is not None else None
+        await serve(listener, handle, batch_size=args.batch_size, stop=stop, idle=idle)
+
+    try:
+        asyncio.run(run())
+    finally:
+        if converter.suppressor is not None:
+            output_stream.write(release_suppressed(converter, encode=args.binary))
+        if args.output == "-":
+            output_stream.flush()
+        else:
+            output_stream.close()
+        if dead_letter is not None:
+            dead_letter.close()
+        reporting.close()
+        if args.stats:
+            sys.stderr.write(f"processed={totals[0]} failed={totals[1]}\n")
+            for stats in listener.stats:
+                sys.stderr.write(stats.format() + "\n")
+            router = find_router(converter.mapping)
+            if router is not None:
+                sys.stderr.write(router.stats.format() + "\n")
+            if converter.policy is not None:
+                sys.stderr.write(converter.policy.stats.format() + "\n")
+            if converter.suppressor is not None:
+                sys.stderr.write(converter.suppressor.stats.format() + "\n")
+            if isinstance(output_stream, NetworkOutput):
+                sys.stderr.write(output_stream.stats.format() + "\n")
     return 0
 
 
+def build_reassembler(args: argparse.Namespace) -> Reassembler | None:
+    if args.multiline_max_lines < 1 or args.multiline_timeout <= 0:
+        raise ValueError("--multiline-max-lines and --multiline-timeout must be positive")
+    if args.multiline == "auditd":
+        if args.multiline_start or args.multiline_continue:
+            raise ValueError("--multiline auditd does not take start or continue patterns")
+        return AuditGrouper(max_records=args.multiline_max_lines, timeout=args.multiline_timeout)
+    if args.multiline is None and not (args.multiline_start or args.multiline_continue):
+        return None
+    return MultilineJoiner(
+        start=args.multiline_start,
+        continuation=args.multiline_continue,
+        max_lines=args.multiline_max_lines,
+        timeout=args.multiline_timeout,
+    )
+
+
 def open_input(path: str, *, watch: bool) -> Iterator[str]:
     if path == "-":
         return iter(sys.stdin.readline, "")
-    file_path = Path(path)
-    file = file_path.open("r", encoding="utf-8", errors="replace")
-    if not watch:
-        return iter(file.readline, "")
-
-    def watcher() -> Iterator[str]:
-        while True:
-            line = file.readline()
-            if line:
-                yield line
-            else:
-                time.sleep(0.5)
+    if watch:
+        tailer = FileTailer(path, batch_size=DEFAULT_BATCH_SIZE)
+        return (line for batch in tailer.batches() for line in batch)
+    file = Path(path).open("r", encoding="utf-8", errors="replace")
+    return iter(file.readline, "")
 
-    return watcher()
 
+def open_batches(
+    path: str, *, watch: bool, batch_size: int, binary: bool = False
+) -> Iterator[list[str]]:
+    if watch and path != "-":
+        return FileTailer(path, batch_size=batch_size).batches()
+    if binary:
+        stream: BinaryIO | None
+        if path == "-":
+            stream = getattr(sys.stdin, "buffer", None)
+        else:
+            stream = Path(path).open("rb")
+        if stream is not None:
+            return read_line_batches(stream, batch_size)
+    return batched(open_input(path, watch=False), batch_size)
 
-def convert_single(
-    line: str,
-    mapping: Mapping,
-    args: argparse.Namespace,
-    default_tz: tzinfo | None,
-) -> str:
-    if args.format:
-        try:
-            if args.format == "json":
-                data = json.loads(line)
-                if not isinstance(data, MappingABC):
-                    raise ValueError("JSON log line must be an object")
-                event = from_json(data, default_tz=default_tz)
-            else:
-                event = parse_syslog(line, default_tz=default_tz).as_event(default_tz)
-            return to_cef(
-                event,
-                vendor=args.vendor,
-                product=args.product,
-                version=args.version,
-                mapping=mapping,
-            )
-        except Exception:
-            if args.strict:
-                raise
-            # fall back to automatic conversion
-    return convert_line(
-        line,
+
+def open_binary_input(path: str) -> BinaryIO:
+    if path == "-":
+        return sys.stdin.buffer
+    return Path(path).open("rb")
+
+
+def build_output(args: argparse.Namespace) -> OutputStream:
+    if is_network_target(args.output):
+        return NetworkOutput(
+            args.output,
+            connections=args.output_connections,
+            framing=args.output_framing,
+            spool=args.spool,
+            spool_limit=args.spool_limit,
+        )
+    return open_output(args.output, binary=args.binary)
+
+
+def open_output(path: str, *, binary: bool = False) -> IO[Any]:
+    if path == "-":
+        if binary:
+            return getattr(sys.stdout, "buffer", sys.stdout)
+        return sys.stdout
+    if binary:
+        return open(path, "wb", buffering=DEFAULT_BLOCK_SIZE)
+    return open(path, "w", encoding="utf-8")
+
+
+def _uses_processes(args: argparse.Namespace) -> bool:
+    return bool(args.workers and args.workers > 1 and args.executor == "process")
+
+
+def _metrics_enabled(args: argparse.Namespace) -> bool:
+    return bool(args.metrics_stderr or args.metrics_file or args.metrics_listen)
+
+
+def start_metrics(args: argparse.Namespace, metrics: Metrics, stack: ExitStack) -> None:
+    """Start the reporters selected by the ``--metrics-*`` flags; closing ``stack`` stops them."""
+
+    if args.metrics_listen:
+        host, port = parse_endpoint(args.metrics_listen, default_host="127.0.0.1")
+        server = serve_metrics(metrics, host, port)
+        stack.callback(server.server_close)
+        stack.callback(server.shutdown)
+    if args.metrics_stderr or args.metrics_file:
+        reporter = MetricsReporter(
+            metrics,
+            interval=args.metrics_interval,
+            stream=sys.stderr if args.metrics_stderr else None,
+            path=args.metrics_file,
+        )
+        stack.callback(reporter.start().close)
+
+
+def _count_items(items: Iterable[Any], progress: list[int]) -> Iterator[Any]:
+    for item in items:
+        if len(item):
+            progress[0] += 1
+        yield item
+
+
+def build_converter(
+    args: argparse.Namespace, metrics: Metrics | None = None, *, live: bool = True
+) -> BatchConverter:
+    """Build the converter for ``args``; ``live`` is false for input that is read to its end."""
+
+    set_json_backend(args.json_backend)
+    # decoded documents skip parsing; any text lines are JSON
+    input_format = "json" if args.format == "elastic" else args.format
+    spec = load_mapping_file(args.mapping_file) if args.mapping_file else None
+    # the mapping file may carry sampling/rate-limit policies next to the mapping itself
+    policies = spec.pop("policies", None) if spec is not None else None
+    return BatchConverter(
         args.source,
-        mapping,
+        build_mapping(args, spec),
         vendor=args.vendor,
         product=args.product,
         version=args.version,
-        default_tz=default_tz,
+        default_tz=_get_timezone(args.timezone),
         strict=args.strict,
+        input_format=input_format,
+        metrics=metrics,
+        fallback=not args.dead_letter,
+        policy=compile_policies(policies) if policies is not None else None,
+        enricher=build_enricher(args),
+        suppressor=build_suppressor(args, live=live),
+    )
+
+
+def _check_suppression(parser: argparse.ArgumentParser, args: argparse.Namespace) -> None:
+    if args.suppress_window is not None and (
+        args.suppress_window <= 0 or args.suppress_max_keys < 1
+    ):
+        parser.error("--suppress-window and --suppress-max-keys must be positive")
+
+
+def _check_spool(parser: argparse.ArgumentParser, args: argparse.Namespace) -> None:
+    if args.spool and not is_network_target(args.output):
+        parser.error("--spool needs a tcp:// or udp:// --output")
+
+
+def build_enricher(args: argparse.Namespace) -> GeoEnricher | None:
+    if not args.geoip_db and not args.asn_db:
+        return None
+    readers: list[MMDBReader | None] = []
+    for path in (args.geoip_db, args.asn_db):
+        try:
+            readers.append(MMDBReader(path) if path else None)
+        except OSError as exc:
+            raise MMDBError(f"cannot open {path}: {exc.strerror or exc}") from None
+    return GeoEnricher(*readers, cache_size=args.geoip_cache)
+
+
+def build_suppressor(args: argparse.Namespace, *, live: bool = True) -> Suppressor | None:
+    if args.suppress_window is None:
+        return None
+    # a file replayed in minutes may span days: measure its windows on event timestamps
+    return Suppressor(
+        args.suppress_window,
+        max_keys=args.suppress_max_keys,
+        exact=args.suppress_key == "exact",
+        clock=time.monotonic if live else time.time,
+        event_time=not live,
     )
 
 
+def convert_batch(
+    lines: Sequence[str | bytes], converter: BatchConverter, *, encode: bool = False
+) -> Converted:
+    return _render(converter.convert(lines), len(lines), encode=encode)
+
+
+def convert_document_batch(
+    documents: Sequence[dict[str, Any] | str], converter: BatchConverter, *, encode: bool = False
+) -> Converted:
+    return _render(converter.convert_documents(documents), len(documents), encode=encode)
+
+
+def release_suppressed(converter: BatchConverter, *, encode: bool = False) -> str | bytes:
+    """Render the ``cnt`` summaries of every open suppression window (end of input)."""
+
+    block, _, _ = _render(BatchResult(converter.release_suppressed(final=True)), 0, encode=encode)
+    return block
+
+
+def _render(result: BatchResult, processed: int, *, encode: bool) -> Converted:
+    block = "\n".join(result.records) + "\n" if result.records else ""
+    if encode:
+        return block.encode("utf-8", errors="replace"), processed, result.errors
+    return block, processed, result.errors
+
+
+def convert_shard(
+    shard: Shard,
+    converter: BatchConverter,
+    *,
+    encode: bool = False,
+    split_prefix: str | None = None,
+) -> Converted:
+    block, processed, errors = convert_batch(read_shard_lines(shard), converter, encode=encode)
+    if split_prefix is None:
+        return block, processed, errors
+    data = block if isinstance(block, bytes) else block.encode("utf-8")
+    with open(f"{split_prefix}.{shard.index:05d}", "wb") as handle:
+        handle.write(data)
+    return b"" if encode else "", processed, errors
+
+
+_worker_converter: BatchConverter | None = None
+_worker_args: argparse.Namespace | None = None
+_worker_metrics: Metrics | None = None
+
+
+def _init_worker(args: argparse.Namespace) -> None:
+    # Runs once per worker process so mappings and overrides are not rebuilt per batch.
+    global _worker_converter, _worker_args, _worker_metrics
+    _worker_metrics = Metrics() if _metrics_enabled(args) else None
+    _worker_converter = build_converter(args, _worker_metrics)
+    _worker_args = args
+
+
+def _convert_worker_item(item: Shard | list[Any]) -> Converted:
+    if _worker_converter is None or _worker_args is None:  # pragma: no cover
+        raise RuntimeError("worker process was not initialized")
+    args = _worker_args
+    if isinstance(item, Shard):
+        split_prefix = args.output if args.split_output else None
+        return convert_shard(item, _worker_converter, encode=args.binary, split_prefix=split_prefix)
+    if args.format == "elastic":
+        return convert_document_batch(item, _worker_converter, encode=args.binary)
+    return convert_batch(item, _worker_converter, encode=args.binary)
+
+
+def _report_worker_item(
+    item: Shard | list[Any],
+) -> tuple[Converted, MetricsSample | None, PolicyStats | None]:
+    converted = _convert_worker_item(item)
+    if _worker_converter is None:  # pragma: no cover
+        raise RuntimeError("worker process was not initialized")
+    # ship what this batch measured and dropped back to the parent with its output
+    sample = _worker_metrics.take() if _worker_metrics is not None else None
+    policy = _worker_converter.policy
+    return converted, sample, policy.take() if policy is not None else None
+
+
+def _merge_worker_reports(
+    results: Iterator[tuple[Any, tuple[Converted, MetricsSample | None, PolicyStats | None]]],
+    metrics: Metrics | None,
+    policy: PolicyEngine | None,
+) -> Iterator[tuple[Any, Converted]]:
+    for item, (converted, sample, dropped) in results:
+        if sample is not None and metrics is not None:
+            metrics.record(sample)
+        if dropped is not None and policy is not None:
+            policy.record(dropped)
+        yield item, converted
+
+
 if __name__ == "__main__":  # pragma: no cover
     raise SystemExit(main())
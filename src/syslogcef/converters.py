@@ -1,20 +1,38 @@
 from __future__ import annotations
 
 import json
-from collections.abc import Iterable
+from collections.abc import Callable, Collection, Iterable, Iterator
 from collections.abc import Mapping as MappingABC
+from dataclasses import dataclass, field, replace
 from datetime import datetime, tzinfo
+from time import perf_counter_ns
 from typing import Any
 
+from . import _json
 from ._datetime import smart_parse
-from .cef import CEFHeader, build_cef
-from .mappings import get_mapping
-from .mappings.base import Mapping
-from .parsing import ParsedSyslog
+from .cef import compile_encoder
+from .geoip import GeoEnricher
+from .mappings import find_router, get_mapping
+from .mappings.base import Mapping, MappingResult
+from .metrics import Metrics, MetricsSample
+from .parsing import ParsedSyslog, SyslogEvent
 from .parsing import parse_syslog as _parse_syslog
+from .pipeline import DEFAULT_BATCH_SIZE, batched
+from .policy import PolicyEngine
+from .suppress import Suppressor
 from .utils import ParsedEvent, ensure_tz, sanitize_text
 
-__all__ = ["convert_line", "parse_syslog", "from_json", "to_cef"]
+__all__ = [
+    "BatchConverter",
+    "BatchResult",
+    "ConversionError",
+    "convert_line",
+    "convert_many",
+    "convert_stream",
+    "parse_syslog",
+    "from_json",
+    "to_cef",
+]
 
 
 DEFAULT_VENDOR = "JSON-SYSLOG"
@@ -26,7 +44,21 @@ def parse_syslog(line: str, *, default_tz: tzinfo | None = None) -> ParsedSyslog
     return _parse_syslog(line, default_tz=default_tz)
 
 
-def from_json(event: MappingABC[str, Any], *, default_tz: tzinfo | None = None) -> ParsedEvent:
+def from_json(
+    event: MappingABC[str, Any],
+    *,
+    default_tz: tzinfo | None = None,
+    fields: Collection[str] | None = None,
+    raw_text: str | None = None,
+) -> ParsedEvent:
+    """Build a :class:`ParsedEvent` from a decoded JSON object.
+
+    ``fields`` limits the keys copied into ``ParsedEvent.fields`` (see
+    ``BaseMapping.required_fields``).  ``raw_text`` is the line the object was
+    decoded from; it becomes the message when there is no ``message``/``msg``
+    key, instead of re-serialising the object.
+    """
+
     timestamp = _parse_timestamp(event)
     if timestamp:
         timestamp = ensure_tz(timestamp, default_tz)
@@ -38,15 +70,24 @@ def from_json(event: MappingABC[str, Any], *, default_tz: tzinfo | None = None)
             priority = int(event["priority"])
         except (TypeError, ValueError):
             priority = None
-    message = sanitize_text(event.get("message") or event.get("msg") or json.dumps(event))
-    fields = {key: value for key, value in event.items() if value is not None}
+    message = sanitize_text(
+        event.get("message") or event.get("msg") or raw_text or json.dumps(event)
+    )
+    if fields is None:
+        values = {key: sanitize_text(value) for key, value in event.items() if value is not None}
+    else:
+        values = {}
+        for key in fields:
+            value = event.get(key)
+            if value is not None:
+                values[key] = sanitize_text(value)
     return ParsedEvent(
         timestamp=timestamp,
         host=host,
         app_name=app,
         priority=priority,
         message=message,
-        fields={k: sanitize_text(v) for k, v in fields.items()},
+        fields=values,
         raw=event,
         source=app or host,
     )
@@ -78,31 +119,7 @@ def to_cef(
     version: str,
     mapping: Mapping,
 ) -> str:
-    mapping_result = mapping.map(event)
-    severity = max(0, min(mapping_result.severity, 10))
-    header = CEFHeader(
-        device_vendor=vendor,
-        device_product=product,
-        device_version=version,
-        signature_id=mapping_result.signature_id,
-        name=mapping_result.name,
-        severity=severity,
-    )
-    extensions = {
-        "deviceVendor": vendor,
-        "deviceProduct": product,
-        "deviceVersion": version,
-    }
-    if event.timestamp:
-        extensions["end"] = event.timestamp.isoformat()
-    if event.host:
-        extensions["deviceHostName"] = event.host
-    if event.app_name:
-        extensions["deviceProcessName"] = event.app_name
-    if event.priority is not None:
-        extensions["syslogSeverity"] = str(event.priority % 8)
-    extensions.update(mapping_result.extensions)
-    return build_cef(header, extensions)
+    return compile_encoder(vendor, product, version, mapping).encode_event(event)
 
 
 def convert_line(
@@ -117,8 +134,10 @@ def convert_line(
     strict: bool = False,
 ) -> str:
     try:
-        parsed_event = _parse_line_to_event(line, default_tz=default_tz)
         mapping_obj = mapping or get_mapping(source)
+        parsed_event = _parse_line_to_event(
+            line, default_tz=default_tz, fields=_required_fields(mapping_obj)
+        )
         return to_cef(parsed_event, vendor, product, version, mapping_obj)
     except Exception as exc:
         if strict:
@@ -141,16 +160,347 @@ def convert_line(
         return to_cef(fallback_event, vendor, product, version, mapping_obj)
 
 
+def _required_fields(mapping: Mapping) -> Collection[str] | None:
+    fields: Collection[str] | None = getattr(mapping, "required_fields", None)
+    return fields
+
+
+def _describe_document(document: MappingABC[str, Any] | str) -> str:
+    return document if isinstance(document, str) else json.dumps(document, default=str)
+
+
 def _parse_line_to_event(
     line: str,
     *,
     default_tz: tzinfo | None,
+    fields: Collection[str] | None = None,
 ) -> ParsedEvent:
     trimmed = line.strip()
     if trimmed.startswith("{"):
-        data = json.loads(trimmed)
+        data = _json.loads(trimmed)
         if not isinstance(data, MappingABC):
             raise ValueError("JSON log line must be an object")
-        return from_json(data, default_tz=default_tz)
+        return from_json(data, default_tz=default_tz, fields=fields, raw_text=trimmed)
     syslog = parse_syslog(line, default_tz=default_tz)
-    return syslog.as_event()
+    return syslog.as_event(fields=fields)
+
+
+@dataclass(slots=True)
+class ConversionError:
+    """A line that could not be converted."""
+
+    index: int
+    line: str
+    exc_type: str
+    error: str
+
+
+@dataclass(slots=True)
+class BatchResult:
+    records: list[str]
+    errors: list[ConversionError] = field(default_factory=list)
+
+    @property
+    def failed(self) -> int:
+        return len(self.errors)
+
+
+class BatchConverter:
+    """Convert batches of lines with the mapping and encoder resolved once.
+
+    ``input_format`` forces ``"syslog"`` or ``"json"`` parsing first and falls
+    back to automatic detection, exactly like the CLI's ``--format`` flag.
+    With ``metrics``, each batch is timed per stage and event and recorded
+    once per batch; without it the conversion loop carries no instrumentation.
+    With ``fallback=False``, lines that fail are only reported in
+    ``BatchResult.errors`` and ``records`` holds valid CEF only.  A
+    ``policy`` drops sampled-out and rate-limited events after mapping,
+    before they are encoded.  An ``enricher`` then adds GeoIP extensions
+    for the ``src``/``dst`` addresses.  With a ``suppressor``, repeats are
+    dropped after that and each batch starts with the ``cnt`` summaries of
+    the suppression windows that closed.
+    """
+
+    def __init__(
+        self,
+        source: str | None = None,
+        mapping: Mapping | None = None,
+        *,
+        vendor: str = DEFAULT_VENDOR,
+        product: str = DEFAULT_PRODUCT,
+        version: str = DEFAULT_VERSION,
+        default_tz: tzinfo | None = None,
+        strict: bool = False,
+        input_format: str | None = None,
+        metrics: Metrics | None = None,
+        fallback: bool = True,
+        policy: PolicyEngine | None = None,
+        enricher: GeoEnricher | None = None,
+        suppressor: Suppressor | None = None,
+    ) -> None:
+        if input_format not in (None, "syslog", "json"):
+            raise ValueError(f"Unknown input format '{input_format}'")
+        self.source = source
+        self.mapping = mapping or get_mapping(source)
+        self.default_tz = default_tz
+        self.strict = strict
+        self.input_format = input_format
+        self.metrics = metrics
+        self.fallback = fallback
+        self.policy = policy
+        self.enricher = enricher
+        self.suppressor = suppressor
+        self._filtered = policy is not None or enricher is not None or suppressor is not None
+        self.required_fields = _required_fields(self.mapping)
+        self.encoder = compile_encoder(vendor, product, version, self.mapping)
+        self.fallback_encoder = compile_encoder(
+            vendor, product, version, mapping or get_mapping("default")
+        )
+
+    def convert(self, lines: Iterable[str | bytes], *, offset: int = 0) -> BatchResult:
+        if self.metrics is not None:
+            decoded = (
+                line.decode("utf-8", errors="replace") if isinstance(line, bytes) else line
+                for line in lines
+            )
+            return self._convert_measured(decoded, offset, self.metrics, self._parse, str)
+        records = self.release_suppressed()
+        errors: list[ConversionError] = []
+        convert_one = self._convert_filtered if self._filtered else self._convert_one
+        for index, line in enumerate(lines, offset):
+            if isinstance(line, bytes):
+                line = line.decode("utf-8", errors="replace")
+            try:
+                record = convert_one(line)
+            except Exception as exc:
+                if self.strict:
+                    raise
+                errors.append(ConversionError(index, line, type(exc).__name__, str(exc)))
+                if self.fallback:
+                    records.append(self._fallback(line, exc))
+                continue
+            if record is not None:
+                records.append(record)
+        return BatchResult(records, errors)
+
+    def convert_documents(
+        self, documents: Iterable[MappingABC[str, Any] | str], *, offset: int = 0
+    ) -> BatchResult:
+        """Convert already decoded JSON objects, e.g. from :func:`~syslogcef.ingest.iter_documents`.
+
+        ``str`` items are text that failed to decode; they are reported as
+        errors with the decoder's message.
+        """
+
+        if self.metrics is not None:
+            return self._convert_measured(
+                documents, offset, self.metrics, self._document_event, _describe_document
+            )
+        records = self.release_suppressed()
+        errors: list[ConversionError] = []
+        encode = self._encode_filtered if self._filtered else self.encoder.encode_event
+        for index, document in enumerate(documents, offset):
+            try:
+                record = encode(self._document_event(document))
+            except Exception as exc:
+                if self.strict:
+                    raise
+                line = _describe_document(document)
+                errors.append(ConversionError(index, line, type(exc).__name__, str(exc)))
+                if self.fallback:
+                    records.append(self._fallback(line, exc))
+                continue
+            if record is not None:
+                records.append(record)
+        return BatchResult(records, errors)
+
+    def release_suppressed(self, *, final: bool = False) -> list[str]:
+        """Encode the summaries of closed suppression windows (all open ones with ``final``)."""
+
+        suppressor = self.suppressor
+        if suppressor is None:
+            return []
+        closed = suppressor.drain() if final else suppressor.expire()
+        encode = self.encoder.encode
+        return [
+            encode(event, replace(result, extensions={**result.extensions, "cnt": str(count)}))
+            for event, result, count in closed
+        ]
+
+    def _convert_one(self, line: str) -> str:
+        return self.encoder.encode_event(self._parse(line))
+
+    def _convert_filtered(self, line: str) -> str | None:
+        return self._encode_filtered(self._parse(line))
+
+    def _encode_filtered(self, event: ParsedEvent) -> str | None:
+        result: MappingResult = self.mapping.map(event)
+        if self.policy is not None and not self.policy.admit(event, result, self.mapping):
+            return None
+        if self.enricher is not None:
+            self.enricher.enrich(result.extensions)
+        if self.suppressor is not None and not self.suppressor.offer(event, result):
+            return None
+        return self.encoder.encode(event, result)
+
+    def _convert_measured(
+        self,
+        items: Iterable[Any],
+        offset: int,
+        metrics: Metrics,
+        parse: Callable[[Any], ParsedEvent],
+        describe: Callable[[Any], str],
+    ) -> BatchResult:
+        records = self.release_suppressed()
+        errors: list[ConversionError] = []
+        sample = MetricsSample()
+        parse_time = sample.histogram("parse").observe
+        map_time = sample.histogram("map").observe
+        encode_time = sample.histogram("encode").observe
+        events = sample.events
+        mapping = self.mapping
+        router = find_router(mapping)
+        encode = self.encoder.encode
+        policy = self.policy
+        enrich = self.enricher.enrich if self.enricher is not None else None
+        suppressor = self.suppressor
+        clock = perf_counter_ns
+        for index, item in enumerate(items, offset):
+            try:
+                started = clock()
+                event = parse(item)
+                parsed = clock()
+                result = mapping.map(event)
+                # policies and enrichment are accounted to the map stage
+                admitted = policy is None or policy.admit(event, result, mapping)
+                if admitted and enrich is not None:
+                    enrich(result.extensions)
+                mapped = clock()
+                if admitted and (suppressor is None or suppressor.offer(event, result)):
+                    records.append(encode(event, result))
+                    encode_time(clock() - mapped)
+            except Exception as exc:
+                if self.strict:
+                    raise
+                line = describe(item)
+                errors.append(ConversionError(index, line, type(exc).__name__, str(exc)))
+                if self.fallback:
+                    records.append(self._fallback(line, exc))
+                sample.failed += 1
+                continue
+            parse_time(parsed - started)
+            map_time(mapped - parsed)
+            key = (
+                (router.last_routed() if router else mapping).name,
+                "syslog" if isinstance(event, SyslogEvent) else "json",
+            )
+            events[key] = events.get(key, 0) + 1
+        metrics.record(sample)
+        return BatchResult(records, errors)
+
+    def _document_event(self, document: MappingABC[str, Any] | str) -> ParsedEvent:
+        if isinstance(document, str):
+            document = _json.loads(document)
+            if not isinstance(document, MappingABC):
+                raise ValueError("JSON document must be an object")
+        return from_json(document, default_tz=self.default_tz, fields=self.required_fields)
+
+    def _parse(self, line: str) -> ParsedEvent:
+        if self.input_format:
+            try:
+                return self._parse_forced(line)
+            except Exception:
+                if self.strict:
+                    raise
+        return _parse_line_to_event(line, default_tz=self.default_tz, fields=self.required_fields)
+
+    def _parse_forced(self, line: str) -> ParsedEvent:
+        if self.input_format == "json":
+            text = line.strip()
+            data = _json.loads(text)
+            if not isinstance(data, MappingABC):
+                raise ValueError("JSON log line must be an object")
+            return from_json(
+                data, default_tz=self.default_tz, fields=self.required_fields, raw_text=text
+            )
+        syslog = parse_syslog(line, default_tz=self.default_tz)
+        return syslog.as_event(self.default_tz, fields=self.required_fields)
+
+    def _fallback(self, line: str, exc: Exception) -> str:
+        fallback_event = ParsedEvent(
+            timestamp=None,
+            host=None,
+            app_name=None,
+            priority=None,
+            message=line.strip(),
+            fields={
+                "flexString1": "parse_error",
+                "cs1Label": "error",
+                "cs1": sanitize_text(str(exc)),
+            },
+            raw=None,
+            source=self.source,
+        )
+        return self.fallback_encoder.encode_event(fallback_event)
+
+
+def convert_many(
+    lines: Iterable[str | bytes],
+    source: str | None = None,
+    mapping: Mapping | None = None,
+    *,
+    vendor: str = DEFAULT_VENDOR,
+    product: str = DEFAULT_PRODUCT,
+    version: str = DEFAULT_VERSION,
+    default_tz: tzinfo | None = None,
+    strict: bool = False,
+    input_format: str | None = None,
+) -> BatchResult:
+    """Convert every line and return the CEF records plus per-line errors.
+
+    Lines that fail to parse still yield the same tagged fallback record as
+    :func:`convert_line`; they are additionally reported in ``errors``.
+    """
+
+    converter = BatchConverter(
+        source,
+        mapping,
+        vendor=vendor,
+        product=product,
+        version=version,
+        default_tz=default_tz,
+        strict=strict,
+        input_format=input_format,
+    )
+    return converter.convert(lines)
+
+
+def convert_stream(
+    lines: Iterable[str | bytes],
+    source: str | None = None,
+    mapping: Mapping | None = None,
+    *,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    vendor: str = DEFAULT_VENDOR,
+    product: str = DEFAULT_PRODUCT,
+    version: str = DEFAULT_VERSION,
+    default_tz: tzinfo | None = None,
+    strict: bool = False,
+    input_format: str | None = None,
+) -> Iterator[BatchResult]:
+    """Lazily convert ``lines`` and yield one :class:`BatchResult` per batch."""
+
+    converter = BatchConverter(
+        source,
+        mapping,
+        vendor=vendor,
+        product=product,
+        version=version,
+        default_tz=default_tz,
+        strict=strict,
+        input_format=input_format,
+    )
+    offset = 0
+    for batch in batched(lines, batch_size):
+        yield converter.convert(batch, offset=offset)
+        offset += len(batch)
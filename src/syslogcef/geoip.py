@@ -0,0 +1,340 @@
+from __future__ import annotations
+
+import mmap
+import socket
+import struct
+from collections.abc import Sequence
+from functools import lru_cache
+from typing import Any
+
+__all__ = [
+    "DEFAULT_GEOIP_CACHE_SIZE",
+    "GeoEnricher",
+    "MMDBError",
+    "MMDBReader",
+]
+
+DEFAULT_GEOIP_CACHE_SIZE = 65536
+
+_METADATA_MARKER = b"\xab\xcd\xefMaxMind.com"
+_METADATA_SEARCH = 128 * 1024
+_POINTER_BASE = (0, 2048, 526336, 0)
+_LONG_SIZE_BASE = (29, 285, 65821)
+_DOUBLE = struct.Struct(">d")
+_FLOAT = struct.Struct(">f")
+
+
+class MMDBError(ValueError):
+    """Raised for unreadable or corrupt MaxMind DB files."""
+
+
+class _Decoder:
+    """Decode the MaxMind DB data section format from ``buffer``.
+
+    Pointers are relative to ``base``.  :meth:`find` walks a key path
+    through maps and arrays and decodes only the value at its end; every
+    other value is skipped by its encoded length.
+    """
+
+    __slots__ = ("buffer", "base")
+
+    def __init__(self, buffer: Any, base: int) -> None:
+        self.buffer = buffer
+        self.base = base
+
+    def control(self, offset: int) -> tuple[int, int, int]:
+        """Return ``(type, size, payload offset)``; for pointers ``size`` is the target."""
+
+        buffer = self.buffer
+        ctrl = buffer[offset]
+        offset += 1
+        kind = ctrl >> 5
+        if kind == 1:
+            length = ((ctrl >> 3) & 3) + 1
+            value = int.from_bytes(buffer[offset : offset + length], "big")
+            if length < 4:
+                value |= (ctrl & 7) << (8 * length)
+            return 1, self.base + value + _POINTER_BASE[length - 1], offset + length
+        if kind == 0:
+            kind = 7 + buffer[offset]
+            offset += 1
+        size = ctrl & 0x1F
+        if size >= 29:
+            length = size - 28
+            size = _LONG_SIZE_BASE[length - 1] + int.from_bytes(
+                buffer[offset : offset + length], "big"
+            )
+            offset += length
+        return kind, size, offset
+
+    def decode(self, offset: int) -> tuple[Any, int]:
+        """Return the value at ``offset`` and the offset right after it."""
+
+        kind, size, offset = self.control(offset)
+        buffer = self.buffer
+        if kind == 1:
+            return self.decode(size)[0], offset
+        end = offset + size
+        if kind == 2:
+            return buffer[offset:end].decode("utf-8", errors="replace"), end
+        if kind == 7:
+            result = {}
+            for _ in range(size):
+                key, offset = self.decode(offset)
+                result[key], offset = self.decode(offset)
+            return result, offset
+        if kind in (5, 6, 9, 10):
+            return int.from_bytes(buffer[offset:end], "big"), end
+        if kind == 3:
+            return _DOUBLE.unpack_from(buffer, offset)[0], offset + 8
+        if kind == 11:
+            items = []
+            for _ in range(size):
+                item, offset = self.decode(offset)
+                items.append(item)
+            return items, offset
+        if kind == 8:
+            value = int.from_bytes(buffer[offset:end], "big")
+            return (value - (1 << 32) if size == 4 and value >> 31 else value), end
+        if kind == 4:
+            return bytes(buffer[offset:end]), end
+        if kind == 14:
+            return bool(size), offset
+        if kind == 15:
+            return _FLOAT.unpack_from(buffer, offset)[0], offset + 4
+        raise MMDBError(f"unexpected data type {kind} at offset {offset}")
+
+    def skip(self, offset: int) -> int:
+        kind, size, offset = self.control(offset)
+        if kind == 1 or kind == 14:
+            return offset
+        if kind == 7:
+            size *= 2
+        elif kind != 11:
+            return offset + size
+        for _ in range(size):
+            offset = self.skip(offset)
+        return offset
+
+    def find(self, offset: int, path: Sequence[str | int]) -> Any:
+        """Decode the value at ``path`` below the map at ``offset`` (``None`` if absent)."""
+
+        for key in path:
+            kind, size, offset = self.control(offset)
+            if kind == 1:
+                kind, size, offset = self.control(size)
+            if kind == 7 and isinstance(key, str):
+                for _ in range(size):
+                    name, offset = self.decode(offset)
+                    if name == key:
+                        break
+                    offset = self.skip(offset)
+                else:
+                    return None
+            elif kind == 11 and isinstance(key, int) and 0 <= key < size:
+                for _ in range(key):
+                    offset = self.skip(offset)
+            else:
+                return None
+        return self.decode(offset)[0]
+
+
+class MMDBReader:
+    """Read a MaxMind DB (``.mmdb``) file, e.g. GeoLite2-City or GeoLite2-ASN.
+
+    The file is memory-mapped and nothing is decoded up front: a lookup walks
+    the search tree for the address and decodes only the record (``get``) or
+    the fields (``lookup``) asked for.
+    """
+
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as handle:
+            try:
+                self._map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError as exc:  # empty file
+                raise MMDBError(f"{path} is not a MaxMind DB file") from exc
+        try:
+            marker = self._map.rfind(_METADATA_MARKER, max(0, len(self._map) - _METADATA_SEARCH))
+            if marker < 0:
+                raise MMDBError(f"{path} is not a MaxMind DB file")
+            start = marker + len(_METADATA_MARKER)
+            metadata = _Decoder(self._map, start).decode(start)[0]
+            if not isinstance(metadata, dict):
+                raise MMDBError(f"{path} has invalid metadata")
+            self.metadata: dict[str, Any] = metadata
+            self.node_count = int(metadata["node_count"])
+            self.record_size = int(metadata["record_size"])
+            self.ip_version = int(metadata["ip_version"])
+            if self.record_size not in (24, 28, 32):
+                raise MMDBError(f"unsupported record size {self.record_size}")
+        except (KeyError, IndexError, TypeError, struct.error) as exc:
+            self._map.close()
+            raise MMDBError(f"{path} has invalid metadata: {exc}") from None
+        except MMDBError:
+            self._map.close()
+            raise
+        self.database_type = str(metadata.get("database_type", ""))
+        self._tree_size = self.node_count * self.record_size // 4
+        self._decoder = _Decoder(self._map, self._tree_size + 16)
+        self._ipv4_start = 0
+        if self.ip_version == 6:
+            node = 0
+            for _ in range(96):
+                if node >= self.node_count:
+                    break
+                node = self._record(node, 0)
+            self._ipv4_start = node
+
+    def __enter__(self) -> MMDBReader:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._map.close()
+
+    def get(self, address: str) -> Any:
+        """Return the full record for ``address``, or ``None``."""
+
+        offset = self._find(address)
+        return None if offset is None else self._decoder.decode(offset)[0]
+
+    def lookup(self, address: str, paths: Sequence[Sequence[str | int]]) -> list[Any] | None:
+        """Return the values at ``paths`` in the record for ``address``, or ``None``."""
+
+        offset = self._find(address)
+        if offset is None:
+            return None
+        find = self._decoder.find
+        return [find(offset, path) for path in paths]
+
+    def _find(self, address: str) -> int | None:
+        packed = _pack(address)
+        if packed is None:
+            return None
+        node_count = self.node_count
+        if len(packed) == 4:
+            node = self._ipv4_start
+        elif self.ip_version == 4:
+            return None
+        else:
+            node = 0
+        record = self._record
+        for index in range(len(packed) * 8):
+            if node >= node_count:
+                break
+            node = record(node, (packed[index >> 3] >> (7 - (index & 7))) & 1)
+        if node <= node_count:
+            return None  # node_count marks "no data"; anything less ran out of bits
+        return self._tree_size + node - node_count
+
+    def _record(self, node: int, bit: int) -> int:
+        buffer = self._map
+        size = self.record_size
+        if size == 24:
+            offset = node * 6 + bit * 3
+            return int.from_bytes(buffer[offset : offset + 3], "big")
+        if size == 28:
+            offset = node * 7
+            if bit:
+                return ((buffer[offset + 3] & 0x0F) << 24) | int.from_bytes(
+                    buffer[offset + 4 : offset + 7], "big"
+                )
+            return ((buffer[offset + 3] & 0xF0) << 20) | int.from_bytes(
+                buffer[offset : offset + 3], "big"
+            )
+        offset = node * 8 + bit * 4
+        return int.from_bytes(buffer[offset : offset + 4], "big")
+
+
+def _pack(address: str) -> bytes | None:
+    try:
+        return socket.inet_pton(socket.AF_INET, address)
+    except OSError:
+        pass
+    try:
+        return socket.inet_pton(socket.AF_INET6, address)
+    except OSError:
+        return None
+
+
+_CITY_PATHS = (
+    ("location", "latitude"),
+    ("location", "longitude"),
+    ("country", "iso_code"),
+    ("registered_country", "iso_code"),
+)
+_ASN_PATHS = (("autonomous_system_number",),)
+# (address extension, latitude, longitude, country string, ASN number) per direction
+_DIRECTIONS = (
+    ("src", "slat", "slong", ("cs5", "cs5Label", "srcCountry"), ("cn1", "cn1Label", "srcAsn")),
+    ("dst", "dlat", "dlong", ("cs6", "cs6Label", "dstCountry"), ("cn2", "cn2Label", "dstAsn")),
+)
+
+
+class GeoEnricher:
+    """Add location, country and ASN extensions for the ``src``/``dst`` addresses.
+
+    ``city`` is a GeoIP2/GeoLite2 City or Country database and ``asn`` an
+    ASN database; either may be omitted.  Source addresses get ``slat``/``slong``,
+    the ISO country code in ``cs5`` (label ``srcCountry``) and the AS number in
+    ``cn1`` (``srcAsn``); destinations get ``dlat``/``dlong``, ``cs6`` and
+    ``cn2``.  Extensions the mapping already set are left alone.  Results are
+    kept per address in an LRU of ``cache_size`` entries, so repeated
+    addresses cost one dictionary lookup.
+    """
+
+    def __init__(
+        self,
+        city: MMDBReader | None = None,
+        asn: MMDBReader | None = None,
+        *,
+        cache_size: int = DEFAULT_GEOIP_CACHE_SIZE,
+    ) -> None:
+        if city is None and asn is None:
+            raise ValueError("GeoEnricher needs a city/country or an ASN database")
+        self.city = city
+        self.asn = asn
+        self.locate = lru_cache(maxsize=cache_size)(self._locate)
+
+    def enrich(self, extensions: dict[str, str]) -> None:
+        for address_key, lat_key, lon_key, country, asn in _DIRECTIONS:
+            address = extensions.get(address_key)
+            if not address:
+                continue
+            location = self.locate(address)
+            if location is None:
+                continue
+            latitude, longitude, country_code, asn_number = location
+            if latitude and lat_key not in extensions:
+                extensions[lat_key] = latitude
+                extensions[lon_key] = longitude
+            if country_code and country[0] not in extensions:
+                extensions[country[0]] = country_code
+                extensions[country[1]] = country[2]
+            if asn_number and asn[0] not in extensions:
+                extensions[asn[0]] = asn_number
+                extensions[asn[1]] = asn[2]
+
+    def close(self) -> None:
+        for reader in (self.city, self.asn):
+            if reader is not None:
+                reader.close()
+
+    def _locate(self, address: str) -> tuple[str, str, str, str] | None:
+        latitude = longitude = country_code = asn_number = ""
+        if self.city is not None:
+            values = self.city.lookup(address, _CITY_PATHS)
+            if values is not None:
+                lat, lon, country, registered = values
+                if isinstance(lat, float) and isinstance(lon, float):
+                    latitude, longitude = f"{lat:.4f}", f"{lon:.4f}"
+                country_code = str(country or registered or "")
+        if self.asn is not None:
+            values = self.asn.lookup(address, _ASN_PATHS)
+            if values is not None and values[0] is not None:
+                asn_number = str(values[0])
+        if not (latitude or country_code or asn_number):
+            return None
+        return latitude, longitude, country_code, asn_number
@@ -0,0 +1,390 @@
+from __future__ import annotations
+
+import codecs
+import json
+import re
+import time
+from collections.abc import Iterator
+from typing import Any, BinaryIO
+
+__all__ = [
+    "DEFAULT_BLOCK_SIZE",
+    "DEFAULT_MAX_DOCUMENT",
+    "decode_block",
+    "flatten_document",
+    "iter_documents",
+    "read_document_batches",
+    "read_line_batches",
+]
+
+DEFAULT_BLOCK_SIZE = 1 << 20
+# Objects larger than this (in characters) are decoded member by member.
+DEFAULT_MAX_DOCUMENT = 16 << 20
+
+_WHITESPACE_RE = re.compile(r"[ \t\r\n]*")
+_SEPARATOR_RE = re.compile(r"[ \t\r\n,]*")
+_BULK_ACTIONS = frozenset({"index", "create", "update", "delete"})
+
+
+def decode_block(block: bytes) -> list[str]:
+    """Decode a block of complete ``\\n`` terminated lines.
+
+    Pure ASCII blocks (the common case for syslog feeds) take the cheap ASCII
+    codec; anything else is decoded as UTF-8 with replacement characters, the
+    same policy the text reader applies.  ``\\r\\n`` and lone ``\\r`` are treated
+    as line breaks, matching universal-newline text mode.
+    """
+
+    if block.isascii():
+        text = block.decode("ascii")
+    else:
+        text = block.decode("utf-8", errors="replace")
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    lines = text.split("\n")
+    if lines and not lines[-1]:
+        lines.pop()
+    return lines
+
+
+def read_line_batches(
+    stream: BinaryIO,
+    batch_size: int,
+    *,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    follow: bool = False,
+    poll_interval: float = 0.5,
+) -> Iterator[list[str]]:
+    """Yield batches of decoded lines read from ``stream`` in large blocks.
+
+    Blocks are split on the last newline; the partial tail is carried into the
+    next read.  With ``follow`` the reader keeps polling at end of file and
+    yields an empty batch (a flush marker for :func:`~syslogcef.pipeline.ordered_map`)
+    whenever it goes idle after producing data.
+    """
+
+    read = getattr(stream, "read1", stream.read)
+    pending = b""
+    idle = True
+    while True:
+        block = read(block_size)
+        if not block:
+            if not follow:
+                break
+            if not idle:
+                idle = True
+                yield []
+            time.sleep(poll_interval)
+            continue
+        idle = False
+        if pending:
+            block = pending + block
+        cut = block.rfind(b"\n") + 1
+        if not cut:
+            pending = block
+            continue
+        # anything after the last "\n" (including a "\r" whose "\n" has not
+        # arrived yet) waits for the next read
+        pending = block[cut:]
+        lines = decode_block(block[:cut])
+        for start in range(0, len(lines), batch_size):
+            yield lines[start : start + batch_size]
+    if pending:
+        yield decode_block(pending + b"\n")
+
+
+class _DocumentTooLarge(Exception):
+    pass
+
+
+class _JSONStream:
+    """Incrementally decoded JSON text read from a binary stream."""
+
+    def __init__(self, stream: BinaryIO, block_size: int, max_document: int) -> None:
+        self._read = getattr(stream, "read1", stream.read)
+        self._decode = codecs.getincrementaldecoder("utf-8")(errors="replace").decode
+        self._raw_decode = json.JSONDecoder().raw_decode
+        self.block_size = block_size
+        self.max_document = max_document
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        # arrays and streamed objects currently open, and where the array
+        # element being read starts (kept while it fits max_document), for resync()
+        self.depth = 0
+        self.mark: int | None = None
+
+    def fill(self) -> bool:
+        """Append the next block to the buffer, dropping what was consumed."""
+
+        if self.eof:
+            return False
+        block = self._read(self.block_size)
+        if not block:
+            self.eof = True
+        text = self._decode(block, final=self.eof)
+        keep = self.pos
+        if self.mark is not None and self.pos - self.mark <= self.max_document:
+            keep = self.mark
+            self.mark = 0
+        else:
+            self.mark = None
+        self.buffer = self.buffer[keep:] + text
+        self.pos -= keep
+        return bool(text) or not self.eof
+
+    def peek(self, skip: re.Pattern[str] = _WHITESPACE_RE) -> str:
+        """Skip ``skip`` and return the next character, or ``""`` at the end."""
+
+        while True:
+            self.pos = skip.match(self.buffer, self.pos).end()  # type: ignore[union-attr]
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill():
+                return ""
+
+    def decode(self) -> Any:
+        """Decode the value at the current position, reading more input as needed."""
+
+        while True:
+            try:
+                value, end = self._raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError as exc:
+                # JSON strings cannot contain raw newlines, so an error with a
+                # newline after it is a real syntax error, not a short read
+                if self.eof or self.buffer.find("\n", exc.pos) != -1:
+                    raise
+                if len(self.buffer) - self.pos > self.max_document:
+                    raise _DocumentTooLarge from None
+                self.fill()
+                continue
+            if end == len(self.buffer) and not self.eof:
+                # a number or literal may continue in the next block
+                self.fill()
+                continue
+            self.pos = end
+            return value
+
+    def documents(self) -> Iterator[Any]:
+        """Yield the documents contained in the value at the current position."""
+
+        char = self.peek()
+        if char == "[":
+            self.pos += 1
+            self.depth += 1
+            while (char := self.peek(_SEPARATOR_RE)) != "]":
+                if not char:
+                    raise json.JSONDecodeError(
+                        "unexpected end of JSON array", self.buffer, self.pos
+                    )
+                depth = self.depth
+                self.mark = self.pos
+                try:
+                    yield from self.documents()
+                except json.JSONDecodeError:
+                    # skip just the broken element; the rest of the array is still good
+                    text = self.resync(self.depth - depth)
+                    self.depth = depth
+                    if text is None:
+                        raise
+                    yield text
+                self.mark = None
+            self.pos += 1
+            self.depth -= 1
+            return
+        if char == "{":
+            try:
+                value = self.decode()
+            except _DocumentTooLarge:
+                yield from self._stream_object()
+                return
+            yield from _unwrap(value)
+            return
+        yield from _unwrap(self.decode())
+
+    def _stream_object(self) -> Iterator[Any]:
+        # Decode a large object member by member so a ``hits`` array is never
+        # held in memory as a whole.
+        self.pos += 1
+        self.depth += 1
+        members: dict[str, Any] = {}
+        streamed = False
+        while (char := self.peek(_SEPARATOR_RE)) != "}":
+            if char != '"':
+                raise json.JSONDecodeError("invalid JSON object member", self.buffer, self.pos)
+            key = self.decode()
+            if self.peek() != ":":
+                raise json.JSONDecodeError(
+                    f"expected ':' after JSON key {key!r}", self.buffer, self.pos
+                )
+            self.pos += 1
+            if self.peek() in ("[", "{") and key == "hits":
+                streamed = True
+                yield from self.documents()
+                continue
+            try:
+                members[key] = self.decode()
+            except _DocumentTooLarge:
+                raise json.JSONDecodeError(
+                    f"JSON value of {key!r} exceeds {self.max_document} characters",
+                    self.buffer,
+                    self.pos,
+                ) from None
+        self.pos += 1
+        self.depth -= 1
+        if not streamed:
+            yield from _unwrap(members)
+
+    def resync(self, nesting: int) -> str | None:
+        """Skip to the ``,`` or ``]`` that ends a broken array element and return its text.
+
+        ``nesting`` containers of the element were already consumed.  Returns
+        ``None``, without consuming anything, if the input ends first.
+        """
+
+        index = self.pos
+        in_string = escaped = False
+        while True:
+            if index == len(self.buffer):
+                offset = index - self.pos
+                if not self.fill():
+                    return None
+                index = self.pos + offset
+                continue
+            char = self.buffer[index]
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif char == "\\":
+                    escaped = True
+                elif char == '"':
+                    in_string = False
+            elif char == '"':
+                in_string = True
+            elif char in "[{":
+                nesting += 1
+            elif char in "]}":
+                if nesting:
+                    nesting -= 1
+                elif char == "]":
+                    break
+            elif char == "," and not nesting:
+                break
+            index += 1
+        start = self.pos if self.mark is None else self.mark
+        self.pos = index
+        return self.buffer[start:index].strip()
+
+    def skip_invalid(self, error: json.JSONDecodeError) -> str:
+        """Consume the rest of the line holding ``error`` and return its text."""
+
+        end = self.buffer.find("\n", error.pos)
+        if end == -1:
+            end = len(self.buffer)
+        text = self.buffer[self.pos : end].strip()
+        self.pos = end
+        return text
+
+
+def _unwrap(value: Any) -> Iterator[dict[str, Any] | str]:
+    if isinstance(value, list):
+        for item in value:
+            yield from _unwrap(item)
+        return
+    if not isinstance(value, dict):
+        # valid JSON but not an object: pass it on so the converter reports it
+        yield json.dumps(value)
+        return
+    hits = value.get("hits")
+    if isinstance(hits, dict) and isinstance(hits.get("hits"), list):
+        yield from _unwrap(hits["hits"])
+    elif isinstance(hits, list) and hits and isinstance(hits[0], dict) and "_source" in hits[0]:
+        yield from _unwrap(hits)
+    elif isinstance(value.get("_source"), dict):
+        yield flatten_document(value["_source"])
+    elif _is_bulk_action(value):
+        return  # bulk API action line; its document follows on the next line
+    else:
+        yield flatten_document(value)
+
+
+def _is_bulk_action(value: dict[str, Any]) -> bool:
+    # {"index": {"_id": "1"}}, but {"index": "web"} is an ordinary document
+    if len(value) != 1:
+        return False
+    ((action, meta),) = value.items()
+    return action in _BULK_ACTIONS and isinstance(meta, dict)
+
+
+def flatten_document(document: dict[str, Any]) -> dict[str, Any]:
+    """Flatten nested objects into dotted keys: ``{"a": {"b": 1}}`` -> ``{"a.b": 1}``.
+
+    Documents without nested objects are returned unchanged, without a copy.
+    """
+
+    for value in document.values():
+        if value.__class__ is dict:
+            break
+    else:
+        return document
+    flat: dict[str, Any] = {}
+    _flatten_into(flat, document, "")
+    return flat
+
+
+def _flatten_into(flat: dict[str, Any], document: dict[str, Any], prefix: str) -> None:
+    for key, value in document.items():
+        if value.__class__ is dict and value:
+            _flatten_into(flat, value, f"{prefix}{key}.")
+        else:
+            flat[prefix + key] = value
+
+
+def iter_documents(
+    stream: BinaryIO,
+    *,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    max_document: int = DEFAULT_MAX_DOCUMENT,
+) -> Iterator[dict[str, Any] | str]:
+    """Stream JSON documents from NDJSON, bulk files and Elasticsearch exports.
+
+    Accepts one object per line (including ``_bulk`` files, whose action lines
+    are skipped), concatenated or pretty-printed objects, top-level arrays and
+    search responses (``{"hits": {"hits": [...]}}``); hits yield their
+    ``_source``.  Input is decoded incrementally with ``raw_decode`` and
+    arrays are walked element by element, so memory stays bounded by the
+    largest single document.  Objects bigger than ``max_document`` characters
+    are decoded member by member, which lets a single multi-gigabyte search
+    response stream its hits.  Documents are flattened with
+    :func:`flatten_document`.  Text that is not valid JSON is yielded as a
+    ``str`` (up to the end of its line, or inside an array up to the next
+    element) so the caller can report it, and so are values that are not
+    objects; input that ends inside an array or object yields its unread
+    rest, which may be empty.
+    """
+
+    reader = _JSONStream(stream, block_size, max_document)
+    while reader.peek(_SEPARATOR_RE):
+        try:
+            yield from reader.documents()
+        except json.JSONDecodeError as exc:
+            yield reader.skip_invalid(exc)
+
+
+def read_document_batches(
+    stream: BinaryIO,
+    batch_size: int,
+    *,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    max_document: int = DEFAULT_MAX_DOCUMENT,
+) -> Iterator[list[dict[str, Any] | str]]:
+    """Batch :func:`iter_documents` for :meth:`BatchConverter.convert_documents`."""
+
+    batch: list[dict[str, Any] | str] = []
+    for document in iter_documents(stream, block_size=block_size, max_document=max_document):
+        batch.append(document)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
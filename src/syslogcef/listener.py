@@ -0,0 +1,345 @@
+from __future__ import annotations
+
+import asyncio
+import socket
+import sys
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass
+
+__all__ = [
+    "DEFAULT_MAX_FRAME",
+    "DEFAULT_QUEUE_SIZE",
+    "DEFAULT_RCVBUF",
+    "FrameDecoder",
+    "FramingError",
+    "ListenerStats",
+    "SyslogListener",
+    "parse_endpoint",
+    "serve",
+]
+
+DEFAULT_QUEUE_SIZE = 10_000
+DEFAULT_RCVBUF = 8 << 20
+DEFAULT_MAX_FRAME = 64 << 10
+
+# Datagrams read per readiness callback; emulates recvmmsg() without a syscall
+# per event-loop iteration.
+_UDP_DRAIN_LIMIT = 512
+_UDP_MAX_DATAGRAM = 65535
+_TCP_READ_SIZE = 256 << 10
+# Linux reports kernel receive-queue drops as ancillary data when this is set.
+_SO_RXQ_OVFL = getattr(socket, "SO_RXQ_OVFL", 40)
+
+
+class FramingError(ValueError):
+    """Raised when a TCP stream cannot be split into syslog frames."""
+
+
+@dataclass(slots=True)
+class ListenerStats:
+    """Counters for one bound socket."""
+
+    name: str
+    received: int = 0
+    dropped: int = 0
+    kernel_dropped: int = 0
+    framing_errors: int = 0
+    connections: int = 0
+    max_queue_depth: int = 0
+
+    def format(self) -> str:
+        return (
+            f"listener={self.name} received={self.received} dropped={self.dropped} "
+            f"kernel_dropped={self.kernel_dropped} framing_errors={self.framing_errors} "
+            f"connections={self.connections} max_queue_depth={self.max_queue_depth}"
+        )
+
+
+def parse_endpoint(text: str, default_host: str = "0.0.0.0") -> tuple[str, int]:
+    """Parse ``HOST:PORT``, ``[V6]:PORT``, ``:PORT`` or ``PORT``."""
+
+    host, sep, port = text.rpartition(":")
+    if not sep:
+        host = ""
+    host = host.strip("[]") or default_host
+    try:
+        number = int(port)
+    except ValueError:
+        raise ValueError(f"invalid listen address: {text!r}") from None
+    if not 0 <= number <= 65535:
+        raise ValueError(f"invalid port in listen address: {text!r}")
+    return host, number
+
+
+class FrameDecoder:
+    """Split an RFC 6587 TCP byte stream into syslog messages.
+
+    Each frame is either octet-counted (``LEN SP MSG``) or terminated by a
+    newline; the method is chosen per frame from its first byte, the same way
+    rsyslog does it.
+    """
+
+    def __init__(self, max_frame: int = DEFAULT_MAX_FRAME) -> None:
+        self.max_frame = max_frame
+        self._buffer = bytearray()
+
+    def feed(self, data: bytes) -> list[bytes]:
+        buffer = self._buffer
+        buffer += data
+        frames: list[bytes] = []
+        size = len(buffer)
+        pos = 0
+        while pos < size:
+            if 0x30 <= buffer[pos] <= 0x39:
+                space = buffer.find(b" ", pos, min(size, pos + 11))
+                if space == -1 and size - pos <= 10 and buffer.find(b"\n", pos) == -1:
+                    break  # the length prefix is not complete yet
+                if space != -1 and buffer[pos:space].isdigit():
+                    length = int(buffer[pos:space])
+                    if length > self.max_frame:
+                        raise FramingError(f"frame of {length} bytes exceeds {self.max_frame}")
+                    end = space + 1 + length
+                    if end > size:
+                        break
+                    frames.append(bytes(buffer[space + 1 : end]))
+                    pos = end
+                    continue
+            newline = buffer.find(b"\n", pos)
+            if newline == -1:
+                if size - pos > self.max_frame:
+                    raise FramingError(f"unterminated frame exceeds {self.max_frame} bytes")
+                break
+            end = newline - 1 if newline > pos and buffer[newline - 1] == 0x0D else newline
+            if end > pos:
+                frames.append(bytes(buffer[pos:end]))
+            pos = newline + 1
+        del buffer[:pos]
+        return frames
+
+    def finish(self) -> list[bytes]:
+        """Return a trailing message that was not newline terminated."""
+
+        tail = bytes(self._buffer).rstrip(b"\r")
+        self._buffer.clear()
+        return [tail] if tail else []
+
+
+class SyslogListener:
+    """Receive syslog over UDP and TCP into one bounded queue.
+
+    UDP datagrams that arrive while the queue is full are dropped and counted;
+    TCP readers wait for space instead, pushing back on the sender.
+    """
+
+    def __init__(
+        self,
+        *,
+        udp: Iterable[tuple[str, int]] = (),
+        tcp: Iterable[tuple[str, int]] = (),
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        rcvbuf: int = DEFAULT_RCVBUF,
+        max_frame: int = DEFAULT_MAX_FRAME,
+    ) -> None:
+        self.udp = list(udp)
+        self.tcp = list(tcp)
+        self.rcvbuf = rcvbuf
+        self.max_frame = max_frame
+        self.stats: list[ListenerStats] = []
+        self.addresses: list[tuple[str, str, int]] = []
+        self._queue: asyncio.Queue[bytes] = asyncio.Queue(maxsize=queue_size)
+        self._sockets: list[socket.socket] = []
+        self._servers: list[asyncio.Server] = []
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        for host, port in self.udp:
+            self._start_udp(host, port)
+        for host, port in self.tcp:
+            await self._start_tcp(host, port)
+
+    async def next_batch(self, batch_size: int) -> list[bytes]:
+        """Wait for at least one message and return up to ``batch_size`` of them."""
+
+        batch = [await self._queue.get()]
+        while len(batch) < batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        return batch
+
+    def drain(self, batch_size: int) -> Iterator[list[bytes]]:
+        """Yield whatever is still queued, without waiting."""
+
+        batch: list[bytes] = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def close(self) -> None:
+        for sock in self._sockets:
+            if self._loop is not None:
+                self._loop.remove_reader(sock.fileno())
+            sock.close()
+        self._sockets.clear()
+        for server in self._servers:
+            server.close()
+        self._servers.clear()
+
+    def _offer(self, message: bytes, stats: ListenerStats) -> None:
+        stats.received += 1
+        try:
+            self._queue.put_nowait(message)
+        except asyncio.QueueFull:
+            stats.dropped += 1
+            return
+        depth = self._queue.qsize()
+        if depth > stats.max_queue_depth:
+            stats.max_queue_depth = depth
+
+    def _start_udp(self, host: str, port: int) -> None:
+        assert self._loop is not None
+        family, kind, proto, _, address = socket.getaddrinfo(host, port, type=socket.SOCK_DGRAM)[0]
+        sock = socket.socket(family, kind, proto)
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            _set_rcvbuf(sock, self.rcvbuf)
+            sock.bind(address)
+            sock.setblocking(False)
+        except OSError:
+            sock.close()
+            raise
+        overflow = False
+        if sys.platform.startswith("linux"):
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, _SO_RXQ_OVFL, 1)
+                overflow = True
+            except OSError:
+                pass
+        bound_host, bound_port = sock.getsockname()[:2]
+        stats = ListenerStats(f"udp://{_format_host(bound_host)}:{bound_port}")
+        self.stats.append(stats)
+        self.addresses.append(("udp", bound_host, bound_port))
+        self._sockets.append(sock)
+        self._loop.add_reader(sock.fileno(), self._drain_udp, sock, stats, overflow)
+
+    def _drain_udp(self, sock: socket.socket, stats: ListenerStats, overflow: bool) -> None:
+        ancillary = socket.CMSG_SPACE(4) if overflow else 0
+        for _ in range(_UDP_DRAIN_LIMIT):
+            try:
+                if overflow:
+                    data, cmsgs, _, _ = sock.recvmsg(_UDP_MAX_DATAGRAM, ancillary)
+                    for level, kind, value in cmsgs:
+                        if level == socket.SOL_SOCKET and kind == _SO_RXQ_OVFL:
+                            stats.kernel_dropped = int.from_bytes(value[:4], sys.byteorder)
+                else:
+                    data = sock.recv(_UDP_MAX_DATAGRAM)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                return
+            # One datagram is one message (RFC 5426), which may span lines itself.
+            if data.endswith(b"\n"):
+                data = data[:-2] if data.endswith(b"\r\n") else data[:-1]
+            if data:
+                self._offer(data, stats)
+
+    async def _start_tcp(self, host: str, port: int) -> None:
+        stats = ListenerStats("")
+
+        async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+            stats.connections += 1
+            sock = writer.get_extra_info("socket")
+            if sock is not None:
+                _set_rcvbuf(sock, self.rcvbuf)
+            decoder = FrameDecoder(self.max_frame)
+            try:
+                while True:
+                    data = await reader.read(_TCP_READ_SIZE)
+                    if not data:
+                        frames = decoder.finish()
+                    else:
+                        frames = decoder.feed(data)
+                    for frame in frames:
+                        stats.received += 1
+                        await self._queue.put(frame)
+                        depth = self._queue.qsize()
+                        if depth > stats.max_queue_depth:
+                            stats.max_queue_depth = depth
+                    if not data:
+                        break
+            except FramingError:
+                stats.framing_errors += 1
+            except ConnectionError:
+                pass
+            finally:
+                writer.close()
+
+        server = await asyncio.start_server(handle, host, port, reuse_address=True)
+        bound_host, bound_port = server.sockets[0].getsockname()[:2]
+        stats.name = f"tcp://{_format_host(bound_host)}:{bound_port}"
+        self.stats.append(stats)
+        self.addresses.append(("tcp", bound_host, bound_port))
+        self._servers.append(server)
+
+
+async def serve(
+    listener: SyslogListener,
+    handle: Callable[[list[bytes]], object],
+    *,
+    batch_size: int,
+    stop: asyncio.Event,
+    idle: float | None = None,
+) -> None:
+    """Feed queued messages to ``handle`` in batches until ``stop`` is set.
+
+    ``handle`` runs in the default executor so sockets keep draining while a
+    batch is converted; batches are handled one at a time, in arrival order.
+    With ``idle``, ``handle`` also gets an empty batch after every ``idle``
+    seconds without messages, so it can flush time-based state.  Messages
+    still queued when ``stop`` is set are handled before returning.
+    """
+
+    loop = asyncio.get_running_loop()
+    stopped = asyncio.ensure_future(stop.wait())
+    getter: asyncio.Task[list[bytes]] | None = None
+    try:
+        while not stop.is_set():
+            if getter is None:
+                getter = asyncio.ensure_future(listener.next_batch(batch_size))
+            await asyncio.wait({getter, stopped}, timeout=idle, return_when=asyncio.FIRST_COMPLETED)
+            if getter.done():
+                batch, getter = getter.result(), None
+                await loop.run_in_executor(None, handle, batch)
+            elif not stop.is_set():
+                await loop.run_in_executor(None, handle, [])
+    finally:
+        if getter is not None:
+            getter.cancel()
+        stopped.cancel()
+        listener.close()
+        for batch in listener.drain(batch_size):
+            handle(batch)
+
+
+def _set_rcvbuf(sock: socket.socket, size: int) -> None:
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, size)
+    except OSError:
+        pass  # capped by net.core.rmem_max; keep the kernel default
+
+
+def _format_host(host: str) -> str:
+    return f"[{host}]" if ":" in host else host
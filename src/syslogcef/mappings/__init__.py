@@ -5,12 +5,15 @@ from .cisco import mapping as cisco
 from .default import mapping as default
 from .f5 import mapping as f5
 from .linux import mapping as linux
+from .router import SourceRouter, find_router
 from .vmware import mapping as vmware
 
 __all__ = [
     "BaseMapping",
     "Mapping",
     "MappingResult",
+    "SourceRouter",
+    "find_router",
     "get_mapping",
     "cisco",
     "default",
@@ -26,12 +29,19 @@ _REGISTRY: dict[str, BaseMapping] = {
     "f5": f5,
     "vmware": vmware,
 }
+# get_mapping("auto") hands out one router so its memo is shared by every caller.
+_ROUTER: SourceRouter | None = None
 
 
 def get_mapping(name: str | None) -> BaseMapping:
+    global _ROUTER
     if not name:
         return default
     key = name.lower()
+    if key == "auto":
+        if _ROUTER is None:
+            _ROUTER = SourceRouter(_REGISTRY)
+        return _ROUTER
     try:
         return _REGISTRY[key]
     except KeyError:
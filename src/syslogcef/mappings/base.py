@@ -1,14 +1,26 @@
 from __future__ import annotations
 
+import re
+from collections.abc import Iterable
 from collections.abc import Mapping as MappingABC
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Protocol
+from typing import Any, Protocol
 
 from ..cef import priority_to_severity
 from ..utils import ParsedEvent, sanitize_text
 
-__all__ = ["Mapping", "MappingResult", "BaseMapping", "load_mapping_file"]
+__all__ = [
+    "Mapping",
+    "MappingResult",
+    "BaseMapping",
+    "KeywordClassifier",
+    "KeywordMatch",
+    "load_mapping_file",
+]
+
+# Below this many keywords a few C-level ``in`` scans beat one regex pass.
+_KEYWORD_SCAN_LIMIT = 8
 
 
 @dataclass(slots=True)
@@ -27,6 +39,9 @@ class Mapping(Protocol):
 
 class BaseMapping:
     name = "base"
+    # Field keys read by ``map``; ``None`` means all of them.  Parsers use it
+    # to skip extracting fields the mapping never looks at.
+    required_fields: frozenset[str] | None = None
 
     def map(self, event: ParsedEvent) -> MappingResult:  # pragma: no cover - to override
         severity = priority_to_severity(event.priority)
@@ -38,7 +53,99 @@ class BaseMapping:
         )
 
 
-def load_mapping_file(path: str | Path) -> dict[str, str]:
+@dataclass(slots=True, frozen=True)
+class KeywordMatch:
+    keyword: str
+    severity: int
+    category: str | None = None
+
+
+class KeywordClassifier:
+    """Classify text by the most severe keyword it contains.
+
+    ``table`` maps keywords to a severity or a ``(severity, category)`` pair.
+    Matching is case-insensitive and by substring; when several keywords
+    occur, the most severe one wins and ties go to the earlier table entry.
+    The keywords are compiled once into a trie-shaped regular expression, so
+    a message is scanned in one pass however large the table is; every
+    occurrence is considered, including overlapping ones, as an Aho-Corasick
+    automaton would.
+    """
+
+    def __init__(self, table: MappingABC[str, int | tuple[int, str | None]]) -> None:
+        entries: dict[str, KeywordMatch] = {}
+        for keyword, value in table.items():
+            key = keyword.lower()
+            if not key:
+                raise ValueError("keywords must not be empty")
+            severity, category = value if isinstance(value, tuple) else (value, None)
+            entries.setdefault(key, KeywordMatch(key, int(severity), category))
+        order = sorted(entries.values(), key=lambda match: -match.severity)
+        self._ranked = order
+        self._pattern: re.Pattern[str] | None = None
+        self._best: dict[str, KeywordMatch] = {}
+        if len(order) > _KEYWORD_SCAN_LIMIT:
+            self._pattern = re.compile(_trie_pattern(entries))
+            rank = {match.keyword: index for index, match in enumerate(order)}
+            for keyword in entries:
+                # the longest keyword found at a position stands for every
+                # keyword that is a prefix of it
+                prefixes = [keyword[:end] for end in range(1, len(keyword) + 1)]
+                self._best[keyword] = min(
+                    (entries[prefix] for prefix in prefixes if prefix in entries),
+                    key=lambda match: rank[match.keyword],
+                )
+            self._rank = {keyword: rank[match.keyword] for keyword, match in self._best.items()}
+
+    def __len__(self) -> int:
+        return len(self._ranked)
+
+    def classify(self, text: str) -> KeywordMatch | None:
+        lowered = text.lower()
+        if self._pattern is None:
+            for match in self._ranked:
+                if match.keyword in lowered:
+                    return match
+            return None
+        search = self._pattern.search
+        ranks = self._rank
+        best: str | None = None
+        best_rank = len(ranks)
+        found = search(lowered)
+        while found is not None:
+            keyword = found.group()
+            if ranks[keyword] < best_rank:
+                best, best_rank = keyword, ranks[keyword]
+                if not best_rank:
+                    break
+            found = search(lowered, found.start() + 1)
+        return None if best is None else self._best[best]
+
+
+def _trie_pattern(keywords: Iterable[str]) -> str:
+    trie: dict[str, Any] = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def build(node: dict[str, Any]) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+def load_mapping_file(path: str | Path) -> dict[str, Any]:
+    """Read a JSON/YAML mapping file: flat overrides or a declarative spec.
+
+    See :func:`syslogcef.mappings.declarative.compile_mapping`.
+    """
+
     file_path = Path(path)
     text = file_path.read_text(encoding="utf-8")
     if file_path.suffix in {".yaml", ".yml"}:
@@ -53,4 +160,4 @@ def load_mapping_file(path: str | Path) -> dict[str, str]:
         data = json.loads(text)
     if not isinstance(data, MappingABC):
         raise ValueError("Mapping file must contain a dictionary")
-    return {str(k): sanitize_text(v) for k, v in data.items()}
+    return {str(k): v for k, v in data.items()}
@@ -2,13 +2,31 @@ from __future__ import annotations
 
 from ..cef import priority_to_severity
 from ..utils import ParsedEvent, sanitize_text
-from .base import BaseMapping, MappingResult
+from .base import BaseMapping, KeywordClassifier, MappingResult
 
 __all__ = ["CiscoMapping", "mapping"]
 
 
 class CiscoMapping(BaseMapping):
     name = "cisco"
+    required_fields = frozenset(
+        {
+            "message_id",
+            "event_id",
+            "msg",
+            "event",
+            "src",
+            "dst",
+            "src_ip",
+            "dst_ip",
+            "spt",
+            "dpt",
+            "sport",
+            "dport",
+            "proto",
+            "action",
+        }
+    )
 
     def map(self, event: ParsedEvent) -> MappingResult:
         fields = event.fields
@@ -35,13 +53,14 @@ class CiscoMapping(BaseMapping):
         )
 
 
+_SEVERITY_KEYWORDS = KeywordClassifier(
+    {"deny": 8, "blocked": 8, "teardown": 8, "allow": 3, "permitted": 3}
+)
+
+
 def _severity_from_message(message: str, priority: int | None) -> int:
-    lowered = message.lower()
-    if any(token in lowered for token in ["deny", "blocked", "teardown"]):
-        return 8
-    if "allow" in lowered or "permitted" in lowered:
-        return 3
-    return priority_to_severity(priority)
+    match = _SEVERITY_KEYWORDS.classify(message)
+    return priority_to_severity(priority) if match is None else match.severity
 
 
 _NORMALIZED_KEYS = {
@@ -0,0 +1,403 @@
+from __future__ import annotations
+
+import re
+import string
+from collections import defaultdict
+from collections.abc import Callable
+from collections.abc import Mapping as MappingABC
+from typing import Any
+
+from ..cef import priority_to_severity
+from ..utils import ParsedEvent, sanitize_text
+from .base import BaseMapping, KeywordClassifier, Mapping, MappingResult
+
+__all__ = [
+    "DECLARATIVE_KEYS",
+    "DeclarativeMapping",
+    "MappingSpecError",
+    "compile_mapping",
+    "is_declarative",
+]
+
+DECLARATIVE_KEYS = frozenset(
+    {
+        "extends",
+        "signature_id",
+        "event_name",
+        "severity",
+        "extract",
+        "rename",
+        "extensions",
+        "rules",
+    }
+)
+_SPEC_KEYS = DECLARATIVE_KEYS | {"name"}
+_RULE_KEYS = frozenset({"if", "extensions", "signature_id", "event_name"})
+
+# Event attributes a template can reference as "{$name}".
+_SPECIALS = {
+    "$message": "_sanitize(event.message)",
+    "$host": "_sanitize(event.host or '')",
+    "$app_name": "_sanitize(event.app_name or '')",
+    "$source": "_sanitize(event.source or '')",
+    "$priority": "('' if event.priority is None else event.priority)",
+}
+_FORMATTER = string.Formatter()
+
+
+class MappingSpecError(ValueError):
+    """Raised when a mapping file cannot be compiled."""
+
+
+class DeclarativeMapping(BaseMapping):
+    """A mapping compiled from a declarative spec into one specialised function.
+
+    ``source`` holds the generated Python code, which is handy when debugging a
+    mapping file; ``base`` is the mapping it extends, if any.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        function: Callable[[ParsedEvent], MappingResult],
+        required_fields: frozenset[str] | None,
+        source: str,
+        base: Mapping | None = None,
+    ) -> None:
+        self.name = name
+        self.required_fields = required_fields
+        self.source = source
+        self.base = base
+        self._map = function
+
+    def map(self, event: ParsedEvent) -> MappingResult:
+        return self._map(event)
+
+
+def is_declarative(spec: MappingABC[str, Any]) -> bool:
+    """Tell a declarative spec from a flat ``{extension: template}`` override file."""
+
+    return any(key in DECLARATIVE_KEYS for key in spec)
+
+
+def compile_mapping(spec: MappingABC[str, Any], *, base: Mapping | None = None) -> BaseMapping:
+    """Compile a mapping file into a :class:`DeclarativeMapping`.
+
+    A flat override file (the historical ``--mapping-file`` format) becomes the
+    ``extensions`` of a spec that extends ``base``.  A declarative spec names
+    its own base with ``extends``; without it the mapping stands alone.
+    """
+
+    if not is_declarative(spec):
+        if base is None:
+            raise MappingSpecError("override files need a base mapping")
+        spec = {"extensions": dict(spec)}
+    elif "extends" in spec:
+        from . import get_mapping
+
+        try:
+            base = get_mapping(spec["extends"]) if spec["extends"] else None
+        except KeyError as exc:
+            raise MappingSpecError(str(exc.args[0])) from None
+    else:
+        base = None
+    unknown = set(spec) - _SPEC_KEYS
+    if unknown:
+        raise MappingSpecError(f"unknown mapping keys: {', '.join(sorted(unknown))}")
+    compiler = _Compiler(base)
+    source = compiler.generate(spec)
+    namespace = dict(compiler.constants)
+    try:
+        code = compile(source, f"<mapping {spec.get('name', 'file')}>", "exec")
+    except SyntaxError as exc:
+        raise MappingSpecError(f"cannot compile mapping: {exc.msg}") from None
+    exec(code, namespace)
+    if base is None:
+        required: frozenset[str] | None = frozenset(compiler.fields)
+    else:
+        base_fields = getattr(base, "required_fields", None)
+        required = None if base_fields is None else base_fields | compiler.fields
+    name = str(spec.get("name") or (base.name if base is not None else "declarative"))
+    return DeclarativeMapping(name, namespace["_map"], required, source, base)
+
+
+class _Compiler:
+    def __init__(self, base: Mapping | None) -> None:
+        self.base = base
+        self.fields: set[str] = set()
+        self.constants: dict[str, Any] = {
+            "_sanitize": sanitize_text,
+            "_severity": priority_to_severity,
+            "_Result": MappingResult,
+            "_with_fields": _with_fields,
+            "_format_map": _format_map,
+        }
+        self.lines: list[str] = []
+
+    def generate(self, spec: MappingABC[str, Any]) -> str:
+        emit = self.lines.append
+        emit("def _map(event):")
+        emit("    f = event.fields")
+        extractors = _as_list(spec.get("extract"), "extract")
+        if extractors:
+            emit("    f = dict(f)")
+            for extractor in extractors:
+                self._extract(extractor)
+        if self.base is not None:
+            self.constants["_base"] = self.base
+            if extractors:
+                emit("    event = _with_fields(event, f)")
+            emit("    r = _base.map(event)")
+            emit("    ext = dict(r.extensions)")
+            emit("    sig = r.signature_id")
+            emit("    name = r.name")
+            emit("    sev = r.severity")
+        else:
+            message = _SPECIALS["$message"]
+            emit(f"    message = {message}")
+            emit(
+                "    ext = {'msg': message, "
+                f"'deviceHostName': {_SPECIALS['$host']}, "
+                f"'deviceProcessName': {_SPECIALS['$app_name']}}}"
+            )
+            emit("    sig = 'generic'")
+            emit("    name = message[:1024] or 'Generic Event'")
+            emit("    sev = _severity(event.priority)")
+        for field, key in _as_mapping(spec.get("rename"), "rename").items():
+            self.fields.add(str(field))
+            emit(f"    if {self.const(str(field))} in f:")
+            emit(f"        ext[{self.const(str(key))}] = _sanitize(f[{self.const(str(field))}])")
+        for key, template in _as_mapping(spec.get("extensions"), "extensions").items():
+            emit(f"    ext[{self.const(str(key))}] = {self.template(template)}")
+        if "signature_id" in spec:
+            emit(f"    sig = _sanitize({self.coalesce(spec['signature_id'])}) or sig")
+        if "event_name" in spec:
+            emit(f"    name = _sanitize({self.coalesce(spec['event_name'])}) or name")
+        for rule in _as_list(spec.get("rules"), "rules"):
+            self._rule(rule)
+        if "severity" in spec:
+            self._severity(spec["severity"])
+        emit("    return _Result(sig, name, sev, ext)")
+        return "\n".join(self.lines) + "\n"
+
+    def const(self, value: Any) -> str:
+        name = f"_c{len(self.constants)}"
+        self.constants[name] = value
+        return name
+
+    def value(self, name: Any) -> str:
+        if not isinstance(name, str) or not name:
+            raise MappingSpecError(f"invalid field reference: {name!r}")
+        if name.startswith("$"):
+            try:
+                return _SPECIALS[name]
+            except KeyError:
+                known = ", ".join(sorted(_SPECIALS))
+                raise MappingSpecError(f"unknown event attribute {name!r} ({known})") from None
+        self.fields.add(name)
+        return f"f.get({self.const(name)}, '')"
+
+    def template(self, template: Any) -> str:
+        text = sanitize_text(template)
+        try:
+            parsed = list(_FORMATTER.parse(text))
+        except ValueError as exc:
+            raise MappingSpecError(f"invalid template {text!r}: {exc}") from None
+        pieces: list[str] = []
+        for literal, field, spec, conversion in parsed:
+            if literal:
+                pieces.append(repr(literal))
+            if field is None:
+                continue
+            if not field or (spec and any(char in spec for char in "{}'\"\\")):
+                # positional or nested fields: keep str.format_map semantics
+                self.fields.update(
+                    name for _, name, _, _ in parsed if name and not name.startswith("$")
+                )
+                return f"_format_map({self.const(text)}, f)"
+            if conversion not in (None, "s", "r", "a"):
+                raise MappingSpecError(
+                    f"invalid template {text!r}: unknown conversion !{conversion}"
+                )
+            expression = self.value(field)
+            suffix = (f"!{conversion}" if conversion else "") + (f":{spec}" if spec else "")
+            pieces.append(f'f"{{{expression}{suffix}}}"')
+        return f"({' '.join(pieces)})" if pieces else "''"
+
+    def coalesce(self, templates: Any) -> str:
+        options = templates if isinstance(templates, list) else [templates]
+        if not options:
+            raise MappingSpecError("coalesce lists need at least one entry")
+        return "(" + " or ".join(self.template(option) for option in options) + ")"
+
+    def condition(self, condition: Any) -> str:
+        if not isinstance(condition, MappingABC):
+            raise MappingSpecError(f"conditions must be objects, got {condition!r}")
+        if "all" in condition or "any" in condition:
+            joiner = " and " if "all" in condition else " or "
+            parts = _as_list(condition.get("all", condition.get("any")), "all/any")
+            return "(" + joiner.join(self.condition(part) for part in parts) + ")"
+        if "not" in condition:
+            return f"(not {self.condition(condition['not'])})"
+        field = condition.get("field")
+        if "exists" in condition:
+            if isinstance(field, str) and not field.startswith("$"):
+                self.fields.add(field)
+                test = f"{self.const(field)} in f"
+            else:
+                test = f"bool({self.value(field)})"
+            return test if condition["exists"] else f"(not {test})"
+        value = self.value(field)
+        fold = bool(condition.get("ignore_case"))
+        if fold:
+            value = f"str({value}).lower()"
+        if "equals" in condition:
+            return f"{value} == {self.const(_fold(condition['equals'], fold))}"
+        if "in" in condition:
+            options = frozenset(_fold(option, fold) for option in _as_list(condition["in"], "in"))
+            return f"{value} in {self.const(options)}"
+        if "contains" in condition:
+            return f"{self.const(_fold(condition['contains'], fold))} in str({value})"
+        if "matches" in condition:
+            pattern = _compile_regex(condition["matches"], fold)
+            return f"{self.const(pattern)}.search(str({value})) is not None"
+        raise MappingSpecError(
+            f"conditions need equals, in, contains, matches or exists: {condition!r}"
+        )
+
+    def _extract(self, extractor: Any) -> None:
+        if not isinstance(extractor, MappingABC) or "pattern" not in extractor:
+            raise MappingSpecError(f"extractors need a pattern: {extractor!r}")
+        pattern = _compile_regex(extractor["pattern"], bool(extractor.get("ignore_case")))
+        if not pattern.groupindex:
+            raise MappingSpecError(f"extractor pattern has no named groups: {pattern.pattern!r}")
+        source = self.value(extractor.get("field", "$message"))
+        emit = self.lines.append
+        emit(f"    m = {self.const(pattern)}.search(str({source}))")
+        emit("    if m is not None:")
+        for group in pattern.groupindex:
+            emit(f"        v = m.group({self.const(group)})")
+            emit("        if v is not None:")
+            emit(f"            f[{self.const(group)}] = v")
+
+    def _rule(self, rule: Any) -> None:
+        if not isinstance(rule, MappingABC) or "if" not in rule:
+            raise MappingSpecError(f"rules need an 'if' condition: {rule!r}")
+        unknown = set(rule) - _RULE_KEYS
+        if unknown:
+            raise MappingSpecError(f"unknown rule keys: {', '.join(sorted(unknown))}")
+        emit = self.lines.append
+        emit(f"    if {self.condition(rule['if'])}:")
+        body = len(self.lines)
+        for key, template in _as_mapping(rule.get("extensions"), "extensions").items():
+            emit(f"        ext[{self.const(str(key))}] = {self.template(template)}")
+        if "signature_id" in rule:
+            emit(f"        sig = _sanitize({self.coalesce(rule['signature_id'])}) or sig")
+        if "event_name" in rule:
+            emit(f"        name = _sanitize({self.coalesce(rule['event_name'])}) or name")
+        if len(self.lines) == body:
+            emit("        pass")
+
+    def _severity(self, spec: Any) -> None:
+        if not isinstance(spec, MappingABC):
+            spec = {"default": spec}
+        unknown = set(spec) - {"default", "rules", "keywords", "field"}
+        if unknown:
+            raise MappingSpecError(f"unknown severity keys: {', '.join(sorted(unknown))}")
+        emit = self.lines.append
+        default = spec.get("default", "base" if self.base is not None else "priority")
+        if default == "priority":
+            fallback = "_severity(event.priority)"
+        elif default == "base" and self.base is not None:
+            fallback = "sev"
+        else:
+            fallback = str(_severity_value(default))
+        tail: list[str] = [] if fallback == "sev" else [f"sev = {fallback}"]
+        keywords = _as_mapping(spec.get("keywords"), "severity.keywords")
+        if keywords:
+            classifier = KeywordClassifier(
+                {str(keyword): _keyword_entry(value) for keyword, value in keywords.items()}
+            )
+            text = self.value(spec.get("field", "$message"))
+            tail = [
+                f"k = {self.const(classifier)}.classify(str({text}))",
+                "if k is not None:",
+                "    sev = k.severity",
+                "    if k.category is not None:",
+                "        ext['cat'] = k.category",
+                *(["else:", *(f"    {line}" for line in tail)] if tail else []),
+            ]
+        rules = _as_list(spec.get("rules"), "severity.rules")
+        keyword = "if"
+        for rule in rules:
+            if not isinstance(rule, MappingABC) or "if" not in rule or "then" not in rule:
+                raise MappingSpecError(f"severity rules need 'if' and 'then': {rule!r}")
+            emit(f"    {keyword} {self.condition(rule['if'])}:")
+            emit(f"        sev = {_severity_value(rule['then'])}")
+            keyword = "elif"
+        if rules and tail:
+            emit("    else:")
+        indent = "        " if rules else "    "
+        for line in tail:
+            emit(indent + line)
+
+
+def _with_fields(event: ParsedEvent, fields: dict[str, Any]) -> ParsedEvent:
+    return ParsedEvent(
+        timestamp=event.timestamp,
+        host=event.host,
+        app_name=event.app_name,
+        priority=event.priority,
+        message=event.message,
+        fields=fields,
+        raw=event.raw,
+        source=event.source,
+    )
+
+
+def _format_map(template: str, fields: dict[str, Any]) -> str:
+    try:
+        return template.format_map(defaultdict(str, fields))
+    except KeyError:
+        return template
+
+
+def _compile_regex(pattern: Any, ignore_case: bool) -> re.Pattern[str]:
+    try:
+        return re.compile(str(pattern), re.IGNORECASE if ignore_case else 0)
+    except re.error as exc:
+        raise MappingSpecError(f"invalid pattern {pattern!r}: {exc}") from None
+
+
+def _severity_value(value: Any) -> int:
+    if isinstance(value, bool) or not isinstance(value, int) or not 0 <= value <= 10:
+        raise MappingSpecError(f"severity must be an integer from 0 to 10, got {value!r}")
+    return value
+
+
+def _keyword_entry(value: Any) -> int | tuple[int, str | None]:
+    if isinstance(value, MappingABC):
+        category = value.get("category")
+        return _severity_value(value.get("severity")), None if category is None else str(category)
+    return _severity_value(value)
+
+
+def _fold(value: Any, fold: bool) -> str:
+    text = str(value)
+    return text.lower() if fold else text
+
+
+def _as_list(value: Any, what: str) -> list[Any]:
+    if value is None:
+        return []
+    if not isinstance(value, list):
+        raise MappingSpecError(f"{what} must be a list")
+    return value
+
+
+def _as_mapping(value: Any, what: str) -> MappingABC[str, Any]:
+    if value is None:
+        return {}
+    if not isinstance(value, MappingABC):
+        raise MappingSpecError(f"{what} must be an object")
+    return value
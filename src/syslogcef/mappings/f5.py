@@ -9,6 +9,19 @@ __all__ = ["F5Mapping", "mapping"]
 
 class F5Mapping(BaseMapping):
     name = "f5"
+    required_fields = frozenset(
+        {
+            "event_id",
+            "irule",
+            "event",
+            "client_ip",
+            "client_port",
+            "server_ip",
+            "server_port",
+            "vip",
+            "request",
+        }
+    )
 
     def map(self, event: ParsedEvent) -> MappingResult:
         fields = event.fields
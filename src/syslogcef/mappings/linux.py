@@ -9,6 +9,9 @@ __all__ = ["LinuxMapping", "mapping"]
 
 class LinuxMapping(BaseMapping):
     name = "linux"
+    required_fields = frozenset(
+        {"event_id", "AUDIT_ID", "event", "raw", "user", "uid", "auid", "exe"}
+    )
 
     def map(self, event: ParsedEvent) -> MappingResult:
         severity = priority_to_severity(event.priority)
@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import re
+import threading
+from collections.abc import Mapping as MappingABC
+from dataclasses import dataclass, field
+
+from ..parsing import SyslogEvent
+from ..utils import ParsedEvent
+from .base import BaseMapping, Mapping, MappingResult
+
+__all__ = ["DEFAULT_ROUTE_CACHE_SIZE", "RouteStats", "SourceRouter", "find_router"]
+
+DEFAULT_ROUTE_CACHE_SIZE = 4096
+
+# App-name tags that identify a source on their own (compared lower-cased).
+_APP_TAGS = {
+    **dict.fromkeys(
+        ("vpxd", "vpxa", "hostd", "vmkernel", "vmkwarning", "vobd", "fdm", "esxupdate", "vcenter"),
+        "vmware",
+    ),
+    **dict.fromkeys(("tmm", "tmm1", "mcpd", "tmsh", "bigd", "apmd", "asm", "f5"), "f5"),
+    **dict.fromkeys(
+        ("audit", "auditd", "audispd", "sshd", "sudo", "su", "systemd", "crond", "cron", "login"),
+        "linux",
+    ),
+}
+# Cisco IOS/ASA/NX-OS message IDs: %FACILITY-SEVERITY-MNEMONIC:
+_CISCO_MSGID_RE = re.compile(r"%[A-Z][A-Z0-9_]*-\d-[A-Z0-9_]+:")
+_AUDIT_RE = re.compile(r"(?:type=\w+ )?msg=audit\(")
+_F5_MSGID_RE = re.compile(r"[0-9a-f]{8}:\d:")
+_MESSAGE_RULES = (
+    (_CISCO_MSGID_RE.search, "cisco"),
+    (_AUDIT_RE.match, "linux"),
+    (_F5_MSGID_RE.match, "f5"),
+)
+
+
+@dataclass(slots=True)
+class RouteStats:
+    """Events dispatched per mapping, plus classification cache misses."""
+
+    counts: dict[str, int] = field(default_factory=dict)
+    cache_misses: int = 0
+
+    def format(self) -> str:
+        routed = " ".join(f"{name}={count}" for name, count in sorted(self.counts.items()))
+        return f"routed {routed} cache_misses={self.cache_misses}"
+
+
+class SourceRouter(BaseMapping):
+    """Pick the mapping for each event from its hostname, app-name tag or message ID.
+
+    ``routes`` maps a hostname or app-name to a mapping name and takes
+    precedence over the built-in rules: well-known app tags (``vpxd``,
+    ``tmm``, ``sshd``, ...), Cisco ``%FAC-SEV-MNEMONIC:`` message IDs, auditd
+    records and F5 message codes.  Anything else goes to ``default``.  A
+    decision made from a route, an app tag or a message ID is memoised per
+    ``(hostname, app_name)`` in a bounded cache (numeric tags such as Cisco
+    sequence numbers are ignored), so most events are routed with a single
+    dictionary lookup.  Falling back to ``default`` is not memoised: a
+    generic first line such as ``last message repeated`` must not decide
+    the mapping for everything the host sends later.
+
+    One router may be shared by threads; :attr:`stats` is updated under a lock.
+    """
+
+    name = "auto"
+
+    def __init__(
+        self,
+        mappings: MappingABC[str, BaseMapping] | None = None,
+        *,
+        routes: MappingABC[str, str] | None = None,
+        default: str = "default",
+        cache_size: int = DEFAULT_ROUTE_CACHE_SIZE,
+    ) -> None:
+        if mappings is None:
+            from . import _REGISTRY
+
+            mappings = _REGISTRY
+        self.mappings = dict(mappings)
+        self.routes = {key: self._resolve(name) for key, name in (routes or {}).items()}
+        self.default = self._resolve(default)
+        self.cache_size = cache_size
+        self.stats = RouteStats({mapping.name: 0 for mapping in self.mappings.values()})
+        self._cache: dict[tuple[str | None, str | None], BaseMapping] = {}
+        self._lock = threading.Lock()
+        self._routed = threading.local()
+
+    def _resolve(self, name: str) -> BaseMapping:
+        try:
+            return self.mappings[name.lower()]
+        except KeyError:
+            raise ValueError(f"Unknown mapping '{name}'") from None
+
+    def route(self, event: ParsedEvent) -> BaseMapping:
+        app = event.app_name
+        if app is not None and app.isdigit():
+            app = None
+        key = (event.host, app)
+        mapping = self._cache.get(key)
+        if mapping is None:
+            mapping, cacheable = self._classify(event.host, app, event.message)
+            if key != (None, None):
+                with self._lock:
+                    self.stats.cache_misses += 1
+            if cacheable and key != (None, None):
+                if len(self._cache) >= self.cache_size:
+                    self._cache.clear()
+                self._cache[key] = mapping
+        return mapping
+
+    def map(self, event: ParsedEvent) -> MappingResult:
+        mapping = self.route(event)
+        with self._lock:
+            self.stats.counts[mapping.name] += 1
+        self._routed.mapping = mapping
+        if isinstance(event, SyslogEvent):
+            event.project(mapping.required_fields)
+        return mapping.map(event)
+
+    def last_routed(self) -> BaseMapping:
+        """Return the mapping this thread's latest :meth:`map` call dispatched to."""
+
+        return getattr(self._routed, "mapping", self.default)
+
+    def _classify(
+        self, host: str | None, app: str | None, message: str
+    ) -> tuple[BaseMapping, bool]:
+        """Return the mapping and whether the decision holds for the whole ``(host, app)``."""
+
+        routes = self.routes
+        if host is not None and host in routes:
+            return routes[host], True
+        if app is not None:
+            if app in routes:
+                return routes[app], True
+            tagged = _APP_TAGS.get(app.lower())
+            if tagged is not None and tagged in self.mappings:
+                return self.mappings[tagged], True
+        for pattern, name in _MESSAGE_RULES:
+            if pattern(message) and name in self.mappings:
+                return self.mappings[name], True
+        return self.default, False
+
+
+def find_router(mapping: Mapping) -> SourceRouter | None:
+    """Return the :class:`SourceRouter` behind ``mapping``, following compiled mappings' bases."""
+
+    while not isinstance(mapping, SourceRouter):
+        base = getattr(mapping, "base", None)
+        if base is None:
+            return None
+        mapping = base
+    return mapping
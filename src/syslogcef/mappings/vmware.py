@@ -9,6 +9,9 @@ __all__ = ["VMwareMapping", "mapping"]
 
 class VMwareMapping(BaseMapping):
     name = "vmware"
+    required_fields = frozenset(
+        {"event_id", "eventTypeId", "event", "eventType", "user", "vm", "ip"}
+    )
 
     def map(self, event: ParsedEvent) -> MappingResult:
         fields = event.fields
@@ -0,0 +1,325 @@
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import IO
+
+__all__ = [
+    "DEFAULT_METRICS_INTERVAL",
+    "STAGES",
+    "Histogram",
+    "Metrics",
+    "MetricsReporter",
+    "MetricsSample",
+    "serve_metrics",
+]
+
+DEFAULT_METRICS_INTERVAL = 10.0
+STAGES = ("parse", "map", "encode", "write")
+
+# Values are bucketed by bit length plus the two bits after the leading one,
+# i.e. four buckets per power of two (<19% relative error), with no search.
+_SUB_BITS = 2
+_MAX_BITS = 40  # ~18 minutes in nanoseconds; anything slower shares the last bucket
+# Prometheus "le" bounds: powers of two from ~1µs to ~17s.
+_EXPORT_BITS = range(10, 35)
+
+
+def _bucket(ns: int) -> int:
+    bits = ns.bit_length()
+    if bits <= _SUB_BITS:
+        return ns
+    if bits > _MAX_BITS:
+        bits = _MAX_BITS
+        ns = (1 << _MAX_BITS) - 1
+    return (bits << _SUB_BITS) | ((ns >> (bits - _SUB_BITS - 1)) & ((1 << _SUB_BITS) - 1))
+
+
+def _bucket_limit(index: int) -> int:
+    """Exclusive upper bound, in nanoseconds, of the values in bucket ``index``."""
+
+    if index < 1 << _SUB_BITS:
+        return index + 1
+    bits, sub = index >> _SUB_BITS, index & ((1 << _SUB_BITS) - 1)
+    return ((1 << _SUB_BITS) + sub + 1) << (bits - _SUB_BITS - 1)
+
+
+class Histogram:
+    """Log-linear histogram of durations in nanoseconds."""
+
+    __slots__ = ("counts", "count", "total")
+
+    def __init__(self) -> None:
+        self.counts = [0] * ((_MAX_BITS + 1) << _SUB_BITS)
+        self.count = 0
+        self.total = 0
+
+    def observe(self, ns: int) -> None:
+        self.counts[_bucket(ns)] += 1
+        self.count += 1
+        self.total += ns
+
+    def merge(self, other: Histogram) -> None:
+        counts = self.counts
+        for index, value in enumerate(other.counts):
+            if value:
+                counts[index] += value
+        self.count += other.count
+        self.total += other.total
+
+    def quantile(self, fraction: float) -> int:
+        """Upper bound in nanoseconds of the bucket holding the ``fraction`` quantile."""
+
+        if not self.count:
+            return 0
+        rank = max(1, round(fraction * self.count))
+        seen = 0
+        for index, value in enumerate(self.counts):
+            seen += value
+            if seen >= rank:
+                return _bucket_limit(index)
+        return _bucket_limit(len(self.counts) - 1)  # pragma: no cover
+
+    def cumulative(self, bits: int) -> int:
+        """Number of observations below ``2 ** bits`` nanoseconds."""
+
+        return sum(self.counts[: (bits + 1) << _SUB_BITS])
+
+
+@dataclass(slots=True)
+class MetricsSample:
+    """Counters and stage timings gathered while converting, merged into :class:`Metrics`."""
+
+    events: dict[tuple[str, str], int] = field(default_factory=dict)
+    failed: int = 0
+    stages: dict[str, Histogram] = field(default_factory=dict)
+
+    def histogram(self, stage: str) -> Histogram:
+        histogram = self.stages.get(stage)
+        if histogram is None:
+            histogram = self.stages[stage] = Histogram()
+        return histogram
+
+    def merge(self, other: MetricsSample) -> None:
+        events = self.events
+        for key, count in other.events.items():
+            events[key] = events.get(key, 0) + count
+        self.failed += other.failed
+        for stage, histogram in other.stages.items():
+            self.histogram(stage).merge(histogram)
+
+    @property
+    def processed(self) -> int:
+        return sum(self.events.values()) + self.failed
+
+
+class Metrics:
+    """Thread-safe totals for a running pipeline.
+
+    Converters measure a batch into a private :class:`MetricsSample` and
+    :meth:`record` it once, so the lock is taken per batch, not per event.
+    ``gauge`` registers callbacks read at report time, e.g. queue depth.
+    """
+
+    def __init__(self) -> None:
+        self.started = time.monotonic()
+        self.totals = MetricsSample()
+        self._gauges: dict[str, tuple[Callable[[], float], str, str]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, sample: MetricsSample) -> None:
+        with self._lock:
+            self.totals.merge(sample)
+
+    def observe(self, stage: str, ns: int) -> None:
+        with self._lock:
+            self.totals.histogram(stage).observe(ns)
+
+    def take(self) -> MetricsSample:
+        """Return the totals gathered so far and start over (used by worker processes)."""
+
+        with self._lock:
+            sample, self.totals = self.totals, MetricsSample()
+        return sample
+
+    def gauge(
+        self, name: str, read: Callable[[], float], help: str = "", *, kind: str = "gauge"
+    ) -> None:
+        self._gauges[name] = (read, help, kind)
+
+    def processed(self) -> int:
+        with self._lock:
+            return self.totals.processed
+
+    def rate(self) -> float:
+        """Average events per second since the pipeline started."""
+
+        elapsed = time.monotonic() - self.started
+        return self.processed() / elapsed if elapsed > 0 else 0.0
+
+    def summary(self, rate: float | None = None) -> str:
+        """One ``key=value`` line; ``rate`` defaults to the average since start."""
+
+        if rate is None:
+            rate = self.rate()
+        with self._lock:
+            totals = self.totals
+            parts = [
+                f"metrics uptime={time.monotonic() - self.started:.1f}s",
+                f"processed={totals.processed}",
+                f"failed={totals.failed}",
+                f"rate={rate:.0f}/s",
+            ]
+            for stage in STAGES:
+                histogram = totals.stages.get(stage)
+                if histogram is not None and histogram.count:
+                    parts.append(
+                        f"{stage}_p50={histogram.quantile(0.5) / 1000:.1f}us "
+                        f"{stage}_p99={histogram.quantile(0.99) / 1000:.1f}us"
+                    )
+        parts.extend(f"{name}={read():g}" for name, (read, _, _) in self._gauges.items())
+        return " ".join(parts)
+
+    def render(self) -> str:
+        """Return the totals in the Prometheus text exposition format."""
+
+        rate = self.rate()
+        lines = [
+            "# HELP syslogcef_events_total Events converted, by mapping and input format.",
+            "# TYPE syslogcef_events_total counter",
+        ]
+        with self._lock:
+            totals = self.totals
+            for (mapping, fmt), count in sorted(totals.events.items()):
+                lines.append(
+                    f'syslogcef_events_total{{mapping="{_label(mapping)}",format="{fmt}"}} {count}'
+                )
+            lines += [
+                "# HELP syslogcef_failed_total Events that could not be converted.",
+                "# TYPE syslogcef_failed_total counter",
+                f"syslogcef_failed_total {totals.failed}",
+                "# HELP syslogcef_stage_seconds Time per event (parse, map, encode) "
+                "or per batch (write).",
+                "# TYPE syslogcef_stage_seconds histogram",
+            ]
+            for stage in STAGES:
+                histogram = totals.stages.get(stage)
+                if histogram is None:
+                    continue
+                bucket = f'syslogcef_stage_seconds_bucket{{stage="{stage}"'
+                for bits in _EXPORT_BITS:
+                    le = (1 << bits) / 1e9
+                    lines.append(f'{bucket},le="{le:g}"}} {histogram.cumulative(bits)}')
+                lines += [
+                    f'{bucket},le="+Inf"}} {histogram.count}',
+                    f'syslogcef_stage_seconds_sum{{stage="{stage}"}} {histogram.total / 1e9:.9f}',
+                    f'syslogcef_stage_seconds_count{{stage="{stage}"}} {histogram.count}',
+                ]
+        lines += [
+            "# HELP syslogcef_lines_per_second Average events per second since the start.",
+            "# TYPE syslogcef_lines_per_second gauge",
+            f"syslogcef_lines_per_second {rate:.3f}",
+            "# HELP syslogcef_uptime_seconds Seconds since the pipeline started.",
+            "# TYPE syslogcef_uptime_seconds gauge",
+            f"syslogcef_uptime_seconds {time.monotonic() - self.started:.3f}",
+        ]
+        for name, (read, help, kind) in self._gauges.items():
+            if help:
+                lines.append(f"# HELP syslogcef_{name} {help}")
+            lines += [f"# TYPE syslogcef_{name} {kind}", f"syslogcef_{name} {read():g}"]
+        return "\n".join(lines) + "\n"
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsReporter:
+    """Report :class:`Metrics` every ``interval`` seconds from a daemon thread.
+
+    Summaries, with the rate over the last interval, go to ``stream``
+    (usually stderr) and/or the Prometheus text file ``path``, which is
+    replaced atomically so node_exporter's textfile collector never reads a
+    partial file.  :meth:`close` writes a final report.
+    """
+
+    def __init__(
+        self,
+        metrics: Metrics,
+        *,
+        interval: float = DEFAULT_METRICS_INTERVAL,
+        stream: IO[str] | None = None,
+        path: str | None = None,
+    ) -> None:
+        if interval <= 0:
+            raise ValueError("metrics interval must be positive")
+        self.metrics = metrics
+        self.interval = interval
+        self.stream = stream
+        self.path = path
+        self._last = (metrics.started, 0)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="syslogcef-metrics", daemon=True)
+
+    def start(self) -> MetricsReporter:
+        self._thread.start()
+        return self
+
+    def report(self) -> None:
+        if self.stream is not None:
+            # live rate: events since the previous report
+            now, processed = time.monotonic(), self.metrics.processed()
+            since, before = self._last
+            self._last = (now, processed)
+            rate = (processed - before) / (now - since) if now > since else 0.0
+            self.stream.write(self.metrics.summary(rate) + "\n")
+            self.stream.flush()
+        if self.path is not None:
+            temporary = f"{self.path}.tmp"
+            with open(temporary, "w", encoding="utf-8") as handle:
+                handle.write(self.metrics.render())
+            os.replace(temporary, self.path)
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        self.report()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.report()
+            except OSError as exc:  # pragma: no cover - e.g. full disk; keep converting
+                sys.stderr.write(f"metrics report failed: {exc}\n")
+
+
+def serve_metrics(metrics: Metrics, host: str, port: int) -> ThreadingHTTPServer:
+    """Serve ``GET /metrics`` on ``host:port`` from a daemon thread; call ``shutdown()`` to stop."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:  # noqa: N802 - http.server API
+            if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = metrics.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: object) -> None:
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(
+        target=server.serve_forever, name="syslogcef-metrics-http", daemon=True
+    ).start()
+    return server
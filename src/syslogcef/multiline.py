@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+import re
+import time
+from collections.abc import Callable, Iterable, Iterator
+from typing import Protocol
+
+from .tail import TailBatch
+
+__all__ = [
+    "DEFAULT_FLUSH_TIMEOUT",
+    "DEFAULT_MAX_EVENT_BYTES",
+    "DEFAULT_MAX_LINES",
+    "DEFAULT_MAX_PENDING",
+    "STACKTRACE_CONTINUATION",
+    "AuditGrouper",
+    "MultilineJoiner",
+    "Reassembler",
+    "reassemble",
+]
+
+DEFAULT_MAX_LINES = 500
+DEFAULT_MAX_EVENT_BYTES = 1 << 20
+DEFAULT_MAX_PENDING = 64
+DEFAULT_FLUSH_TIMEOUT = 2.0
+# Java and Python traces: indented frames, exception lines such as
+# "java.io.IOException: closed", "Caused by:"/"Suppressed:" blocks and tracebacks.
+STACKTRACE_CONTINUATION = (
+    r"[ \t]|Caused by:|Suppressed:|Traceback \(|(?:[\w$]+\.)*[\w$]+(?:Exception|Error)\b"
+)
+
+_AUDIT_ID_RE = re.compile(r"msg=audit\((\d+(?:\.\d+)?:\d+)\)")
+
+
+class Reassembler(Protocol):
+    def feed(self, lines: Iterable[str], now: float) -> list[str]:
+        """Consume physical lines and return the logical events they completed."""
+
+    def expire(self, now: float) -> list[str]:
+        """Return events that have waited longer than the flush timeout."""
+
+    def finish(self) -> list[str]:
+        """Return every buffered event (end of input)."""
+
+    @property
+    def pending(self) -> int:
+        """Number of physical lines currently buffered."""
+
+
+class MultilineJoiner:
+    """Join continuation lines onto the line that starts their event.
+
+    A line continues the current event when it matches ``continuation`` or,
+    if ``start`` is given, when it does not match ``start``; both patterns
+    are anchored at the beginning of the line.  Lines are joined with
+    ``separator``.  An event is emitted when the next one starts, when it
+    reaches ``max_lines`` or ``max_bytes`` (the rest becomes a new event), or
+    when no line arrived for ``timeout`` seconds.
+    """
+
+    def __init__(
+        self,
+        *,
+        start: str | None = None,
+        continuation: str | None = None,
+        separator: str = "\n",
+        max_lines: int = DEFAULT_MAX_LINES,
+        max_bytes: int = DEFAULT_MAX_EVENT_BYTES,
+        timeout: float = DEFAULT_FLUSH_TIMEOUT,
+    ) -> None:
+        if start is None and continuation is None:
+            continuation = STACKTRACE_CONTINUATION
+        self._start = re.compile(start).match if start is not None else None
+        self._continuation = re.compile(continuation).match if continuation is not None else None
+        self.separator = separator
+        self.max_lines = max_lines
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self._lines: list[str] = []
+        self._size = 0
+        self._updated = 0.0
+
+    @property
+    def pending(self) -> int:
+        return len(self._lines)
+
+    def feed(self, lines: Iterable[str], now: float) -> list[str]:
+        events: list[str] = []
+        buffered = self._lines
+        start, continuation = self._start, self._continuation
+        for line in lines:
+            line = line.rstrip("\r\n")
+            continues = bool(buffered) and (
+                (continuation is not None and continuation(line) is not None)
+                or (start is not None and start(line) is None)
+            )
+            if not continues or (
+                len(buffered) >= self.max_lines or self._size + len(line) > self.max_bytes
+            ):
+                if buffered:
+                    events.append(self.separator.join(buffered))
+                    buffered.clear()
+                    self._size = 0
+            buffered.append(line)
+            self._size += len(line) + 1
+        self._updated = now
+        return events
+
+    def expire(self, now: float) -> list[str]:
+        if self._lines and now - self._updated >= self.timeout:
+            return self.finish()
+        return []
+
+    def finish(self) -> list[str]:
+        if not self._lines:
+            return []
+        event = self.separator.join(self._lines)
+        self._lines.clear()
+        self._size = 0
+        return [event]
+
+
+class _AuditGroup:
+    __slots__ = ("parts", "size", "updated")
+
+    def __init__(self, line: str, now: float) -> None:
+        self.parts = [line]
+        self.size = len(line)
+        self.updated = now
+
+
+class AuditGrouper:
+    """Merge auditd records that share ``msg=audit(TIME:SERIAL)`` into one line.
+
+    The first record is kept whole and the fields of the following records
+    (the text after their ``msg=audit(...):``) are appended to it, so the
+    event parses as a single key/value line.  A group is emitted, together
+    with any older pending groups, when its ``EOE`` record arrives; the
+    oldest group is also emitted once ``max_pending`` serials are open, when
+    a group reaches ``max_records`` or ``max_bytes``, or after ``timeout``
+    seconds without a new record.  Lines without an audit ID pass through
+    immediately.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_pending: int = DEFAULT_MAX_PENDING,
+        max_records: int = DEFAULT_MAX_LINES,
+        max_bytes: int = DEFAULT_MAX_EVENT_BYTES,
+        timeout: float = DEFAULT_FLUSH_TIMEOUT,
+    ) -> None:
+        self.max_pending = max_pending
+        self.max_records = max_records
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self._groups: dict[str, _AuditGroup] = {}
+
+    @property
+    def pending(self) -> int:
+        return sum(len(group.parts) for group in self._groups.values())
+
+    def feed(self, lines: Iterable[str], now: float) -> list[str]:
+        events: list[str] = []
+        groups = self._groups
+        search = _AUDIT_ID_RE.search
+        for line in lines:
+            line = line.rstrip("\r\n")
+            match = search(line)
+            if match is None:
+                events.append(line)
+                continue
+            serial = match.group(1)
+            group = groups.get(serial)
+            if "type=EOE" in line[: match.start()]:
+                if group is not None:
+                    self._emit_through(serial, events)
+                continue
+            payload = line[match.end() :].lstrip(": ")
+            if group is None:
+                if len(groups) >= self.max_pending:
+                    self._emit_through(next(iter(groups)), events)
+                groups[serial] = _AuditGroup(line, now)
+            elif payload:
+                group.parts.append(payload)
+                group.size += len(payload) + 1
+                group.updated = now
+                if len(group.parts) >= self.max_records or group.size >= self.max_bytes:
+                    self._emit_through(serial, events)
+        return events
+
+    def expire(self, now: float) -> list[str]:
+        events: list[str] = []
+        for serial, group in list(self._groups.items()):
+            if now - group.updated >= self.timeout:
+                self._emit_through(serial, events)
+        return events
+
+    def finish(self) -> list[str]:
+        events = [" ".join(group.parts) for group in self._groups.values()]
+        self._groups.clear()
+        return events
+
+    def _emit_through(self, serial: str, events: list[str]) -> None:
+        # groups are kept in order of their first record; keep the output in that order too
+        groups = self._groups
+        while groups:
+            oldest = next(iter(groups))
+            events.append(" ".join(groups.pop(oldest).parts))
+            if oldest == serial:
+                return
+
+
+def reassemble(
+    batches: Iterable[list[str]],
+    reassembler: Reassembler,
+    *,
+    clock: Callable[[], float] = time.monotonic,
+) -> Iterator[list[str]]:
+    """Turn batches of physical lines into batches of logical events.
+
+    Empty batches (the idle markers of tailing readers) expire events older
+    than the flush timeout and are passed on.  For :class:`~syslogcef.tail.TailBatch`
+    input the output carries the file position after the last input batch
+    that left nothing buffered, so a checkpoint never skips a partial event.
+    """
+
+    identity: tuple[int, int] | None = None
+    safe_offset = end_offset = 0
+    for batch in batches:
+        now = clock()
+        events = reassembler.feed(batch, now) if batch else reassembler.expire(now)
+        if isinstance(batch, TailBatch):
+            if identity != batch.identity:
+                identity, safe_offset = batch.identity, 0
+            end_offset = batch.offset
+            if not reassembler.pending:
+                safe_offset = batch.offset
+            if events:
+                yield TailBatch(events, batch.identity, safe_offset)
+            if not batch:
+                yield TailBatch((), batch.identity, safe_offset)
+            continue
+        if events:
+            yield events
+        if not batch:
+            yield batch
+    events = reassembler.finish()
+    if events:
+        yield events if identity is None else TailBatch(events, identity, end_offset)
@@ -0,0 +1,341 @@
+from __future__ import annotations
+
+import json
+import os
+import socket
+import sys
+import time
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import IO, Any, BinaryIO, Protocol
+from urllib.parse import urlsplit
+
+from .converters import ConversionError
+
+__all__ = [
+    "DEFAULT_SPOOL_LIMIT",
+    "DeadLetterWriter",
+    "NetworkOutput",
+    "OutputStats",
+    "OutputStream",
+    "is_network_target",
+]
+
+DEFAULT_SPOOL_LIMIT = 256 << 20
+NETWORK_SCHEMES = ("tcp", "udp")
+
+# Buffers handed to one sendmsg() call; Linux rejects more than IOV_MAX (1024).
+_IOV_MAX = 1024
+_REPLAY_CHUNK = 1 << 20
+# A partially replayed spool is rewritten once this many delivered bytes lead it.
+_COMPACT_MIN = 1 << 20
+
+
+class OutputStream(Protocol):
+    def write(self, data: Any) -> Any: ...
+
+    def flush(self) -> None: ...
+
+    def close(self) -> None: ...
+
+
+@dataclass(slots=True)
+class OutputStats:
+    sent: int = 0
+    spooled: int = 0
+    spool_dropped: int = 0
+    errors: int = 0
+
+    def format(self) -> str:
+        return (
+            f"output sent={self.sent} spooled={self.spooled} "
+            f"spool_dropped={self.spool_dropped} errors={self.errors}"
+        )
+
+
+def is_network_target(target: str) -> bool:
+    return target.partition("://")[0] in NETWORK_SCHEMES and "://" in target
+
+
+class DeadLetterWriter:
+    """Append lines that failed to convert to ``target`` (``-`` for stderr) as JSON lines.
+
+    Each record holds the 0-based ``offset`` of the line in the input, the
+    exception class (``error``), its ``message`` and the raw ``line``.  A
+    batch of errors is written with one call.
+    """
+
+    def __init__(self, target: str) -> None:
+        self.target = target
+        self.written = 0
+        self._stream: IO[str] = sys.stderr if target == "-" else open(target, "a", encoding="utf-8")
+
+    def write(self, errors: Sequence[ConversionError], offset: int = 0) -> None:
+        if not errors:
+            return
+        dumps = json.dumps
+        self._stream.write(
+            "".join(
+                dumps(
+                    {
+                        "offset": offset + error.index,
+                        "error": error.exc_type,
+                        "message": error.error,
+                        "line": error.line.rstrip("\r\n"),
+                    },
+                    ensure_ascii=False,
+                )
+                + "\n"
+                for error in errors
+            )
+        )
+        self.written += len(errors)
+
+    def flush(self) -> None:
+        self._stream.flush()
+
+    def close(self) -> None:
+        if self.target == "-":
+            self._stream.flush()
+        else:
+            self._stream.close()
+
+
+class NetworkOutput:
+    """Send newline-terminated CEF blocks to a ``tcp://`` or ``udp://`` collector.
+
+    Connections are opened lazily, kept open and used round-robin, one block
+    per write.  TCP blocks go out in a single ``sendmsg`` call (newline framing
+    or RFC 6587 octet counting); UDP sends one datagram per event.  When a send
+    fails the connection is dropped and reconnects back off exponentially.
+    While the collector is unreachable, blocks are appended to ``spool`` (up to
+    ``spool_limit`` bytes on disk, newer blocks are dropped beyond that) and
+    replayed in order once a connection succeeds.  The replay position is kept
+    in ``SPOOL.offset`` so a restart resumes after the delivered lines, and
+    delivered bytes are compacted away when they dominate the file or the
+    limit is reached.  Without a spool, :meth:`write` waits for the collector
+    instead.
+    """
+
+    def __init__(
+        self,
+        target: str,
+        *,
+        connections: int = 1,
+        framing: str = "newline",
+        spool: str | None = None,
+        spool_limit: int = DEFAULT_SPOOL_LIMIT,
+        timeout: float = 5.0,
+        backoff: float = 0.5,
+        max_backoff: float = 30.0,
+    ) -> None:
+        parts = urlsplit(target)
+        if parts.scheme not in NETWORK_SCHEMES or not parts.hostname or parts.port is None:
+            raise ValueError(f"expected tcp://HOST:PORT or udp://HOST:PORT, got {target!r}")
+        if framing not in ("newline", "octet"):
+            raise ValueError(f"unknown framing: {framing!r}")
+        self.target = target
+        self.scheme = parts.scheme
+        self.address = (parts.hostname, parts.port)
+        self.framing = framing
+        self.spool = spool
+        self.spool_limit = spool_limit
+        self.timeout = timeout
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.stats = OutputStats()
+        self._pool: list[socket.socket | None] = [None] * max(1, connections)
+        self._turn = 0
+        self._delay = backoff
+        self._retry_at = 0.0
+        self._spool_file: BinaryIO | None = None
+        self._spool_offset = 0
+        self._spool_size = 0
+        if spool is not None and os.path.exists(spool):
+            self._spool_size = os.path.getsize(spool)
+            self._spool_offset = self._load_spool_offset()
+
+    def write(self, data: str | bytes) -> int:
+        payload = data.encode("utf-8", errors="replace") if isinstance(data, str) else data
+        if not payload:
+            return 0
+        if not payload.endswith(b"\n"):
+            payload += b"\n"
+        if self.spool is None:
+            while not self._send(payload):
+                time.sleep(max(0.0, self._retry_at - time.monotonic()))
+            return len(data)
+        if self._spool_size > self._spool_offset:
+            self._replay()
+        if self._spool_size > self._spool_offset or not self._send(payload):
+            self._append_spool(payload)
+        return len(data)
+
+    def flush(self) -> None:
+        if self._spool_size > self._spool_offset:
+            self._replay()
+
+    def close(self) -> None:
+        self.flush()
+        for index, sock in enumerate(self._pool):
+            if sock is not None:
+                sock.close()
+                self._pool[index] = None
+        if self._spool_file is not None:
+            self._spool_file.close()
+            self._spool_file = None
+
+    def _send(self, payload: bytes) -> bool:
+        index = self._turn
+        self._turn = (index + 1) % len(self._pool)
+        sock = self._pool[index]
+        try:
+            if sock is None:
+                if time.monotonic() < self._retry_at:
+                    return False
+                sock = self._pool[index] = self._connect()
+            self._transmit(sock, payload)
+        except OSError:
+            if sock is not None:
+                sock.close()
+            self._pool[index] = None
+            self.stats.errors += 1
+            self._retry_at = time.monotonic() + self._delay
+            self._delay = min(self._delay * 2, self.max_backoff)
+            return False
+        self._delay = self.backoff
+        self.stats.sent += payload.count(b"\n")
+        return True
+
+    def _connect(self) -> socket.socket:
+        kind = socket.SOCK_STREAM if self.scheme == "tcp" else socket.SOCK_DGRAM
+        family, _, proto, _, address = socket.getaddrinfo(*self.address, type=kind)[0]
+        sock = socket.socket(family, kind, proto)
+        try:
+            sock.settimeout(self.timeout)
+            sock.connect(address)
+            if kind == socket.SOCK_STREAM:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def _transmit(self, sock: socket.socket, payload: bytes) -> None:
+        if self.scheme == "udp":
+            for line in payload[:-1].split(b"\n"):
+                sock.send(line)
+        elif self.framing == "octet":
+            buffers: list[bytes] = []
+            for line in payload[:-1].split(b"\n"):
+                buffers.append(b"%d " % len(line))
+                buffers.append(line)
+            _sendmsg_all(sock, buffers)
+        else:
+            sock.sendall(payload)
+
+    def _append_spool(self, payload: bytes) -> None:
+        assert self.spool is not None
+        lines = payload.count(b"\n")
+        if self._spool_size + len(payload) > self.spool_limit and self._spool_offset:
+            self._compact()
+        if self._spool_size + len(payload) > self.spool_limit:
+            self.stats.spool_dropped += lines
+            return
+        if self._spool_file is None:
+            self._spool_file = open(self.spool, "ab")
+        self._spool_file.write(payload)
+        self._spool_file.flush()
+        self._spool_size += len(payload)
+        self.stats.spooled += lines
+
+    def _replay(self) -> None:
+        assert self.spool is not None
+        if time.monotonic() < self._retry_at and all(sock is None for sock in self._pool):
+            return
+        with open(self.spool, "rb") as handle:
+            handle.seek(self._spool_offset)
+            pending = b""
+            while block := handle.read(_REPLAY_CHUNK):
+                data = pending + block
+                cut = data.rfind(b"\n") + 1
+                pending = data[cut:]
+                if cut and not self._send(data[:cut]):
+                    break
+                self._spool_offset += cut
+                self._save_spool_offset()
+            else:
+                # everything was delivered: start the spool over
+                if self._spool_file is not None:
+                    self._spool_file.close()
+                    self._spool_file = None
+                os.truncate(self.spool, 0)
+                self._spool_offset = self._spool_size = 0
+                self._save_spool_offset()
+                return
+        if self._spool_offset >= max(_COMPACT_MIN, self._spool_size // 2):
+            self._compact()
+
+    def _compact(self) -> None:
+        """Rewrite the spool without its delivered head."""
+
+        assert self.spool is not None
+        if self._spool_file is not None:
+            self._spool_file.close()
+            self._spool_file = None
+        tmp_path = f"{self.spool}.tmp"
+        with open(self.spool, "rb") as source, open(tmp_path, "wb") as target:
+            source.seek(self._spool_offset)
+            while block := source.read(_REPLAY_CHUNK):
+                target.write(block)
+            target.flush()
+            os.fsync(target.fileno())
+        # The new file has a new inode, so a stale offset file is ignored on restart.
+        os.replace(tmp_path, self.spool)
+        self._spool_size -= self._spool_offset
+        self._spool_offset = 0
+        self._save_spool_offset()
+
+    def _save_spool_offset(self) -> None:
+        assert self.spool is not None
+        stat = os.stat(self.spool)
+        state = {"device": stat.st_dev, "inode": stat.st_ino, "offset": self._spool_offset}
+        path = f"{self.spool}.offset"
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump(state, handle)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(tmp_path, path)
+
+    def _load_spool_offset(self) -> int:
+        assert self.spool is not None
+        try:
+            with open(f"{self.spool}.offset", encoding="utf-8") as handle:
+                state = json.load(handle)
+            identity = (int(state["device"]), int(state["inode"]))
+            offset = int(state["offset"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return 0
+        stat = os.stat(self.spool)
+        if identity != (stat.st_dev, stat.st_ino) or not 0 <= offset <= self._spool_size:
+            return 0
+        return offset
+
+
+def _sendmsg_all(sock: socket.socket, buffers: list[bytes]) -> None:
+    if not hasattr(sock, "sendmsg"):  # pragma: no cover - Windows
+        sock.sendall(b"".join(buffers))
+        return
+    views = [memoryview(buffer) for buffer in buffers]
+    index = 0
+    while index < len(views):
+        sent = sock.sendmsg(views[index : index + _IOV_MAX])
+        while sent:
+            head = views[index]
+            if sent >= len(head):
+                sent -= len(head)
+                index += 1
+            else:
+                views[index] = head[sent:]
+                sent = 0
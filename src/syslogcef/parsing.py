@@ -2,37 +2,59 @@ from __future__ import annotations
 
 import json
 import re
-from dataclasses import dataclass
+from collections.abc import Collection, Iterable
+from collections.abc import Mapping as MappingABC
+from dataclasses import dataclass, field
 from datetime import datetime, tzinfo
+from typing import Any, NamedTuple
 
+from . import _json
 from ._datetime import smart_parse
 from .utils import ParsedEvent, ensure_tz, sanitize_text
 
-__all__ = ["ParsedSyslog", "parse_syslog", "parse_kv_pairs"]
-
-RFC5424_RE = re.compile(
-    r"^<(?P<pri>\d+)>(?P<version>\d+)\s+"
-    r"(?P<timestamp>\S+)\s+"
-    r"(?P<hostname>\S+)\s+"
-    r"(?P<appname>\S+)\s+"
-    r"(?P<procid>\S+)\s+"
-    r"(?P<msgid>\S+)\s+"
-    r"(?P<structured>(?:-|(?:\[[^\]]*\])+))\s*"
-    r"(?P<msg>.*)$"
-)
+__all__ = [
+    "ParsedSyslog",
+    "SyslogEvent",
+    "TemplateCacheInfo",
+    "clear_template_cache",
+    "parse_syslog",
+    "parse_kv_pairs",
+    "template_cache_info",
+]
 
-RFC3164_RE = re.compile(
-    r"^<(?P<pri>\d+)>(?P<timestamp>[A-Z][a-z]{2}\s+\d{1,2}\s+\d{2}:\d{2}:\d{2})\s+"
-    r"(?P<hostname>\S+)\s+"
-    r"(?P<tag>[\w\-./]+)(?:\[(?P<pid>[^\]]+)\])?:\s*(?P<msg>.*)$"
+# Everything after "<PRI>" of an RFC 3164 line; one anchored match is cheaper
+# than splitting and validating the fixed-format header field by field.
+RFC3164_HEADER_RE = re.compile(
+    r"([A-Z][a-z]{2}\s+\d{1,2}\s+\d{2}:\d{2}:\d{2})\s+(\S+)\s+"
+    r"([\w\-./]+)(?:\[([^\]]+)\])?:\s*(.*)$",
+    re.DOTALL,
 )
-
+SD_PARAM_RE = re.compile(r' *([^ ="\]]+)="([^"\\]*(?:\\.[^"\\]*)*)"')
+SD_ELEMENT_RE = re.compile(r'\[[^ \]]*(?: +[^ ="\]]+="[^"\\]*(?:\\.[^"\\]*)*")* *\]')
+SD_ESCAPE_RE = re.compile(r'\\([\\"\]])')
 KV_RE = re.compile(r"(?P<key>[\w./-]+)=(?P<value>\".*?\"|\S+)")
 JSON_FRAGMENT_RE = re.compile(r"\{.*\}")
 
+TEMPLATE_CACHE_SIZE = 1024
+# A shape is compiled on its second sighting, so one-off messages never pay
+# for a regex compile.
+_TEMPLATE_LEARN_AFTER = 2
+_FINGERPRINT_TOKEN = 32
+_FINGERPRINT_PREFIX = 48
+_STRIP_DIGITS = str.maketrans("", "", "0123456789")
+# Sightings to wait before retrying a shape whose sample could not be compiled.
+_TEMPLATE_RETRY_AFTER = 64
+
 
-@dataclass(slots=True)
+@dataclass(slots=True, init=False)
 class ParsedSyslog:
+    """Header fields of a syslog line; key/value pairs and structured data are lazy.
+
+    ``kv_pairs`` and ``structured_data`` are parsed from the message the first
+    time they are read, so callers that only need header fields never pay for
+    the key/value scan. Comparing, copying or converting the record reads them.
+    """
+
     pri: int | None
     version: int | None
     timestamp: datetime | None
@@ -44,30 +66,201 @@ class ParsedSyslog:
     structured_data: dict[str, dict[str, str]]
     kv_pairs: dict[str, str]
     raw: str
+    _structured_text: str = field(init=False, repr=False, compare=False)
 
-    def as_event(self, default_tz: tzinfo | None = None) -> ParsedEvent:
-        ts = ensure_tz(self.timestamp, default_tz)
-        return ParsedEvent(
-            timestamp=ts,
-            host=self.hostname,
-            app_name=self.app_name,
-            priority=self.pri,
-            message=self.message,
-            fields={**flatten_structured_data(self.structured_data), **self.kv_pairs},
-            raw={
-                "pri": self.pri,
-                "version": self.version,
-                "timestamp": ts.isoformat() if ts else None,
-                "hostname": self.hostname,
-                "app_name": self.app_name,
-                "procid": self.procid,
-                "msgid": self.msgid,
-                "message": self.message,
-                "structured_data": self.structured_data,
-            },
-            source=self.app_name,
+    def __init__(
+        self,
+        pri: int | None,
+        version: int | None,
+        timestamp: datetime | None,
+        hostname: str | None,
+        app_name: str | None,
+        procid: str | None,
+        msgid: str | None,
+        message: str,
+        structured_data: dict[str, dict[str, str]] | None = None,
+        kv_pairs: dict[str, str] | None = None,
+        raw: str = "",
+        *,
+        structured_text: str = "",
+    ) -> None:
+        self.pri = pri
+        self.version = version
+        self.timestamp = timestamp
+        self.hostname = hostname
+        self.app_name = app_name
+        self.procid = procid
+        self.msgid = msgid
+        self.message = message
+        self.raw = raw
+        self._structured_text = structured_text
+        # left unset until __getattr__ parses them on first read
+        if structured_data is not None:
+            self.structured_data = structured_data
+        if kv_pairs is not None:
+            self.kv_pairs = kv_pairs
+
+    def __getattr__(self, name: str) -> Any:
+        if name == "structured_data":
+            scanned = _scan_structured_data(self._structured_text, 0)
+            self.structured_data = scanned[0] if scanned else {}
+            return self.structured_data
+        if name == "kv_pairs":
+            self.kv_pairs = parse_kv_pairs(self.message)
+            return self.kv_pairs
+        raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+
+    def _parsed(self, name: str) -> Any:
+        """Return a lazy field if it was already parsed, else None."""
+
+        try:
+            return object.__getattribute__(self, name)
+        except AttributeError:
+            return None
+
+    def select_fields(self, keys: Collection[str] | None = None) -> dict[str, Any]:
+        """Return the event fields (flattened structured data, then key/value pairs).
+
+        With ``keys`` only those fields are extracted, skipping the key/value
+        scan entirely when none of them can occur in the message.
+        """
+
+        if keys is None:
+            return {**flatten_structured_data(self.structured_data), **self.kv_pairs}
+        fields: dict[str, Any] = {}
+        if self._structured_text or self._parsed("structured_data"):
+            for key, value in flatten_structured_data(self.structured_data).items():
+                if key in keys:
+                    fields[key] = value
+        pairs = self._parsed("kv_pairs")
+        if pairs is None:
+            if "{" not in self.message and not any(f"{key}=" in self.message for key in keys):
+                # no "key=" for any wanted key and no JSON fragment: nothing to extract
+                return fields
+            pairs = self.kv_pairs
+        for key, value in pairs.items():
+            if key in keys:
+                fields[key] = value
+        return fields
+
+    def as_event(
+        self, default_tz: tzinfo | None = None, *, fields: Collection[str] | None = None
+    ) -> ParsedEvent:
+        """Return a :class:`SyslogEvent`; ``fields`` limits the extracted field keys."""
+
+        return SyslogEvent.from_syslog(self, default_tz, fields)
+
+
+# Default for SyslogEvent's ``fields`` and ``raw``: build them from the syslog record when read.
+_LAZY: Any = object()
+
+
+class SyslogEvent(ParsedEvent):
+    """A :class:`ParsedEvent` whose ``fields`` and ``raw`` are built on first access.
+
+    The constructor takes the same arguments as :class:`ParsedEvent`, so
+    :func:`dataclasses.replace` and friends work; copies carry the
+    materialised ``fields`` and ``raw``.
+    """
+
+    __slots__ = ("_syslog", "_wanted")
+
+    def __init__(
+        self,
+        timestamp: datetime | None,
+        host: str | None,
+        app_name: str | None,
+        priority: int | None,
+        message: str,
+        fields: dict[str, Any] = _LAZY,
+        raw: MappingABC[str, Any] | None = _LAZY,
+        source: str | None = None,
+        *,
+        syslog: ParsedSyslog | None = None,
+        wanted: Collection[str] | None = None,
+    ) -> None:
+        self.timestamp = timestamp
+        self.host = host
+        self.app_name = app_name
+        self.priority = priority
+        self.message = message
+        self.source = source
+        self._syslog = syslog
+        self._wanted = wanted
+        # Leaving a slot unset defers it to the property below.
+        if fields is not _LAZY or syslog is None:
+            self.fields = {} if fields is _LAZY else fields
+        if raw is not _LAZY or syslog is None:
+            self.raw = None if raw is _LAZY else raw
+
+    @classmethod
+    def from_syslog(
+        cls,
+        syslog: ParsedSyslog,
+        default_tz: tzinfo | None = None,
+        wanted: Collection[str] | None = None,
+    ) -> SyslogEvent:
+        return cls(
+            ensure_tz(syslog.timestamp, default_tz),
+            syslog.hostname,
+            syslog.app_name,
+            syslog.pri,
+            syslog.message,
+            source=syslog.app_name,
+            syslog=syslog,
+            wanted=wanted,
         )
 
+    def project(self, wanted: Collection[str] | None) -> None:
+        """Limit the field keys extracted when ``fields`` is first read."""
+
+        self._wanted = wanted
+
+    @property
+    def fields(self) -> dict[str, Any]:
+        try:
+            return _EVENT_FIELDS.__get__(self, ParsedEvent)  # type: ignore[no-any-return]
+        except AttributeError:
+            assert self._syslog is not None
+            value = self._syslog.select_fields(self._wanted)
+            _EVENT_FIELDS.__set__(self, value)
+            return value
+
+    @fields.setter
+    def fields(self, value: dict[str, Any]) -> None:
+        _EVENT_FIELDS.__set__(self, value)
+
+    @property
+    def raw(self) -> MappingABC[str, Any] | None:
+        try:
+            return _EVENT_RAW.__get__(self, ParsedEvent)  # type: ignore[no-any-return]
+        except AttributeError:
+            syslog = self._syslog
+            assert syslog is not None
+            ts = self.timestamp
+            value = {
+                "pri": syslog.pri,
+                "version": syslog.version,
+                "timestamp": ts.isoformat() if ts else None,
+                "hostname": syslog.hostname,
+                "app_name": syslog.app_name,
+                "procid": syslog.procid,
+                "msgid": syslog.msgid,
+                "message": syslog.message,
+                "structured_data": syslog.structured_data,
+            }
+            _EVENT_RAW.__set__(self, value)
+            return value
+
+    @raw.setter
+    def raw(self, value: MappingABC[str, Any] | None) -> None:
+        _EVENT_RAW.__set__(self, value)
+
+
+# Slot descriptors of ParsedEvent, used as the caches behind SyslogEvent's properties.
+_EVENT_FIELDS: Any = ParsedEvent.__dict__["fields"]
+_EVENT_RAW: Any = ParsedEvent.__dict__["raw"]
+
 
 def flatten_structured_data(data: dict[str, dict[str, str]]) -> dict[str, str]:
     flattened: dict[str, str] = {}
@@ -81,90 +274,284 @@ def _parse_timestamp(text: str) -> datetime | None:
     return smart_parse(text)
 
 
-def _parse_structured_data(text: str) -> dict[str, dict[str, str]]:
-    if text == "-" or not text:
-        return {}
+def _scan_structured_data(text: str, pos: int) -> tuple[dict[str, dict[str, str]], int] | None:
+    """Read consecutive ``[SD-ID name="value" ...]`` elements starting at ``pos``.
+
+    Returns the elements and the index just past the last one, or ``None``
+    when no element starts at ``pos``.  Quoted values may contain ``]`` and the
+    RFC 5424 escapes ``\\"``, ``\\\\`` and ``\\]``.
+    """
+
     result: dict[str, dict[str, str]] = {}
-    for match in re.finditer(r"\[(?P<id>[^\s\]=]+)(?P<data>[^\]]*)\]", text):
-        sd_id = match.group("id")
-        data_text = match.group("data")
-        sd_dict: dict[str, str] = {}
-        for kv_match in re.finditer(r"(?P<key>[\w\-.]+)=\"(?P<value>.*?)\"", data_text):
-            sd_dict[kv_match.group("key")] = kv_match.group("value")
-        result[sd_id] = sd_dict
-    return result
+    start = pos
+    length = len(text)
+    match_param = SD_PARAM_RE.match
+    while pos < length and text[pos] == "[":
+        close = text.find("]", pos + 1)
+        if close == -1:
+            break
+        space = text.find(" ", pos + 1, close)
+        if space == -1:
+            sd_id = text[pos + 1 : close]
+            params: dict[str, str] = {}
+            pos = close + 1
+        else:
+            sd_id = text[pos + 1 : space]
+            params = {}
+            cursor = space
+            while (param := match_param(text, cursor)) is not None:
+                value = param.group(2)
+                if "\\" in value:
+                    value = SD_ESCAPE_RE.sub(r"\1", value)
+                params[param.group(1)] = value
+                cursor = param.end()
+            end = text.find("]", cursor)
+            # a malformed parameter ends the element at its first "]"
+            pos = (end if end != -1 and not text[cursor:end].strip() else close) + 1
+        if sd_id and not sd_id[0].isspace():
+            result[sd_id] = params
+    if pos == start:
+        return None
+    return result, pos
+
+
+class TemplateCacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    mismatches: int
+    currsize: int
+
+
+class _Template:
+    """A compiled extractor for one message shape: its keys, in order, and one regex."""
+
+    __slots__ = ("match", "keys", "hits", "mismatches")
+
+    def __init__(self, pattern: re.Pattern[str], keys: tuple[str, ...]) -> None:
+        self.match = pattern.match
+        self.keys = keys
+        self.hits = 0
+        self.mismatches = 0
+
+
+# fingerprint -> template, or the number of sightings towards learning it;
+# insertion order doubles as recency order for LRU eviction.
+_templates: dict[tuple[str, str, int], Any] = {}
+_template_stats = [0, 0, 0]  # hits, misses, mismatches
+
+
+def template_cache_info() -> TemplateCacheInfo:
+    """Return hit/miss/mismatch counters of the key/value template cache."""
+
+    hits, misses, mismatches = _template_stats
+    return TemplateCacheInfo(hits, misses, mismatches, len(_templates))
+
+
+def clear_template_cache() -> None:
+    _templates.clear()
+    _template_stats[:] = [0, 0, 0]
 
 
 def parse_kv_pairs(text: str) -> dict[str, str]:
+    """Extract ``key=value`` pairs (``"quoted"`` values are unquoted), else a JSON fragment.
+
+    Messages are fingerprinted by their first token, the digit-free text
+    before the first ``=`` and the number of ``=`` signs.  The second time a
+    fingerprint is seen its pairs are compiled into one anchored regex, and
+    later messages of that shape are extracted with a single match instead
+    of the generic scan.  A message the template does not fit falls back to
+    the scan, so the result is always the same.
+    """
+
+    equals = text.find("=")
+    if equals == -1:
+        return _parse_kv_generic(text)
+    space = text.find(" ", 0, _FINGERPRINT_TOKEN)
+    token = text[: space if space != -1 else _FINGERPRINT_TOKEN]
+    if equals < len(token):
+        # a leading key=value pair: its value is variable, unlike a message ID
+        token = token.translate(_STRIP_DIGITS)
+    fingerprint = (
+        token,
+        text[max(0, equals - _FINGERPRINT_PREFIX) : equals].translate(_STRIP_DIGITS),
+        text.count("="),
+    )
+    entry = _templates.pop(fingerprint, None)
+    if entry.__class__ is _Template:
+        _templates[fingerprint] = entry
+        matched = entry.match(text)
+        if matched is not None:
+            entry.hits += 1
+            _template_stats[0] += 1
+            return dict(zip(entry.keys, matched.groups(), strict=True))
+        entry.mismatches += 1
+        _template_stats[2] += 1
+        if entry.mismatches > entry.hits + 8:
+            # the shape this fingerprint stands for has changed: learn it again
+            _templates[fingerprint] = 1
+        return _parse_kv_generic(text)
+    _template_stats[1] += 1
+    seen = (entry or 0) + 1
+    if seen < _TEMPLATE_LEARN_AFTER:
+        _remember(fingerprint, seen)
+        return _parse_kv_generic(text)
+    matches = list(KV_RE.finditer(text))
+    pairs = _collect_pairs(matches)
+    template = _compile_template(matches) if pairs else None
+    if template is not None:
+        matched = template.match(text)
+        if matched is None or dict(zip(template.keys, matched.groups(), strict=True)) != pairs:
+            template = None
+    _remember(
+        fingerprint,
+        template if template is not None else _TEMPLATE_LEARN_AFTER - _TEMPLATE_RETRY_AFTER,
+    )
+    return pairs if pairs else _parse_json_fragment(text)
+
+
+def _remember(fingerprint: tuple[str, str, int], entry: Any) -> None:
+    if len(_templates) >= TEMPLATE_CACHE_SIZE:
+        try:
+            del _templates[next(iter(_templates))]
+        except (KeyError, RuntimeError, StopIteration):  # pragma: no cover - racing threads
+            pass
+    _templates[fingerprint] = entry
+
+
+def _compile_template(matches: list[re.Match[str]]) -> _Template | None:
+    # Equivalent to the generic scan for messages it matches: gaps between
+    # pairs contain no "=", keys cannot extend to the left, unquoted values run
+    # to the next whitespace and quoted values end at the first closing quote.
+    parts = ["[^=]*?"]
+    keys = []
+    for match in matches:
+        key, value = match.group("key", "value")
+        if value[0] == '"':
+            if len(value) < 2 or value[-1] != '"' or '"' in value[1:-1]:
+                return None
+            parts.append(rf'(?<![\w./-]){re.escape(key)}="([^"\n]*)"')
+        else:
+            parts.append(rf"(?<![\w./-]){re.escape(key)}=([^\s\"]\S*)(?!\S)")
+        parts.append("[^=]*?")
+        keys.append(key)
+    parts[-1] = r"[^=]*\Z"
+    return _Template(re.compile("".join(parts)), tuple(keys))
+
+
+def _collect_pairs(matches: Iterable[re.Match[str]]) -> dict[str, str]:
     pairs: dict[str, str] = {}
-    for match in KV_RE.finditer(text):
+    for match in matches:
         value = match.group("value")
         if value.startswith('"') and value.endswith('"'):
             value = value[1:-1]
         pairs[match.group("key")] = value
-    if not pairs:
-        json_match = JSON_FRAGMENT_RE.search(text)
-        if json_match:
-            fragment = json_match.group(0)
-            try:
-                data = json.loads(fragment)
-                for key, value in data.items():
-                    pairs[key] = sanitize_text(value)
-            except (json.JSONDecodeError, AttributeError):
-                pairs["raw_json"] = fragment
+    return pairs
+
+
+def _parse_kv_generic(text: str) -> dict[str, str]:
+    pairs = _collect_pairs(KV_RE.finditer(text))
+    return pairs if pairs else _parse_json_fragment(text)
+
+
+def _parse_json_fragment(text: str) -> dict[str, str]:
+    pairs: dict[str, str] = {}
+    json_match = JSON_FRAGMENT_RE.search(text)
+    if json_match:
+        fragment = json_match.group(0)
+        try:
+            data = _json.loads(fragment)
+            for key, value in data.items():
+                pairs[key] = sanitize_text(value)
+        except (json.JSONDecodeError, AttributeError):
+            pairs["raw_json"] = fragment
     return pairs
 
 
 def parse_syslog(line: str, *, default_tz: tzinfo | None = None) -> ParsedSyslog:
     raw_line = line.rstrip("\n")
 
-    pri: int | None = None
-    version: int | None = None
-    timestamp: datetime | None = None
-    hostname: str | None = None
-    appname: str | None = None
-    procid: str | None = None
-    msgid: str | None = None
-    structured_data: dict[str, dict[str, str]] = {}
-    kv_pairs: dict[str, str] = {}
-    message = raw_line
-
-    match = RFC5424_RE.match(raw_line)
-    if match:
-        pri = int(match.group("pri"))
-        version = int(match.group("version"))
-        timestamp = _parse_timestamp(match.group("timestamp"))
-        hostname = _normalize_value(match.group("hostname"))
-        appname = _normalize_value(match.group("appname"))
-        procid = _normalize_optional(match.group("procid"))
-        msgid = _normalize_optional(match.group("msgid"))
-        structured_data = _parse_structured_data(match.group("structured"))
-        message = match.group("msg")
-        kv_pairs = parse_kv_pairs(message)
+    parsed = None
+    if raw_line[:1] == "<":
+        close = raw_line.find(">", 2)
+        if close != -1 and raw_line[1:close].isdecimal():
+            pri = int(raw_line[1:close])
+            # Branch on the first header byte: a version digit means RFC 5424,
+            # an upper-case month name means RFC 3164.
+            marker = raw_line[close + 1 : close + 2]
+            if marker.isdecimal():
+                parsed = _scan_rfc5424(raw_line, close + 1, pri)
+            elif "A" <= marker <= "Z":
+                parsed = _scan_rfc3164(raw_line, close + 1, pri)
+    if parsed is None:
+        parsed = ParsedSyslog(
+            pri=None,
+            version=None,
+            timestamp=None,
+            hostname=None,
+            app_name=None,
+            procid=None,
+            msgid=None,
+            message=raw_line,
+            structured_data={},
+            raw=raw_line,
+        )
+    parsed.timestamp = ensure_tz(parsed.timestamp, default_tz)
+    return parsed
+
+
+def _scan_rfc5424(raw_line: str, pos: int, pri: int) -> ParsedSyslog | None:
+    # VERSION SP TIMESTAMP SP HOSTNAME SP APP-NAME SP PROCID SP MSGID SP SD [SP MSG]
+    fields = raw_line[pos:].split(None, 6)
+    if len(fields) != 7 or not fields[0].isdecimal():
+        return None
+    version, timestamp, hostname, appname, procid, msgid, rest = fields
+    structured_data: dict[str, dict[str, str]] | None = None
+    if rest[0] == "-":
+        structured_data = {}
+        message_start = 1
     else:
-        match = RFC3164_RE.match(raw_line)
-        if match:
-            pri = int(match.group("pri"))
-            timestamp = _parse_timestamp(match.group("timestamp"))
-            hostname = match.group("hostname")
-            appname = match.group("tag")
-            procid = match.group("pid")
-            message = match.group("msg")
-            kv_pairs = parse_kv_pairs(message)
-        else:
-            kv_pairs = parse_kv_pairs(raw_line)
+        # Only find where the elements end; their parameters are parsed on demand.
+        message_start = 0
+        while (element := SD_ELEMENT_RE.match(rest, message_start)) is not None:
+            message_start = element.end()
+        if message_start < len(rest) and rest[message_start] == "[":
+            # an element the fast pattern rejects; let the full scanner decide
+            scanned = _scan_structured_data(rest, 0)
+            if scanned is None:
+                return None
+            structured_data, message_start = scanned
+        elif not message_start:
+            return None
+    return ParsedSyslog(
+        pri=pri,
+        version=int(version),
+        timestamp=_parse_timestamp(timestamp),
+        hostname=_normalize_value(hostname),
+        app_name=_normalize_value(appname),
+        procid=_normalize_optional(procid),
+        msgid=_normalize_optional(msgid),
+        message=rest[message_start:].lstrip(),
+        structured_data=structured_data,
+        raw=raw_line,
+        structured_text=rest[:message_start] if structured_data is None else "",
+    )
+
 
+def _scan_rfc3164(raw_line: str, pos: int, pri: int) -> ParsedSyslog | None:
+    match = RFC3164_HEADER_RE.match(raw_line, pos)
+    if match is None:
+        return None
+    timestamp, hostname, tag, procid, message = match.groups()
     return ParsedSyslog(
         pri=pri,
-        version=version,
-        timestamp=ensure_tz(timestamp, default_tz),
+        version=None,
+        timestamp=_parse_timestamp(timestamp),
         hostname=hostname,
-        app_name=appname,
+        app_name=tag,
         procid=procid,
-        msgid=msgid,
+        msgid=None,
         message=message,
-        structured_data=structured_data,
-        kv_pairs=kv_pairs,
+        structured_data={},
         raw=raw_line,
     )
 
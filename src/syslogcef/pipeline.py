@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator, Sized
+from concurrent.futures import Executor, Future
+from itertools import islice
+from typing import TypeVar
+
+__all__ = ["DEFAULT_BATCH_SIZE", "batched", "ordered_map"]
+
+T = TypeVar("T")
+R = TypeVar("R")
+S = TypeVar("S", bound=Sized)
+
+DEFAULT_BATCH_SIZE = 500
+
+
+def batched(items: Iterable[T], size: int) -> Iterator[list[T]]:
+    """Group ``items`` into lists of at most ``size`` elements."""
+
+    if size < 1:
+        raise ValueError("batch size must be at least 1")
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def ordered_map(
+    executor: Executor,
+    fn: Callable[[S], R],
+    items: Iterable[S],
+    *,
+    max_in_flight: int,
+    on_flush: Callable[[S], R] | None = None,
+) -> Iterator[tuple[S, R]]:
+    """Apply ``fn`` to ``items`` on ``executor`` and yield results in input order.
+
+    At most ``max_in_flight`` tasks are pending at any time; once the window is
+    full the producer blocks on the oldest task, so memory stays bounded no
+    matter how long ``items`` is.  Completed results at the head of the window
+    are yielded as soon as they are ready.  An empty item acts as a flush
+    marker: it is not submitted, but every pending result is drained before the
+    next item is read.  Tailing inputs use this to publish output while idle.
+    With ``on_flush`` the marker is then yielded too, with ``on_flush(marker)``
+    computed in the calling thread.
+    """
+
+    if max_in_flight < 1:
+        raise ValueError("max_in_flight must be at least 1")
+    pending: deque[tuple[S, Future[R]]] = deque()
+    try:
+        for item in items:
+            if not len(item):
+                while pending:
+                    head, future = pending.popleft()
+                    yield head, future.result()
+                if on_flush is not None:
+                    yield item, on_flush(item)
+                continue
+            pending.append((item, executor.submit(fn, item)))
+            while pending and (len(pending) >= max_in_flight or pending[0][1].done()):
+                head, future = pending.popleft()
+                yield head, future.result()
+        while pending:
+            head, future = pending.popleft()
+            yield head, future.result()
+    finally:
+        for _, future in pending:
+            future.cancel()
@@ -0,0 +1,294 @@
+from __future__ import annotations
+
+import random
+import threading
+import time
+from collections.abc import Callable, Iterable
+from collections.abc import Mapping as MappingABC
+from dataclasses import dataclass, field
+from typing import Any
+
+from .mappings import find_router
+from .mappings.base import Mapping, MappingResult
+from .utils import ParsedEvent
+
+__all__ = [
+    "DEFAULT_POLICY_KEYS",
+    "PolicyEngine",
+    "PolicyRule",
+    "PolicySpecError",
+    "PolicyStats",
+    "compile_policies",
+]
+
+DEFAULT_POLICY_KEYS = 10_000
+
+_RULE_KEYS = frozenset({"name", "match", "sample", "rate", "burst", "per", "seed", "max_keys"})
+_MATCH_KEYS = frozenset({"host", "app_name", "mapping", "signature", "severity", "syslog_severity"})
+_PER = ("host", "mapping", "signature")
+
+
+class PolicySpecError(ValueError):
+    """Raised when the ``policies`` section of a mapping file is invalid."""
+
+
+@dataclass(slots=True)
+class PolicyStats:
+    """Events dropped per policy rule."""
+
+    dropped: dict[str, int] = field(default_factory=dict)
+
+    def merge(self, other: PolicyStats) -> None:
+        dropped = self.dropped
+        for name, count in other.dropped.items():
+            dropped[name] = dropped.get(name, 0) + count
+
+    def format(self) -> str:
+        dropped = " ".join(f"{name}={count}" for name, count in self.dropped.items())
+        return f"policy dropped {dropped}"
+
+
+class _Bucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, updated: float) -> None:
+        self.tokens = tokens
+        self.updated = updated
+
+
+class PolicyRule:
+    """One policy: events matching every ``match`` condition are sampled and/or rate limited.
+
+    ``sample`` keeps that fraction of the events at random.  ``rate`` and
+    ``burst`` define a token bucket (events per second, bucket size) kept per
+    ``per`` key (host, mapping or signature; one shared bucket without it).
+    Buckets are held in an LRU table of ``max_keys`` entries.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        hosts: Iterable[str] | None = None,
+        app_names: Iterable[str] | None = None,
+        mappings: Iterable[str] | None = None,
+        signatures: Iterable[str] | None = None,
+        severities: Iterable[int] | None = None,
+        syslog_severities: Iterable[int] | None = None,
+        sample: float | None = None,
+        rate: float | None = None,
+        burst: float | None = None,
+        per: str | None = None,
+        seed: int | None = None,
+        max_keys: int = DEFAULT_POLICY_KEYS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if sample is None and rate is None:
+            raise PolicySpecError(f"policy {name!r} needs 'sample' or 'rate'")
+        if sample is not None and not 0 <= sample <= 1:
+            raise PolicySpecError(f"policy {name!r}: 'sample' must be between 0 and 1")
+        if (rate is not None and rate < 0) or (burst is not None and burst < 1):
+            raise PolicySpecError(f"policy {name!r}: 'rate' must be >= 0 and 'burst' >= 1")
+        if per is not None and per not in _PER:
+            raise PolicySpecError(f"policy {name!r}: 'per' must be one of {', '.join(_PER)}")
+        if max_keys < 1:
+            raise PolicySpecError(f"policy {name!r}: 'max_keys' must be positive")
+        self.name = name
+        self.hosts = _frozen(hosts)
+        self.app_names = _frozen(app_names)
+        self.mappings = _frozen(mappings)
+        self.signatures = _frozen(signatures)
+        self.severities = _frozen(severities)
+        self.syslog_severities = _frozen(syslog_severities)
+        self.sample = sample
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate or 0.0, 1.0)
+        self.per = per
+        self.max_keys = max_keys
+        self.clock = clock
+        self.needs_mapping = self.mappings is not None or per == "mapping"
+        self._random = random.Random(seed).random
+        self._buckets: dict[object, _Bucket] = {}
+        self._lock = threading.Lock()
+
+    def matches(self, event: ParsedEvent, result: MappingResult, mapping_name: str) -> bool:
+        if self.hosts is not None and event.host not in self.hosts:
+            return False
+        if self.app_names is not None and event.app_name not in self.app_names:
+            return False
+        if self.mappings is not None and mapping_name not in self.mappings:
+            return False
+        if self.signatures is not None and result.signature_id not in self.signatures:
+            return False
+        if self.severities is not None and result.severity not in self.severities:
+            return False
+        if self.syslog_severities is not None and (
+            event.priority is None or event.priority % 8 not in self.syslog_severities
+        ):
+            return False
+        return True
+
+    def admit(self, event: ParsedEvent, result: MappingResult, mapping_name: str) -> bool:
+        if self.sample is not None and self._random() >= self.sample:
+            return False
+        rate = self.rate
+        if rate is None:
+            return True
+        if self.per == "host":
+            key: object = event.host
+        elif self.per == "mapping":
+            key = mapping_name
+        elif self.per == "signature":
+            key = result.signature_id
+        else:
+            key = None
+        now = self.clock()
+        with self._lock:
+            buckets = self._buckets
+            bucket = buckets.pop(key, None)
+            if bucket is None:
+                bucket = _Bucket(self.burst, now)
+                if len(buckets) >= self.max_keys:
+                    del buckets[next(iter(buckets))]
+            else:
+                bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated) * rate)
+                bucket.updated = now
+            buckets[key] = bucket  # most recently used last
+            if bucket.tokens < 1:
+                return False
+            bucket.tokens -= 1
+            return True
+
+
+def _frozen(values: Iterable[Any] | None) -> frozenset[Any] | None:
+    return None if values is None else frozenset(values)
+
+
+class PolicyEngine:
+    """Apply :class:`PolicyRule` objects, in order, to mapped events.
+
+    The first matching rule that rejects an event drops it and is charged in
+    :attr:`stats`; rules after it are not evaluated, so their buckets are
+    not drained by events that were dropped anyway.
+    """
+
+    def __init__(self, rules: Iterable[PolicyRule]) -> None:
+        self.rules = list(rules)
+        self.stats = PolicyStats({rule.name: 0 for rule in self.rules})
+        self._needs_mapping = any(rule.needs_mapping for rule in self.rules)
+        self._lock = threading.Lock()
+
+    def admit(self, event: ParsedEvent, result: MappingResult, mapping: Mapping) -> bool:
+        """Return ``False`` if the event should be dropped (before it is encoded)."""
+
+        mapping_name = ""
+        if self._needs_mapping:
+            # the router already picked a mapping for this event while mapping it
+            router = find_router(mapping)
+            mapping_name = (router.last_routed() if router else mapping).name
+        for rule in self.rules:
+            if rule.matches(event, result, mapping_name) and not rule.admit(
+                event, result, mapping_name
+            ):
+                with self._lock:
+                    self.stats.dropped[rule.name] += 1
+                return False
+        return True
+
+    @property
+    def dropped(self) -> int:
+        return sum(self.stats.dropped.values())
+
+    def take(self) -> PolicyStats:
+        """Return the drops counted so far and start over (used by worker processes)."""
+
+        with self._lock:
+            stats = self.stats
+            self.stats = PolicyStats(dict.fromkeys(stats.dropped, 0))
+        return stats
+
+    def record(self, stats: PolicyStats) -> None:
+        """Add drops counted elsewhere, e.g. by a worker process's copy of the rules."""
+
+        with self._lock:
+            self.stats.merge(stats)
+
+
+def compile_policies(
+    specs: Iterable[MappingABC[str, Any]], *, clock: Callable[[], float] = time.monotonic
+) -> PolicyEngine:
+    """Build a :class:`PolicyEngine` from the ``policies`` list of a mapping file.
+
+    Each entry has an optional ``name`` and ``match`` (``host``,
+    ``app_name``, ``mapping``, ``signature``: a value or a list;
+    ``severity`` (CEF 0-10) and ``syslog_severity`` (0-7): a number, a
+    ``"low-high"`` range or a list of them) plus ``sample`` and/or ``rate``
+    with optional ``burst``, ``per``, ``seed`` and ``max_keys``.
+    """
+
+    if isinstance(specs, (str, MappingABC)) or not isinstance(specs, Iterable):
+        raise PolicySpecError("'policies' must be a list of rules")
+    rules = []
+    for index, spec in enumerate(specs):
+        if not isinstance(spec, MappingABC):
+            raise PolicySpecError(f"policy #{index + 1} must be a dictionary")
+        name = str(spec.get("name") or f"policy{index + 1}")
+        unknown = set(spec) - _RULE_KEYS
+        if unknown:
+            raise PolicySpecError(f"policy {name!r}: unknown keys: {', '.join(sorted(unknown))}")
+        match = spec.get("match") or {}
+        if not isinstance(match, MappingABC):
+            raise PolicySpecError(f"policy {name!r}: 'match' must be a dictionary")
+        unknown = set(match) - _MATCH_KEYS
+        if unknown:
+            raise PolicySpecError(
+                f"policy {name!r}: unknown match keys: {', '.join(sorted(unknown))}"
+            )
+        try:
+            rules.append(
+                PolicyRule(
+                    name,
+                    hosts=_strings(match.get("host")),
+                    app_names=_strings(match.get("app_name")),
+                    mappings=_strings(match.get("mapping")),
+                    signatures=_strings(match.get("signature")),
+                    severities=_levels(match.get("severity")),
+                    syslog_severities=_levels(match.get("syslog_severity")),
+                    sample=_number(spec.get("sample")),
+                    rate=_number(spec.get("rate")),
+                    burst=_number(spec.get("burst")),
+                    per=spec.get("per"),
+                    seed=spec.get("seed"),
+                    max_keys=int(spec.get("max_keys", DEFAULT_POLICY_KEYS)),
+                    clock=clock,
+                )
+            )
+        except (TypeError, ValueError) as exc:
+            if isinstance(exc, PolicySpecError):
+                raise
+            raise PolicySpecError(f"policy {name!r}: {exc}") from None
+    names = [rule.name for rule in rules]
+    if len(set(names)) != len(names):
+        raise PolicySpecError("policy names must be unique")
+    return PolicyEngine(rules)
+
+
+def _strings(value: Any) -> list[str] | None:
+    if value is None:
+        return None
+    values = value if isinstance(value, list) else [value]
+    return [str(item) for item in values]
+
+
+def _levels(value: Any) -> list[int] | None:
+    if value is None:
+        return None
+    levels: list[int] = []
+    for item in value if isinstance(value, list) else [value]:
+        low, sep, high = str(item).partition("-")
+        levels.extend(range(int(low), int(high if sep else low) + 1))
+    return levels
+
+
+def _number(value: Any) -> float | None:
+    return None if value is None else float(value)
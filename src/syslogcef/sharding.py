@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import mmap
+import os
+import threading
+from dataclasses import dataclass
+
+from .ingest import decode_block
+
+__all__ = ["DEFAULT_SHARD_SIZE", "Shard", "plan_shards", "read_shard_lines"]
+
+DEFAULT_SHARD_SIZE = 8 << 20
+
+# One map per path, with the identity of the file it was opened from.
+_maps: dict[str, tuple[tuple[int, ...], mmap.mmap]] = {}
+_maps_lock = threading.Lock()
+
+
+@dataclass(frozen=True, slots=True)
+class Shard:
+    """A newline-aligned byte range ``[start, end)`` of ``path``.
+
+    ``identity`` is the device, inode, size and mtime of the file the range
+    was planned on.
+    """
+
+    path: str
+    index: int
+    start: int
+    end: int
+    identity: tuple[int, ...] = ()
+
+    def __len__(self) -> int:
+        return self.end - self.start
+
+
+def plan_shards(path: str, shard_size: int = DEFAULT_SHARD_SIZE) -> list[Shard]:
+    """Split ``path`` into ranges of roughly ``shard_size`` bytes ending on newlines."""
+
+    if shard_size < 1:
+        raise ValueError("shard size must be at least 1")
+    shards: list[Shard] = []
+    with open(path, "rb") as handle:
+        stat = os.fstat(handle.fileno())
+        size = stat.st_size
+        identity = _identity(stat)
+        if not size:
+            return shards
+        with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            start = 0
+            while start < size:
+                end = start + shard_size
+                if end < size:
+                    newline = view.find(b"\n", end - 1)
+                    end = size if newline == -1 else newline + 1
+                else:
+                    end = size
+                shards.append(Shard(path, len(shards), start, end, identity))
+                start = end
+    return shards
+
+
+def read_shard_lines(shard: Shard) -> list[str]:
+    """Decode the lines of ``shard`` from a memory map shared per process.
+
+    The map is reopened when the file at ``shard.path`` is not the one the
+    shard was planned on; a file that changed after planning is an error
+    rather than a silently truncated or shifted read.
+    """
+
+    cached = _maps.get(shard.path)
+    if cached is None or cached[0] != shard.identity:
+        with _maps_lock:
+            cached = _maps.get(shard.path)
+            if cached is None or cached[0] != shard.identity:
+                with open(shard.path, "rb") as handle:
+                    identity = _identity(os.fstat(handle.fileno()))
+                    if shard.identity and identity != shard.identity:
+                        raise ValueError(f"{shard.path} changed after it was split into ranges")
+                    view = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+                if cached is not None:
+                    cached[1].close()
+                cached = _maps[shard.path] = (identity, view)
+    return decode_block(cached[1][shard.start : shard.end])
+
+
+def _identity(stat: os.stat_result) -> tuple[int, ...]:
+    return stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns
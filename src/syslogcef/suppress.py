@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from hashlib import blake2b
+
+from .mappings.base import MappingResult
+from .utils import ParsedEvent
+
+__all__ = [
+    "DEFAULT_SUPPRESS_KEYS",
+    "DEFAULT_SUPPRESS_WINDOW",
+    "SuppressStats",
+    "Suppressor",
+    "suppression_key",
+]
+
+DEFAULT_SUPPRESS_WINDOW = 60.0
+DEFAULT_SUPPRESS_KEYS = 10_000
+
+_STRIP_DIGITS = str.maketrans("", "", "0123456789")
+
+
+def suppression_key(event: ParsedEvent, result: MappingResult, *, exact: bool = False) -> bytes:
+    """Digest of (host, app, signature ID, message template).
+
+    The template is the message without digits, so repeats that differ only
+    in counters, ports, addresses or PIDs share a key; ``exact`` keeps the
+    message as is.
+    """
+
+    message = event.message if exact else event.message.translate(_STRIP_DIGITS)
+    text = "\x1f".join((event.host or "", event.app_name or "", result.signature_id, message))
+    return blake2b(text.encode("utf-8", errors="replace"), digest_size=16).digest()
+
+
+class _Window:
+    __slots__ = ("started", "count", "event", "result")
+
+    def __init__(self, started: float) -> None:
+        self.started = started
+        self.count = 0
+        self.event: ParsedEvent | None = None
+        self.result: MappingResult | None = None
+
+
+@dataclass(slots=True)
+class SuppressStats:
+    """Events held back as repeats and the ``cnt`` summaries emitted for them."""
+
+    suppressed: int = 0
+    summaries: int = 0
+    evicted: int = 0
+
+    def format(self) -> str:
+        return (
+            f"suppression suppressed={self.suppressed} summaries={self.summaries} "
+            f"evicted={self.evicted}"
+        )
+
+
+class Suppressor:
+    """Collapse repeated events into one summary per key and time window.
+
+    The first event of a key is forwarded and opens a ``window`` second
+    window; repeats inside it are only counted.  When the window closes, the
+    last repeat is returned by :meth:`expire` with the repeat count (the
+    caller encodes it with a CEF ``cnt`` extension).  At most ``max_keys``
+    windows are open; opening one more closes the oldest early.  Windows are
+    kept in the order they opened, so expiry and eviction only look at the
+    front.  Safe to share between threads.
+
+    Windows are measured with ``clock``, which suits live feeds.  With
+    ``event_time`` they are measured on the events' own timestamps instead,
+    so replaying an old file collapses only repeats that were close together
+    when they were logged; events without a timestamp fall back to ``clock``
+    (which should then return epoch seconds), and :meth:`expire` closes the
+    windows that the newest event seen has passed.
+    """
+
+    def __init__(
+        self,
+        window: float = DEFAULT_SUPPRESS_WINDOW,
+        *,
+        max_keys: int = DEFAULT_SUPPRESS_KEYS,
+        exact: bool = False,
+        clock: Callable[[], float] = time.monotonic,
+        event_time: bool = False,
+    ) -> None:
+        if window <= 0 or max_keys < 1:
+            raise ValueError("suppression window and key limit must be positive")
+        self.window = window
+        self.max_keys = max_keys
+        self.exact = exact
+        self.clock = clock
+        self.event_time = event_time
+        self.stats = SuppressStats()
+        self._latest = float("-inf")  # newest event time seen, with event_time
+        self._windows: dict[bytes, _Window] = {}
+        self._closed: list[tuple[ParsedEvent, MappingResult, int]] = []
+        self._lock = threading.Lock()
+
+    def offer(self, event: ParsedEvent, result: MappingResult) -> bool:
+        """Return ``True`` if the event should be forwarded, ``False`` if it was counted."""
+
+        key = suppression_key(event, result, exact=self.exact)
+        if self.event_time and event.timestamp is not None:
+            now = event.timestamp.timestamp()
+        else:
+            now = self.clock()
+        with self._lock:
+            if now > self._latest:
+                self._latest = now
+            windows = self._windows
+            current = windows.get(key)
+            if current is not None and now - current.started < self.window:
+                current.count += 1
+                current.event, current.result = event, result
+                self.stats.suppressed += 1
+                return False
+            if current is not None:
+                del windows[key]
+                self._close(current)
+            elif len(windows) >= self.max_keys:
+                oldest = next(iter(windows))
+                self._close(windows.pop(oldest))
+                self.stats.evicted += 1
+            windows[key] = _Window(now)
+            return True
+
+    def expire(self) -> list[tuple[ParsedEvent, MappingResult, int]]:
+        """Return ``(event, result, count)`` for every window that closed since the last call."""
+
+        with self._lock:
+            now = self._latest if self.event_time else self.clock()
+            windows = self._windows
+            while windows:
+                key = next(iter(windows))
+                if now - windows[key].started < self.window:
+                    break
+                self._close(windows.pop(key))
+            return self._take_closed()
+
+    def drain(self) -> list[tuple[ParsedEvent, MappingResult, int]]:
+        """Close every window, e.g. at the end of the input."""
+
+        with self._lock:
+            for current in self._windows.values():
+                self._close(current)
+            self._windows.clear()
+            return self._take_closed()
+
+    def _close(self, current: _Window) -> None:
+        if current.count and current.event is not None and current.result is not None:
+            self._closed.append((current.event, current.result, current.count))
+            self.stats.summaries += 1
+
+    def _take_closed(self) -> list[tuple[ParsedEvent, MappingResult, int]]:
+        closed, self._closed = self._closed, []
+        return closed
@@ -0,0 +1,285 @@
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import time
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import BinaryIO
+
+from .ingest import DEFAULT_BLOCK_SIZE, decode_block
+
+__all__ = ["FileTailer", "TailBatch"]
+
+# inotify(7) event masks
+_IN_MODIFY = 0x00000002
+_IN_ATTRIB = 0x00000004
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_WATCH_MASK = (
+    _IN_MODIFY
+    | _IN_ATTRIB
+    | _IN_CLOSE_WRITE
+    | _IN_MOVED_FROM
+    | _IN_MOVED_TO
+    | _IN_CREATE
+    | _IN_DELETE
+)
+
+
+class TailBatch(list[str]):
+    """Lines read by :class:`FileTailer` plus the file position right after them."""
+
+    def __init__(self, lines: Iterable[str], identity: tuple[int, int], offset: int) -> None:
+        super().__init__(lines)
+        self.identity = identity
+        self.offset = offset
+
+
+class _InotifyWaiter:
+    """Block until something changes in a directory (Linux only)."""
+
+    def __init__(self, directory: str) -> None:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(fd, os.fsencode(directory), _WATCH_MASK) < 0:
+            errno = ctypes.get_errno()
+            os.close(fd)
+            raise OSError(errno, f"inotify_add_watch failed for {directory}")
+        self.fd = fd
+
+    def wait(self, timeout: float) -> None:
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if ready:
+            try:
+                while os.read(self.fd, 65536):
+                    pass
+            except BlockingIOError:
+                pass
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class _PollWaiter:
+    def wait(self, timeout: float) -> None:
+        time.sleep(timeout)
+
+    def close(self) -> None:
+        pass
+
+
+class FileTailer:
+    """Follow a growing log file across rotation and truncation.
+
+    The file is read in large blocks and handed out as :class:`TailBatch`
+    objects.  The reader blocks on inotify when it is available and falls back
+    to stat polling otherwise.  Rotation (a new inode at ``path``) drains the
+    old file before switching; truncation (size below the read position)
+    restarts from the beginning.  When ``checkpoint`` is set, :meth:`commit`
+    persists the position of an emitted batch so a restart resumes right after
+    the last committed line.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        batch_size: int,
+        checkpoint: str | None = None,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+        poll_interval: float = 1.0,
+        use_inotify: bool = True,
+    ) -> None:
+        self.path = path
+        self.batch_size = batch_size
+        self.checkpoint = checkpoint
+        self.block_size = block_size
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        self._file: BinaryIO | None = None
+        self._identity = (0, 0)
+        self._position = 0
+
+    def batches(self) -> Iterator[TailBatch]:
+        """Yield batches forever.
+
+        An empty batch marks that the reader is idle and is repeated after
+        every ``poll_interval`` without new data, so downstream stages can
+        flush buffered output on a timer.
+        """
+
+        waiter = self._make_waiter()
+        try:
+            while not self._open_current():
+                waiter.wait(self.poll_interval)
+            yield from self._resume()
+            while True:
+                produced = False
+                for batch in self._read_available():
+                    produced = True
+                    yield batch
+                if produced:
+                    continue
+                yield TailBatch((), self._identity, self._position)
+                if self._check_rotation():
+                    yield from self._read_available(final=True)
+                    self._reopen()
+                    continue
+                waiter.wait(self.poll_interval)
+        finally:
+            waiter.close()
+            self.close()
+
+    def commit(self, batch: TailBatch) -> None:
+        """Record that every line up to and including ``batch`` has been delivered."""
+
+        if self.checkpoint is None:
+            return
+        state = {
+            "path": self.path,
+            "device": batch.identity[0],
+            "inode": batch.identity[1],
+            "offset": batch.offset,
+        }
+        tmp_path = f"{self.checkpoint}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump(state, handle)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(tmp_path, self.checkpoint)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _make_waiter(self) -> _InotifyWaiter | _PollWaiter:
+        if self.use_inotify:
+            try:
+                return _InotifyWaiter(str(Path(self.path).resolve().parent))
+            except (OSError, AttributeError, TypeError):
+                pass
+        return _PollWaiter()
+
+    def _resume(self) -> Iterator[TailBatch]:
+        saved = self._load_checkpoint()
+        if saved is None:
+            return
+        identity, offset = saved
+        if identity == self._identity:
+            if offset <= os.fstat(self._fileno()).st_size:
+                self._seek(offset)
+            return
+        # The file was rotated while we were down: finish the rotated copy first.
+        rotated = self._find_rotated(identity)
+        if rotated is None:
+            return
+        current = (self._file, self._identity)
+        self._file = open(rotated, "rb", buffering=0)
+        self._identity = identity
+        self._seek(offset)
+        yield from self._read_available(final=True)
+        self._file.close()
+        self._file, self._identity = current
+        self._position = 0
+
+    def _load_checkpoint(self) -> tuple[tuple[int, int], int] | None:
+        if self.checkpoint is None or not os.path.exists(self.checkpoint):
+            return None
+        with open(self.checkpoint, encoding="utf-8") as handle:
+            state = json.load(handle)
+        return (int(state["device"]), int(state["inode"])), int(state["offset"])
+
+    def _find_rotated(self, identity: tuple[int, int]) -> str | None:
+        target = Path(self.path)
+        for candidate in target.parent.glob(f"{target.name}*"):
+            try:
+                stat = candidate.stat()
+            except OSError:
+                continue
+            if (stat.st_dev, stat.st_ino) == identity and candidate.is_file():
+                return str(candidate)
+        return None
+
+    def _open_current(self) -> bool:
+        try:
+            handle = open(self.path, "rb", buffering=0)
+        except FileNotFoundError:
+            return False
+        stat = os.fstat(handle.fileno())
+        self.close()
+        self._file = handle
+        self._identity = (stat.st_dev, stat.st_ino)
+        self._position = 0
+        return True
+
+    def _reopen(self) -> None:
+        self.close()
+        self._open_current()
+
+    def _fileno(self) -> int:
+        assert self._file is not None
+        return self._file.fileno()
+
+    def _seek(self, offset: int) -> None:
+        assert self._file is not None
+        self._file.seek(offset)
+        self._position = offset
+
+    def _check_rotation(self) -> bool:
+        if self._file is None:
+            return os.path.exists(self.path)
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        if (stat.st_dev, stat.st_ino) != self._identity:
+            return True
+        if stat.st_size < self._position:
+            # copytruncate: start over on the same inode
+            self._seek(0)
+        return False
+
+    def _read_available(self, *, final: bool = False) -> Iterator[TailBatch]:
+        if self._file is None:
+            return
+        pending = b""
+        while True:
+            block = self._file.read(self.block_size)
+            if not block:
+                break
+            data = pending + block if pending else block
+            cut = data.rfind(b"\n") + 1
+            base = self._position
+            if cut:
+                yield from self._split(data, cut, base)
+                self._position = base + cut
+            pending = data[cut:]
+        if pending:
+            if final:
+                lines = decode_block(pending + b"\n")
+                self._position += len(pending)
+                yield TailBatch(lines, self._identity, self._position)
+            else:
+                # leave the partial line in the file until its newline arrives
+                self._seek(self._position)
+
+    def _split(self, data: bytes, cut: int, base: int) -> Iterator[TailBatch]:
+        start = 0
+        while start < cut:
+            end = start
+            for _ in range(self.batch_size):
+                end = data.index(b"\n", end, cut) + 1
+                if end >= cut:
+                    break
+            yield TailBatch(decode_block(data[start:end]), self._identity, base + end)
+            start = end
@@ -37,6 +37,8 @@ class ParsedEvent:
 def sanitize_text(value: Any) -> str:
     """Return a UTF-8 safe string."""
 
+    if value.__class__ is str:
+        return value.replace("\u0000", "?") if "\u0000" in value else value
     if value is None:
         return ""
     if isinstance(value, bytes):
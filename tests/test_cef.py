@@ -1,6 +1,19 @@
 from __future__ import annotations
 
-from syslogcef.cef import CEFHeader, build_cef, escape_cef_header, priority_to_severity
+from pathlib import Path
+
+from syslogcef.cef import (
+    CEFHeader,
+    build_cef,
+    compile_encoder,
+    escape_cef_header,
+    priority_to_severity,
+)
+from syslogcef.mappings import get_mapping
+from syslogcef.parsing import parse_syslog
+from syslogcef.utils import ParsedEvent
+
+DATA_DIR = Path(__file__).parent / "data"
 
 
 def test_escape_cef_header():
@@ -26,3 +39,46 @@ def test_priority_to_severity_bounds():
     for priority in range(0, 192):
         sev = priority_to_severity(priority)
         assert 0 <= sev <= 10
+
+
+def _reference_cef(event: ParsedEvent, mapping) -> str:
+    # The dictionary-merging assembly CEFEncoder must reproduce byte for byte.
+    result = mapping.map(event)
+    header = CEFHeader(
+        "Ven|dor", "Prod=uct", "1.0", result.signature_id, result.name, result.severity
+    )
+    extensions = {"deviceVendor": "Ven|dor", "deviceProduct": "Prod=uct", "deviceVersion": "1.0"}
+    if event.timestamp:
+        extensions["end"] = event.timestamp.isoformat()
+    if event.host:
+        extensions["deviceHostName"] = event.host
+    if event.app_name:
+        extensions["deviceProcessName"] = event.app_name
+    if event.priority is not None:
+        extensions["syslogSeverity"] = str(event.priority % 8)
+    extensions.update(result.extensions)
+    return build_cef(header, extensions)
+
+
+def test_compiled_encoder_matches_build_cef():
+    events = [
+        parse_syslog(line).as_event()
+        for path in sorted(DATA_DIR.iterdir())
+        if path.suffix in {".log", ""}
+        for line in path.read_text(encoding="utf-8", errors="replace").splitlines()[:50]
+    ]
+    events.append(
+        ParsedEvent(
+            timestamp=None,
+            host="",
+            app_name=None,
+            priority=3,
+            message="a=b\\c\x00",
+            fields={"deviceVendor": "override", "end": "later", "9key": "", "k y": None},
+        )
+    )
+    for name in ("default", "cisco", "linux", "f5", "vmware"):
+        mapping = get_mapping(name)
+        encoder = compile_encoder("Ven|dor", "Prod=uct", "1.0", mapping)
+        for event in events:
+            assert encoder.encode_event(event) == _reference_cef(event, mapping)
@@ -2,6 +2,10 @@ from __future__ import annotations
 
 import io
 import json
+import socket
+from pathlib import Path
+
+import pytest
 
 from syslogcef import cli
 
@@ -32,3 +36,166 @@ def test_cli_mapping_override(tmp_path, capsys, monkeypatch):
     captured = capsys.readouterr()
     assert exit_code == 0
     assert "cs2Label=custom" in captured.out
+
+
+def test_cli_workers_preserve_order(tmp_path, capsys):
+    input_file = tmp_path / "input.log"
+    lines = [f"<134>1 2023-02-01T12:34:56Z host app 1 - - line{n}" for n in range(100)]
+    input_file.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    exit_code = cli.main(
+        ["--input", str(input_file), "--workers", "4", "--batch-size", "7", "--stats"]
+    )
+    captured = capsys.readouterr()
+    assert exit_code == 0
+    output = captured.out.splitlines()
+    assert [line.rsplit("msg=", 1)[1].split()[0] for line in output] == [
+        f"line{n}" for n in range(100)
+    ]
+    assert "processed=100 failed=0" in captured.err
+
+
+def test_cli_process_executor(tmp_path):
+    input_file = tmp_path / "input.log"
+    output_file = tmp_path / "output.cef"
+    lines = [f"<134>1 2023-02-01T12:34:56Z host app 1 - - line{n}" for n in range(50)]
+    input_file.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    exit_code = cli.main(
+        [
+            "--input",
+            str(input_file),
+            "--output",
+            str(output_file),
+            "--workers",
+            "2",
+            "--executor",
+            "process",
+            "--batch-size",
+            "8",
+        ]
+    )
+    assert exit_code == 0
+    output = output_file.read_text(encoding="utf-8").splitlines()
+    assert len(output) == 50
+    assert all(line.startswith("CEF:0|") for line in output)
+    assert "msg=line49" in output[-1]
+
+
+def test_cli_binary_matches_text_mode(tmp_path):
+    source = Path(__file__).parent / "data" / "messages"
+    text_out = tmp_path / "text.cef"
+    binary_out = tmp_path / "binary.cef"
+    cli.main(["--input", str(source), "--output", str(text_out), "--source", "linux"])
+    cli.main(["--input", str(source), "--output", str(binary_out), "--source", "linux", "--binary"])
+    assert binary_out.read_bytes() == text_out.read_bytes()
+
+
+def test_cli_mmap_shards_match_streaming_output(tmp_path):
+    source = Path(__file__).parent / "data" / "secure"
+    expected = tmp_path / "expected.cef"
+    sharded = tmp_path / "sharded.cef"
+    cli.main(["--input", str(source), "--output", str(expected), "--source", "linux"])
+    common = ["--input", str(source), "--source", "linux", "--mmap", "--shard-size", "4096"]
+    cli.main([*common, "--output", str(sharded), "--workers", "2"])
+    assert sharded.read_bytes() == expected.read_bytes()
+
+    cli.main([*common, "--output", str(sharded), "--split-output"])
+    parts = sorted(tmp_path.glob("sharded.cef.*"))
+    assert len(parts) > 1
+    assert b"".join(part.read_bytes() for part in parts) == expected.read_bytes()
+
+
+def test_cli_checkpoint_requires_watch(tmp_path):
+    with pytest.raises(SystemExit):
+        cli.main(["--input", "-", "--checkpoint", str(tmp_path / "state.json")])
+
+
+def test_cli_listen_requires_a_listener(capsys):
+    with pytest.raises(SystemExit):
+        cli.main(["listen", "--output", "-"])
+    assert "--udp or --tcp" in capsys.readouterr().err
+
+
+def test_cli_forwards_to_tcp_collector(capsys):
+    source = Path(__file__).parent / "data" / "messages"
+    with socket.create_server(("127.0.0.1", 0)) as server:
+        target = f"tcp://127.0.0.1:{server.getsockname()[1]}"
+        cli.main(["--input", str(source), "--output", target, "--source", "linux", "--stats"])
+        connection, _ = server.accept()
+        with connection:
+            received = b"".join(iter(lambda: connection.recv(65536), b""))
+    lines = received.decode("utf-8").splitlines()
+    assert lines and all(line.startswith("CEF:0|") for line in lines)
+    assert f"output sent={len(lines)} " in capsys.readouterr().err
+
+
+def test_cli_auto_source_reports_routing(tmp_path, capsys):
+    source = tmp_path / "mixed.log"
+    source.write_text(
+        "<14>Jan 12 06:30:00 esx01 vpxd: event_id=42 user=root\n"
+        "<189>Feb  8 04:00:48 fw01 585917: %SEC-6-IPACCESSLOGRP: list 177 denied igmp\n",
+        encoding="utf-8",
+    )
+    assert cli.main(["--input", str(source), "--source", "auto", "--stats"]) == 0
+    captured = capsys.readouterr()
+    assert "suser=root" in captured.out
+    assert "routed cisco=1 default=0 f5=0 linux=0 vmware=1" in captured.err
+    with pytest.raises(SystemExit):
+        cli.main(["--input", str(source), "--route", "fw01=cisco"])
+
+
+def test_cli_elastic_format_matches_ndjson(tmp_path, monkeypatch):
+    opened = []
+    open_binary_input = cli.open_binary_input
+
+    def tracked(path):
+        opened.append(open_binary_input(path))
+        return opened[-1]
+
+    monkeypatch.setattr(cli, "open_binary_input", tracked)
+    documents = json.loads((Path(__file__).parent / "data" / "cisco-ios.json").read_text())
+    ndjson = tmp_path / "events.ndjson"
+    ndjson.write_text("".join(json.dumps(doc) + "\n" for doc in documents), encoding="utf-8")
+    export = tmp_path / "export.json"
+    hits = [{"_id": str(index), "_source": doc} for index, doc in enumerate(documents)]
+    export.write_text(json.dumps({"hits": {"hits": hits}}), encoding="utf-8")
+    outputs = []
+    for source, fmt in ((ndjson, "json"), (export, "elastic")):
+        target = tmp_path / f"{fmt}.cef"
+        args = ["--input", str(source), "--output", str(target), "--format", fmt]
+        assert cli.main([*args, "--source", "cisco", "--batch-size", "5"]) == 0
+        outputs.append(target.read_text(encoding="utf-8"))
+    assert outputs[0] == outputs[1]
+    assert outputs[0].count("\n") == len(documents)
+    assert len(opened) == 1 and opened[0].closed
+
+
+def test_cli_dead_letter_keeps_output_valid(tmp_path, capsys):
+    input_file = tmp_path / "input.log"
+    dead_letter = tmp_path / "dead.jsonl"
+    lines = [f"<134>1 2023-02-01T12:34:56Z host app 1 - - line{n}" for n in range(10)]
+    lines[3] = "{broken json"
+    lines[8] = '{"message": ["not", "an", "object"]'
+    input_file.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    exit_code = cli.main(
+        [
+            "--input",
+            str(input_file),
+            "--batch-size",
+            "4",
+            "--dead-letter",
+            str(dead_letter),
+            "--stats",
+        ]
+    )
+    captured = capsys.readouterr()
+    assert exit_code == 0
+    output = captured.out.splitlines()
+    assert len(output) == 8
+    assert not any("parse_error" in line for line in output)
+    assert "processed=10 failed=2" in captured.err
+    records = [json.loads(line) for line in dead_letter.read_text(encoding="utf-8").splitlines()]
+    assert [(record["offset"], record["line"]) for record in records] == [
+        (3, lines[3]),
+        (8, lines[8]),
+    ]
+    assert records[0]["error"] == "JSONDecodeError" and records[0]["message"]
@@ -3,7 +3,18 @@ from __future__ import annotations
 import json
 from pathlib import Path
 
-from syslogcef.converters import convert_line, from_json, parse_syslog, to_cef
+import pytest
+
+from syslogcef._json import available_backends, get_backend, set_backend
+from syslogcef.converters import (
+    BatchConverter,
+    convert_line,
+    convert_many,
+    convert_stream,
+    from_json,
+    parse_syslog,
+    to_cef,
+)
 from syslogcef.mappings import get_mapping
 
 DATA_DIR = Path(__file__).parent / "data"
@@ -38,3 +49,59 @@ def test_to_cef_includes_timestamp():
     mapping = get_mapping("default")
     cef = to_cef(event, "Vendor", "Product", "1.0", mapping)
     assert "end=2023-02-01T12:34:56+00:00" in cef
+
+
+def test_convert_many_reports_errors():
+    lines = [
+        "<134>1 2023-02-01T12:34:56Z host app 1 - - hello",
+        b"<134>1 2023-02-01T12:34:56Z host app 1 - - bytes",
+        "{invalid json",
+    ]
+    result = convert_many(lines, source="default")
+    assert len(result.records) == 3
+    assert result.records[0] == convert_line(lines[0], source="default")
+    assert "msg=bytes" in result.records[1]
+    assert result.failed == 1
+    error = result.errors[0]
+    assert (error.index, error.line, error.exc_type) == (2, "{invalid json", "JSONDecodeError")
+
+
+def test_convert_stream_batches_keep_offsets():
+    lines = ["not syslog", "{bad", "also fine", "{bad"]
+    batches = list(convert_stream(lines, source="default", batch_size=3))
+    assert [len(batch.records) for batch in batches] == [3, 1]
+    assert [error.index for batch in batches for error in batch.errors] == [1, 3]
+
+
+def test_from_json_projects_fields_and_keeps_raw_text_message():
+    document = {"host": "h1", "user": "root", "vm": "web01", "extra": "x" * 100}
+    text = json.dumps(document, separators=(",", ":"))
+    event = from_json(document, fields={"user", "vm", "missing"}, raw_text=text)
+    assert event.fields == {"user": "root", "vm": "web01"}
+    assert event.message == text
+
+
+@pytest.mark.parametrize("backend", available_backends())
+def test_json_backends_produce_identical_output(backend):
+    lines = [
+        json.dumps(event)
+        for event in json.loads((DATA_DIR / "cisco-ios.json").read_text(encoding="utf-8"))
+    ]
+    lines += ['{"message": "nan", "value": NaN}', '{"message": ', "[1, 2]"]
+    previous = get_backend()
+    try:
+        set_backend("json")
+        expected = convert_many(lines, source="cisco")
+        set_backend(backend)
+        result = convert_many(lines, source="cisco")
+    finally:
+        set_backend(previous)
+    assert result.records == expected.records
+    assert [error.error for error in result.errors] == [error.error for error in expected.errors]
+
+
+def test_batch_converter_without_fallback_emits_valid_records_only():
+    lines = ["<134>1 2023-02-01T12:34:56Z host app 1 - - hello", "{invalid json"]
+    result = BatchConverter("default", fallback=False).convert(lines)
+    assert result.records == [convert_line(lines[0], source="default")]
+    assert [error.index for error in result.errors] == [1]
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+from syslogcef import _datetime
+from syslogcef._datetime import clear_timestamp_cache, smart_parse, timestamp_cache_info
+
+
+def test_smart_parse_rfc3339_offsets_and_fraction():
+    assert smart_parse("2023-02-01T12:34:56Z") == datetime(
+        2023, 2, 1, 12, 34, 56, tzinfo=timezone.utc
+    )
+    parsed = smart_parse("2023-02-08T17:45:18.25-0530")
+    assert parsed is not None
+    assert parsed.microsecond == 250000
+    assert parsed.utcoffset() == -timedelta(hours=5, minutes=30)
+    assert smart_parse("2023-02-30T00:00:00Z") is None
+
+
+def test_smart_parse_bsd_timestamp():
+    parsed = smart_parse("Feb  8 04:00:48")
+    assert parsed is not None
+    assert (parsed.month, parsed.day, parsed.hour, parsed.second) == (2, 8, 4, 48)
+    assert smart_parse("-") is None
+
+
+def test_smart_parse_cache_counts_repeated_timestamps():
+    clear_timestamp_cache()
+    for _ in range(3):
+        smart_parse("Feb  8 04:00:48")
+        smart_parse("2023-02-01T12:34:56Z")
+    # sub-second timestamps bypass the cache
+    smart_parse("2023-02-01T12:34:56.200Z")
+    info = timestamp_cache_info()
+    assert info.hits == 4
+    assert info.misses == 2
+
+
+def test_cached_bsd_timestamps_follow_the_year(monkeypatch):
+    clear_timestamp_cache()
+    monkeypatch.setattr(_datetime, "_default_year", lambda: 2030)
+    assert smart_parse("Jan  1 00:00:01").year == 2030
+    monkeypatch.setattr(_datetime, "_default_year", lambda: 2031)  # New Year in a long run
+    assert smart_parse("Jan  1 00:00:01").year == 2031
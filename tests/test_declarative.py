@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from syslogcef.converters import BatchConverter
+from syslogcef.mappings import cisco, vmware
+from syslogcef.mappings.declarative import MappingSpecError, compile_mapping
+from syslogcef.parsing import parse_syslog
+
+DATA = Path(__file__).parent / "data"
+
+VMWARE_SPEC = {
+    "name": "vmware-file",
+    "signature_id": ["{event_id}", "{eventTypeId}", "vmware"],
+    "event_name": ["{event}", "{eventType}", "VMware Event"],
+    "rename": {"user": "suser", "vm": "destinationServiceName", "ip": "src"},
+}
+
+
+def test_declarative_spec_matches_handwritten_mapping():
+    lines = [
+        "<14>Jan 12 06:30:00 esx01 vpxd: event_id=42 event=login user=root vm=web01 ip=10.0.0.5",
+        "<14>Jan 12 06:30:00 esx01 vpxd: eventTypeId=7 eventType=PowerOn vm=db01",
+        "<11>Jan 12 06:30:00 esx01 hostd: plain message",
+        *(DATA / "messages").read_text(encoding="utf-8").splitlines()[:200],
+    ]
+    compiled = compile_mapping(VMWARE_SPEC)
+    assert compiled.name == "vmware-file"
+    assert compiled.required_fields == vmware.required_fields
+    expected = BatchConverter("vmware", vmware).convert(lines)
+    actual = BatchConverter("vmware", compiled).convert(lines)
+    assert actual.records == expected.records
+
+
+def test_extractors_conditionals_and_severity_rules():
+    spec = {
+        "extends": "cisco",
+        "extract": [{"pattern": r"from (?P<src>[\d.]+)/(?P<spt>\d+)"}],
+        "rename": {"spt": "spt"},
+        "rules": [
+            {
+                "if": {"field": "$message", "contains": "%asa-4-106023", "ignore_case": True},
+                "event_name": "Denied by ACL",
+                "extensions": {"cs1Label": "acl", "cs1": "{acl}"},
+            }
+        ],
+        "severity": {
+            "rules": [
+                {
+                    "if": {
+                        "all": [
+                            {"field": "src", "matches": r"^10\."},
+                            {"exists": True, "field": "acl"},
+                        ]
+                    },
+                    "then": 9,
+                }
+            ]
+        },
+    }
+    mapping = compile_mapping(spec)
+    assert mapping.name == "cisco"
+    assert mapping.required_fields is not None and {"acl", "src"} <= mapping.required_fields
+    event = parse_syslog(
+        "<164>Jan 12 06:30:00 fw01 asa: %ASA-4-106023: Deny tcp from 10.1.2.3/4455 acl=outside"
+    ).as_event()
+    result = mapping.map(event)
+    assert (result.name, result.severity) == ("Denied by ACL", 9)
+    assert result.extensions["src"] == "10.1.2.3"
+    assert result.extensions["spt"] == "4455"
+    assert (result.extensions["cs1Label"], result.extensions["cs1"]) == ("acl", "outside")
+    assert result.signature_id == cisco.map(event).signature_id
+
+    other = parse_syslog("<164>Jan 12 06:30:00 fw01 asa: %ASA-6-302013: Built tcp").as_event()
+    assert mapping.map(other).severity == cisco.map(other).severity
+    assert "cs1" not in mapping.map(other).extensions
+
+
+def test_flat_override_files_extend_the_base_mapping():
+    mapping = compile_mapping(
+        {"cs2Label": "custom", "cs2": "{user}@{$host}", "raw": "{{x}}"}, base=vmware
+    )
+    event = parse_syslog("<14>Jan 12 06:30:00 esx01 vpxd: user=root").as_event()
+    result = mapping.map(event)
+    assert result.extensions["cs2"] == "root@esx01"
+    assert result.extensions["raw"] == "{x}"
+    assert result.extensions["cs2Label"] == "custom"
+    assert result.extensions["suser"] == "root"
+    assert mapping.required_fields == vmware.required_fields | {"user"}
+
+
+@pytest.mark.parametrize(
+    "spec",
+    [
+        {"extends": "nope"},
+        {"extensions": {"x": "{$nope}"}},
+        {"extract": [{"pattern": "no groups"}]},
+        {"severity": 11},
+        {"rules": [{"if": {"field": "a"}}]},
+        {"rename": {"a": "b"}, "colour": "red"},
+        {"extends": "default", "extensions": {"cs1": "{host!z}"}},
+        {"extends": "default", "extensions": {"cs1": "{host:\n}"}},
+    ],
+)
+def test_invalid_specs_are_rejected(spec):
+    with pytest.raises(MappingSpecError):
+        compile_mapping(spec)
+
+
+def test_severity_keywords_set_severity_and_category():
+    mapping = compile_mapping(
+        {
+            "severity": {
+                "default": 1,
+                "field": "msg",
+                "keywords": {"fail": {"severity": 7, "category": "auth"}, "reset": 5},
+            }
+        }
+    )
+    failed = mapping.map(parse_syslog("<13>Jan 1 00:00:00 h app: msg=FAILED login").as_event())
+    assert (failed.severity, failed.extensions["cat"]) == (7, "auth")
+    reset = mapping.map(parse_syslog("<13>Jan 1 00:00:00 h app: msg=reset").as_event())
+    assert (reset.severity, "cat" in reset.extensions) == (5, False)
+    other = mapping.map(parse_syslog("<13>Jan 1 00:00:00 h app: fail outside msg").as_event())
+    assert other.severity == 1
+    assert mapping.required_fields == {"msg"}
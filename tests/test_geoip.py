@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+import ipaddress
+import struct
+
+import pytest
+
+from syslogcef import cli
+from syslogcef.converters import BatchConverter
+from syslogcef.geoip import GeoEnricher, MMDBError, MMDBReader
+
+
+class _Pointer(int):
+    """Encoded as a pointer to this data section offset."""
+
+
+CITY = {
+    "81.2.69.0/24": {
+        "city": {"geoname_id": 2643743, "names": {"en": "London", "de": "London"}},
+        "country": {"iso_code": "GB", "names": {"en": "United Kingdom"}},
+        "location": {"latitude": 51.5142, "longitude": -0.0931, "accuracy_radius": 10},
+    },
+    "2.125.160.216/29": {
+        "country": {"iso_code": _Pointer(0)},
+        "location": {"latitude": 50.8, "longitude": -1.1},
+    },
+    "175.16.199.0/24": {
+        "registered_country": {"iso_code": "CN"},
+        "location": {"latitude": 43.88, "longitude": 125.3228},
+        "subdivisions": [{"iso_code": "22"}, {"iso_code": "X", "flag": True}],
+    },
+    "2001:db8::/32": {"country": {"iso_code": "US"}},
+}
+ASN = {"81.2.69.0/24": {"autonomous_system_number": 20712, "autonomous_system_organization": "A"}}
+
+
+def _control(kind: int, size: int) -> bytes:
+    first, extended = (kind << 5, b"") if kind <= 7 else (0, bytes([kind - 7]))
+    if size < 29:
+        return bytes([first | size]) + extended
+    if size < 285:
+        return bytes([first | 29]) + extended + bytes([size - 29])
+    return bytes([first | 30]) + extended + (size - 285).to_bytes(2, "big")
+
+
+def _encode(value: object) -> bytes:
+    if isinstance(value, _Pointer):
+        return bytes([0x20 | (value >> 8), value & 0xFF])
+    if isinstance(value, bool):
+        return _control(14, int(value))
+    if isinstance(value, dict):
+        body = b"".join(_encode(key) + _encode(item) for key, item in value.items())
+        return _control(7, len(value)) + body
+    if isinstance(value, list):
+        return _control(11, len(value)) + b"".join(_encode(item) for item in value)
+    if isinstance(value, str):
+        data = value.encode("utf-8")
+        return _control(2, len(data)) + data
+    if isinstance(value, float):
+        return _control(3, 8) + struct.pack(">d", value)
+    data = value.to_bytes((value.bit_length() + 7) // 8, "big")  # type: ignore[attr-defined]
+    return _control(6, len(data)) + data
+
+
+def write_mmdb(path, networks, *, ip_version=6, record_size=24, database_type="Test-City"):
+    """Write a tiny MaxMind DB with one record per network."""
+
+    nodes: list[list[object]] = [[None, None]]
+    data = _encode("GB")  # shared string at offset 0, referenced through _Pointer(0)
+    for network, record in networks.items():
+        net = ipaddress.ip_network(network)
+        if ip_version == 4 and net.version == 6:
+            continue
+        offset = len(data)
+        data += _encode(record)
+        prefix = net.prefixlen
+        width = net.max_prefixlen
+        if ip_version == 6 and net.version == 4:
+            width, prefix = 128, prefix + 96  # IPv4 lives at ::/96
+        bits = int(net.network_address)
+        node = 0
+        for index in range(prefix):
+            bit = (bits >> (width - 1 - index)) & 1
+            if index == prefix - 1:
+                nodes[node][bit] = ("data", offset)
+                break
+            child = nodes[node][bit]
+            if child is None:
+                nodes.append([None, None])
+                child = nodes[node][bit] = len(nodes) - 1
+            node = child  # type: ignore[assignment]
+    count = len(nodes)
+
+    def value(child: object) -> int:
+        if child is None:
+            return count
+        if isinstance(child, tuple):
+            return count + 16 + child[1]
+        return child  # type: ignore[return-value]
+
+    tree = b""
+    for left, right in nodes:
+        a, b = value(left), value(right)
+        if record_size == 24:
+            tree += a.to_bytes(3, "big") + b.to_bytes(3, "big")
+        elif record_size == 28:
+            middle = ((a >> 24) << 4) | (b >> 24)
+            tree += (a & 0xFFFFFF).to_bytes(3, "big") + bytes([middle])
+            tree += (b & 0xFFFFFF).to_bytes(3, "big")
+        else:
+            tree += a.to_bytes(4, "big") + b.to_bytes(4, "big")
+    metadata = {
+        "node_count": count,
+        "record_size": record_size,
+        "ip_version": ip_version,
+        "database_type": database_type,
+        "languages": ["en"],
+        "binary_format_major_version": 2,
+        "binary_format_minor_version": 0,
+        "build_epoch": 1700000000,
+        "description": {"en": "syslogcef test database"},
+    }
+    with open(path, "wb") as handle:
+        handle.write(tree + bytes(16) + data + b"\xab\xcd\xefMaxMind.com" + _encode(metadata))
+    return path
+
+
+@pytest.mark.parametrize("record_size", [24, 28, 32])
+def test_reader_finds_records_in_both_address_families(tmp_path, record_size):
+    path = write_mmdb(tmp_path / "city.mmdb", CITY, record_size=record_size)
+    with MMDBReader(str(path)) as reader:
+        assert reader.metadata["database_type"] == "Test-City"
+        assert reader.get("81.2.69.160") == CITY["81.2.69.0/24"]
+        assert reader.get("2.125.160.219") == {
+            "country": {"iso_code": "GB"},
+            "location": {"latitude": 50.8, "longitude": -1.1},
+        }
+        assert reader.get("2.125.160.224") is None
+        assert reader.get("2001:db8::1") == {"country": {"iso_code": "US"}}
+        assert reader.get("10.0.0.1") is None
+        assert reader.get("not-an-ip") is None
+        assert reader.lookup("175.16.199.7", [("subdivisions", 1, "flag"), ("city", "names")]) == [
+            True,
+            None,
+        ]
+
+
+def test_reader_follows_pointers_and_decodes_lazily(tmp_path):
+    path = write_mmdb(tmp_path / "city.mmdb", CITY, ip_version=4)
+    with MMDBReader(str(path)) as reader:
+        # the second GB record stores its country code as a pointer into the first
+        assert reader.lookup("2.125.160.216", [("country", "iso_code")]) == ["GB"]
+        assert reader.get("2001:db8::1") is None  # IPv6 cannot be looked up in an IPv4 tree
+
+
+def test_reader_rejects_other_files(tmp_path):
+    path = tmp_path / "bogus.mmdb"
+    path.write_bytes(b"\x00" * 64)
+    with pytest.raises(MMDBError):
+        MMDBReader(str(path))
+
+
+def test_enricher_adds_geo_extensions_and_caches(tmp_path):
+    city = MMDBReader(str(write_mmdb(tmp_path / "city.mmdb", CITY)))
+    asn = MMDBReader(str(write_mmdb(tmp_path / "asn.mmdb", ASN, database_type="Test-ASN")))
+    enricher = GeoEnricher(city, asn, cache_size=8)
+    extensions = {"src": "81.2.69.160", "dst": "175.16.199.1", "cs6": "kept"}
+    enricher.enrich(extensions)
+    assert extensions == {
+        "src": "81.2.69.160",
+        "dst": "175.16.199.1",
+        "cs6": "kept",
+        "slat": "51.5142",
+        "slong": "-0.0931",
+        "cs5": "GB",
+        "cs5Label": "srcCountry",
+        "cn1": "20712",
+        "cn1Label": "srcAsn",
+        "dlat": "43.8800",
+        "dlong": "125.3228",
+    }
+    enricher.enrich({"src": "81.2.69.160", "dst": "192.0.2.1"})
+    info = enricher.locate.cache_info()
+    assert (info.hits, info.misses) == (1, 3)
+    enricher.close()
+
+
+def test_cli_geoip_enrichment(tmp_path):
+    database = write_mmdb(tmp_path / "city.mmdb", CITY)
+    source = tmp_path / "asa.log"
+    source.write_text(
+        "<166>Oct 11 22:14:15 asa1 asa: %ASA-6-302013: Built connection "
+        "src=81.2.69.160 dst=10.1.1.1 spt=5000 dpt=443\n",
+        encoding="utf-8",
+    )
+    output = tmp_path / "out.cef"
+    argv = ["--input", str(source), "--output", str(output), "--source", "cisco"]
+    assert cli.main([*argv, "--geoip-db", str(database)]) == 0
+    record = output.read_text(encoding="utf-8")
+    assert "slat=51.5142 slong=-0.0931 cs5=GB cs5Label=srcCountry" in record
+    assert "dlat" not in record
+    with pytest.raises(SystemExit) as excinfo:
+        cli.main([*argv, "--geoip-db", str(tmp_path / "missing.mmdb")])
+    assert excinfo.value.code == 2
+
+
+def test_batch_converter_enrichment_matches_plain_output_without_addresses(tmp_path):
+    enricher = GeoEnricher(MMDBReader(str(write_mmdb(tmp_path / "city.mmdb", CITY))))
+    lines = ["<13>Oct 11 22:14:15 host app: nothing to look up"]
+    plain = BatchConverter("default").convert(lines)
+    assert BatchConverter("default", enricher=enricher).convert(lines).records == plain.records
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import io
+import json
+
+import pytest
+
+from syslogcef.ingest import decode_block, flatten_document, iter_documents, read_line_batches
+
+
+def test_decode_block_handles_newline_styles_and_utf8():
+    assert decode_block(b"a\r\nb\rc\n") == ["a", "b", "c"]
+    assert decode_block("café \xff\n".encode("latin-1")) == ["caf� �"]
+    assert decode_block("hé\n".encode()) == ["hé"]
+
+
+def test_read_line_batches_carries_partial_lines_between_blocks():
+    data = b"first line\r\nsecond\nthird without newline"
+    stream = io.BytesIO(data)
+    batches = list(read_line_batches(stream, 2, block_size=5))
+    lines = [line for batch in batches for line in batch]
+    assert lines == ["first line", "second", "third without newline"]
+    assert all(0 < len(batch) <= 2 for batch in batches)
+
+
+def _documents(data, **kwargs):
+    return list(iter_documents(io.BytesIO(data), **kwargs))
+
+
+def test_iter_documents_reads_ndjson_bulk_and_arrays_across_blocks():
+    data = (
+        b'{"index": {"_index": "logs"}}\n{"message": "one", "n": 12345}\n'
+        b'[{"message": "two"}, {"message": "th\xc3\xa9"}]\n'
+        b'{"message":\n  "pretty", "host": {"name": "h1", "ip": ["10.0.0.1"]}}'
+    )
+    expected = [
+        {"message": "one", "n": 12345},
+        {"message": "two"},
+        {"message": "thé"},
+        {"message": "pretty", "host.name": "h1", "host.ip": ["10.0.0.1"]},
+    ]
+    for block_size in (1, 7, 1 << 20):
+        assert _documents(data, block_size=block_size) == expected
+
+
+def test_iter_documents_streams_search_responses_member_by_member():
+    hits = [{"_index": "logs", "_source": {"message": f"m{i}", "a": {"b": i}}} for i in range(50)]
+    data = json.dumps({"took": 3, "hits": {"total": 50, "hits": hits}, "aggs": {}}).encode()
+    expected = [{"message": f"m{i}", "a.b": i} for i in range(50)]
+    assert _documents(data) == expected
+    # force the member-by-member path with a tiny document limit
+    assert _documents(data, block_size=64, max_document=256) == expected
+
+
+def test_iter_documents_yields_invalid_lines_as_text():
+    data = b'{"message": "ok"}\n{"message": tru}\n{"message": "after"}\n'
+    assert _documents(data) == [{"message": "ok"}, '{"message": tru}', {"message": "after"}]
+
+
+def test_iter_documents_passes_non_objects_on_and_keeps_action_like_documents():
+    data = b'"text"\n5\n{"index": "web"}\n{"index": {"_id": "1"}}\n[null, {"m": 1}]\n'
+    assert _documents(data) == ['"text"', "5", {"index": "web"}, "null", {"m": 1}]
+
+
+@pytest.mark.parametrize("block_size", [1, 3, 8, 64, 1 << 20])
+def test_iter_documents_skips_only_the_broken_array_element(block_size):
+    data = (
+        b'[{"message": "a"}, {"message": tru}, {"message": "c", "x": [1, "]"]}]\n{"message": "d"}'
+    )
+    assert _documents(data, block_size=block_size) == [
+        {"message": "a"},
+        '{"message": tru}',
+        {"message": "c", "x": [1, "]"]},
+        {"message": "d"},
+    ]
+
+
+@pytest.mark.parametrize("block_size", [1, 8, 64, 1 << 20])
+def test_iter_documents_skips_only_the_broken_streamed_hit(block_size):
+    hits = [{"_source": {"message": f"m{i}"}} for i in range(4)]
+    text = json.dumps({"took": 1, "hits": {"total": 4, "hits": hits}})
+    data = text.replace('"m2"}', "tru}").encode()
+    assert _documents(data, block_size=block_size, max_document=48) == [
+        {"message": "m0"},
+        {"message": "m1"},
+        '{"_source": {"message": tru}}',
+        {"message": "m3"},
+    ]
+
+
+def test_iter_documents_reports_truncated_arrays():
+    data = b'[{"message": "a"},\n{"message": "b"}\n'
+    for block_size in (4, 1 << 20):
+        assert _documents(data, block_size=block_size) == [{"message": "a"}, {"message": "b"}, ""]
+    assert _documents(b'[{"message": "a"}, {"message": "b') == [{"message": "a"}, '{"message": "b']
+
+
+def test_flatten_document_returns_flat_documents_unchanged():
+    document = {"a": 1, "b": [1]}
+    assert flatten_document(document) is document
+    assert flatten_document({"a": {"b": {"c": 1}, "d": {}}}) == {"a.b.c": 1, "a.d": {}}
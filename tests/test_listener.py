@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import asyncio
+import socket
+
+import pytest
+
+from syslogcef.listener import FrameDecoder, FramingError, SyslogListener, parse_endpoint, serve
+
+
+def test_frame_decoder_mixes_octet_counting_and_newlines():
+    decoder = FrameDecoder()
+    stream = b"12 <13>one two\n<13>three\r\n5 hello17 <13>multi\nline ok"
+    frames = []
+    for index in range(0, len(stream), 3):
+        frames.extend(decoder.feed(stream[index : index + 3]))
+    frames.extend(decoder.finish())
+    assert frames == [b"<13>one two\n", b"<13>three", b"hello", b"<13>multi\nline ok"]
+
+
+def test_frame_decoder_rejects_oversized_frames():
+    with pytest.raises(FramingError):
+        FrameDecoder(max_frame=10).feed(b"11 ")
+    with pytest.raises(FramingError):
+        FrameDecoder(max_frame=10).feed(b"x" * 11)
+
+
+def test_parse_endpoint():
+    assert parse_endpoint("514") == ("0.0.0.0", 514)
+    assert parse_endpoint("127.0.0.1:6514") == ("127.0.0.1", 6514)
+    assert parse_endpoint("[::1]:514") == ("::1", 514)
+    with pytest.raises(ValueError):
+        parse_endpoint("localhost:syslog")
+
+
+def test_listener_receives_udp_and_tcp_on_localhost():
+    async def scenario():
+        listener = SyslogListener(udp=[("127.0.0.1", 0)], tcp=[("127.0.0.1", 0)])
+        await listener.start()
+        (_, udp_host, udp_port), (_, tcp_host, tcp_port) = listener.addresses
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sender:
+            sender.sendto(b"<13>udp message\r\n  at frame\x0c\n", (udp_host, udp_port))
+        _, writer = await asyncio.open_connection(tcp_host, tcp_port)
+        writer.write(b"15 <13>tcp octets!<13>tcp newline\n")
+        await writer.drain()
+        writer.close()
+
+        received: list[bytes] = []
+        stop = asyncio.Event()
+
+        def handle(batch):
+            received.extend(batch)
+            if len(received) >= 3:
+                stop.set()
+
+        await asyncio.wait_for(serve(listener, handle, batch_size=10, stop=stop), timeout=5)
+        return listener, received
+
+    listener, received = asyncio.run(scenario())
+    assert sorted(received) == [
+        b"<13>tcp newline",
+        b"<13>tcp octets!",
+        b"<13>udp message\r\n  at frame\x0c",
+    ]
+    udp_stats, tcp_stats = listener.stats
+    assert udp_stats.name.startswith("udp://127.0.0.1:")
+    assert (udp_stats.received, tcp_stats.received, tcp_stats.connections) == (1, 2, 1)
+
+
+def test_listener_counts_udp_drops_when_queue_is_full():
+    async def scenario():
+        listener = SyslogListener(udp=[("127.0.0.1", 0)], queue_size=2)
+        await listener.start()
+        _, host, port = listener.addresses[0]
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sender:
+            for index in range(5):
+                sender.sendto(b"<13>message %d" % index, (host, port))
+        for _ in range(50):
+            if listener.stats[0].received == 5:
+                break
+            await asyncio.sleep(0.01)
+        batches = list(listener.drain(10))
+        listener.close()
+        return listener.stats[0], batches
+
+    stats, batches = asyncio.run(scenario())
+    assert (stats.received, stats.dropped, stats.max_queue_depth) == (5, 3, 2)
+    assert batches == [[b"<13>message 0", b"<13>message 1"]]
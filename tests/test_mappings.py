@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from syslogcef.mappings.base import KeywordClassifier
+
+
+def _brute_force(table, text):
+    hits = [(-severity, index, keyword) for index, (keyword, severity) in enumerate(table.items())]
+    found = [hit for hit in hits if hit[2] in text.lower()]
+    return min(found)[2] if found else None
+
+
+@pytest.mark.parametrize("size", [5, 200])
+def test_keyword_classifier_matches_brute_force(size):
+    rng = random.Random(size)
+    table = {"deny": 8, "den": 9, "nyc": 10, "blocked": 8, "locked": 9}
+    while len(table) < size:
+        word = "".join(rng.choice("abcdeklnoy") for _ in range(rng.randint(2, 6)))
+        table.setdefault(word, rng.randint(0, 10))
+    table = dict(list(table.items())[:size])
+    classifier = KeywordClassifier(table)
+    for _ in range(500):
+        text = "".join(rng.choice("abcdeklnoy ABCDE") for _ in range(rng.randint(0, 40)))
+        match = classifier.classify(text)
+        assert (match.keyword if match else None) == _brute_force(table, text), text
+
+
+def test_keyword_classifier_categories_and_ties():
+    classifier = KeywordClassifier({"teardown": (8, "session"), "deny": (8, "acl"), "allow": 3})
+    assert classifier.classify("Deny after TEARDOWN").category == "session"
+    assert classifier.classify("allowed").severity == 3
+    assert classifier.classify("nothing here") is None
+    with pytest.raises(ValueError):
+        KeywordClassifier({"": 1})
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import random
+import urllib.request
+from pathlib import Path
+
+from syslogcef import cli
+from syslogcef.converters import BatchConverter
+from syslogcef.mappings import SourceRouter
+from syslogcef.metrics import Histogram, Metrics, MetricsSample, serve_metrics
+
+DATA = Path(__file__).parent / "data"
+
+
+def test_histogram_quantiles_are_within_a_bucket():
+    rng = random.Random(7)
+    values = sorted(rng.randrange(1, 10**8) for _ in range(5000))
+    histogram = Histogram()
+    for value in values:
+        histogram.observe(value)
+    for fraction in (0.5, 0.9, 0.99):
+        exact = values[round(fraction * len(values)) - 1]
+        assert exact < histogram.quantile(fraction) <= exact * 1.25 + 1
+    assert histogram.count == len(values) and histogram.total == sum(values)
+    assert histogram.cumulative(20) == sum(value < 1 << 20 for value in values)
+
+
+def test_histogram_merge_matches_single_histogram():
+    left, right, both = Histogram(), Histogram(), Histogram()
+    for value in range(0, 10**6, 997):
+        (left if value % 2 else right).observe(value)
+        both.observe(value)
+    left.merge(right)
+    assert left.counts == both.counts and left.count == both.count
+
+
+def test_measured_conversion_matches_plain_and_counts_stages():
+    lines = (DATA / "cisco-ios.log").read_text(encoding="utf-8").splitlines()
+    lines.append("not syslog")
+    metrics = Metrics()
+    plain = BatchConverter("auto").convert(lines)
+    measured = BatchConverter("auto", metrics=metrics).convert(lines)
+    assert measured.records == plain.records
+    assert measured.errors == plain.errors
+    totals = metrics.totals
+    assert totals.processed == len(lines)
+    assert totals.failed == plain.failed
+    assert totals.events[("cisco", "syslog")] > 0
+    assert totals.stages["parse"].count == len(lines) - plain.failed
+
+
+def test_measured_conversion_routes_each_event_once():
+    # default decisions are never memoised, so every event is one cache miss
+    lines = [f"<13>Jan 12 06:30:00 app{index} svc: plain=message" for index in range(2)]
+    lines.append("<14>Jan 12 06:30:00 esx01 vpxd: event=login")
+    router = SourceRouter()
+    metrics = Metrics()
+    BatchConverter("auto", router, metrics=metrics).convert(lines)
+    assert router.stats.cache_misses == 3
+    events = metrics.totals.events
+    assert (events[("default", "syslog")], events[("vmware", "syslog")]) == (2, 1)
+
+
+def test_prometheus_rendering_and_http_endpoint():
+    metrics = Metrics()
+    sample = MetricsSample(events={("linux", "syslog"): 3}, failed=1)
+    sample.histogram("parse").observe(1500)
+    metrics.record(sample)
+    metrics.gauge("queue_depth", lambda: 5)
+    text = metrics.render()
+    assert 'syslogcef_events_total{mapping="linux",format="syslog"} 3' in text
+    assert "syslogcef_failed_total 1" in text
+    assert 'syslogcef_stage_seconds_bucket{stage="parse",le="2.048e-06"} 1' in text
+    assert 'syslogcef_stage_seconds_bucket{stage="parse",le="1.024e-06"} 0' in text
+    assert "syslogcef_queue_depth 5" in text
+    server = serve_metrics(metrics, "127.0.0.1", 0)
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        with urllib.request.urlopen(url, timeout=5) as response:
+            body = response.read().decode("utf-8")
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert "syslogcef_failed_total 1" in body
+
+
+def test_cli_metrics_file_includes_process_workers(tmp_path, capsys):
+    source = DATA / "messages"
+    metrics_file = tmp_path / "metrics.prom"
+    exit_code = cli.main(
+        [
+            "--input",
+            str(source),
+            "--output",
+            str(tmp_path / "out.cef"),
+            "--source",
+            "linux",
+            "--workers",
+            "2",
+            "--executor",
+            "process",
+            "--batch-size",
+            "5",
+            "--metrics-file",
+            str(metrics_file),
+            "--metrics-stderr",
+        ]
+    )
+    assert exit_code == 0
+    count = len((tmp_path / "out.cef").read_text(encoding="utf-8").splitlines())
+    text = metrics_file.read_text(encoding="utf-8")
+    assert f'syslogcef_stage_seconds_count{{stage="parse"}} {count}' in text
+    assert "syslogcef_batches_in_flight 0" in text
+    assert f"processed={count}" in capsys.readouterr().err
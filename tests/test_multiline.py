@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+from syslogcef import cli
+from syslogcef.multiline import AuditGrouper, MultilineJoiner, reassemble
+from syslogcef.tail import TailBatch
+
+TRACE = [
+    "<11>Oct 11 22:14:15 app01 java[42]: Unhandled exception in worker\n",
+    "java.lang.IllegalStateException: boom\n",
+    "\tat com.example.Worker.run(Worker.java:17)\n",
+    "\tat java.base/java.lang.Thread.run(Thread.java:833)\n",
+    "Caused by: java.io.IOException: closed\n",
+    "\t... 2 more\n",
+    "<14>Oct 11 22:14:16 app01 java[42]: recovered\n",
+]
+
+AUDIT = [
+    "type=SYSCALL msg=audit(1700000000.100:7): arch=c000003e syscall=59 success=yes pid=10",
+    'type=EXECVE msg=audit(1700000000.100:7): argc=2 a0="ls" a1="-l"',
+    "type=SYSCALL msg=audit(1700000000.200:8): arch=c000003e syscall=2 success=no pid=11",
+    'type=CWD msg=audit(1700000000.100:7): cwd="/root"',
+    "type=EOE msg=audit(1700000000.100:7): ",
+    "type=PROCTITLE msg=audit(1700000000.200:8): proctitle=636174",
+]
+
+
+def test_joiner_with_start_pattern_keeps_one_event_per_record():
+    joiner = MultilineJoiner(start=r"<\d+>")
+    events = joiner.feed(TRACE, now=0.0) + joiner.finish()
+    assert len(events) == 2
+    assert events[0].splitlines() == [line.rstrip("\n") for line in TRACE[:6]]
+    assert events[1] == TRACE[6].rstrip("\n")
+    assert joiner.pending == 0
+
+
+def test_joiner_bounds_and_timeout():
+    joiner = MultilineJoiner(max_lines=3, timeout=2.0)
+    events = joiner.feed(["start", " a", " b", " c", " d"], now=0.0)
+    assert events == ["start\n a\n b"]
+    assert joiner.expire(now=1.0) == []
+    assert joiner.expire(now=2.5) == [" c\n d"]
+    assert joiner.pending == 0
+
+
+def test_audit_grouper_merges_records_by_serial():
+    grouper = AuditGrouper()
+    events = grouper.feed(AUDIT[:5], now=0.0)
+    # EOE closes serial 7; serial 8 is still open
+    assert events == [AUDIT[0] + ' argc=2 a0="ls" a1="-l" cwd="/root"']
+    assert grouper.feed(AUDIT[5:], now=0.0) == []
+    assert grouper.finish() == [AUDIT[2] + " proctitle=636174"]
+    assert grouper.feed(["Oct 11 22:14:15 host sshd[1]: hi"], now=0.0) == [
+        "Oct 11 22:14:15 host sshd[1]: hi"
+    ]
+
+
+def test_audit_grouper_limits_open_serials():
+    grouper = AuditGrouper(max_pending=2)
+    events = grouper.feed([AUDIT[0], AUDIT[2], AUDIT[0].replace(":7)", ":9)")], now=0.0)
+    assert events == [AUDIT[0]]
+    assert grouper.pending == 2
+
+
+def test_reassemble_flushes_on_idle_markers_and_keeps_safe_offsets():
+    clock = iter([0.0, 5.0, 6.0]).__next__
+    batches = [
+        TailBatch(["start", " more"], (1, 2), 12),
+        TailBatch((), (1, 2), 12),
+        TailBatch(["next"], (1, 2), 17),
+    ]
+    output = list(reassemble(batches, MultilineJoiner(timeout=2.0), clock=clock))
+    assert output == [["start\n more"], [], ["next"]]
+    # "next" stays buffered until the end, so its batch only checkpoints at the end
+    assert [batch.offset for batch in output] == [12, 12, 17]
+
+
+def test_cli_multiline_stacktrace(tmp_path):
+    source = tmp_path / "trace.log"
+    source.write_text("".join(TRACE), encoding="utf-8")
+    output = tmp_path / "out.cef"
+    exit_code = cli.main(
+        ["--input", str(source), "--output", str(output), "--multiline", "stacktrace"]
+    )
+    assert exit_code == 0
+    records = output.read_text(encoding="utf-8").splitlines()
+    assert len(records) == 2
+    assert "boom\\n\tat com.example.Worker.run" in records[0]
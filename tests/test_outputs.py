@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import socket
+
+import pytest
+
+from syslogcef import cli, outputs
+from syslogcef.listener import FrameDecoder
+from syslogcef.outputs import NetworkOutput, is_network_target
+
+
+def _read_all(server: socket.socket) -> bytes:
+    connection, _ = server.accept()
+    chunks = []
+    with connection:
+        while chunk := connection.recv(65536):
+            chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def test_is_network_target():
+    assert is_network_target("tcp://collector:514")
+    assert not is_network_target("/var/log/out.cef")
+    assert not is_network_target("-")
+    with pytest.raises(ValueError):
+        NetworkOutput("tcp://collector")
+
+
+def test_tcp_output_uses_octet_counting_over_one_connection():
+    with socket.create_server(("127.0.0.1", 0)) as server:
+        port = server.getsockname()[1]
+        output = NetworkOutput(f"tcp://127.0.0.1:{port}", framing="octet")
+        output.write("CEF:0|a\nCEF:0|b\n")
+        output.write(b"CEF:0|c\n")
+        output.close()
+        data = _read_all(server)
+    assert FrameDecoder().feed(data) == [b"CEF:0|a", b"CEF:0|b", b"CEF:0|c"]
+    assert output.stats.sent == 3
+
+
+def test_udp_output_sends_one_datagram_per_event():
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as receiver:
+        receiver.bind(("127.0.0.1", 0))
+        receiver.settimeout(2)
+        output = NetworkOutput(f"udp://127.0.0.1:{receiver.getsockname()[1]}")
+        output.write("CEF:0|a\nCEF:0|b\n")
+        output.close()
+        assert [receiver.recv(100), receiver.recv(100)] == [b"CEF:0|a", b"CEF:0|b"]
+
+
+def test_tcp_output_spools_while_collector_is_down(tmp_path):
+    spool = tmp_path / "cef.spool"
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(("127.0.0.1", 0))  # bound but not listening: connections are refused
+    port = server.getsockname()[1]
+    try:
+        output = NetworkOutput(
+            f"tcp://127.0.0.1:{port}", spool=str(spool), spool_limit=16, backoff=0.0
+        )
+        output.write("CEF:0|a\n")
+        output.write("CEF:0|b\n")
+        output.write("CEF:0|dropped\n")
+        assert spool.read_bytes() == b"CEF:0|a\nCEF:0|b\n"
+        assert (output.stats.spooled, output.stats.spool_dropped) == (2, 1)
+        assert output.stats.errors >= 1
+
+        server.listen()
+        output.write("CEF:0|c\n")
+        output.close()
+        assert _read_all(server) == b"CEF:0|a\nCEF:0|b\nCEF:0|c\n"
+        assert spool.read_bytes() == b""
+    finally:
+        server.close()
+
+
+def test_spool_compacts_and_resumes_after_restart(tmp_path, monkeypatch):
+    monkeypatch.setattr(outputs, "_REPLAY_CHUNK", 8)  # replay one 8-byte line at a time
+    spool = tmp_path / "cef.spool"
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(("127.0.0.1", 0))
+    port = server.getsockname()[1]
+    budget = [0]
+
+    def flaky_send(payload: bytes) -> bool:
+        budget[0] -= 1
+        return budget[0] >= 0
+
+    try:
+        output = NetworkOutput(f"tcp://127.0.0.1:{port}", spool=str(spool), spool_limit=24)
+        monkeypatch.setattr(output, "_send", flaky_send)
+        for name in "abc":
+            output.write(f"CEF:0|{name}\n")
+        budget[0] = 1
+        output.flush()  # "a" is delivered, "b" fails
+        # the spool is full on disk, so the delivered "a" is compacted away to make room
+        output.write("CEF:0|d\n")
+        assert spool.read_bytes() == b"CEF:0|b\nCEF:0|c\nCEF:0|d\n"
+        assert output.stats.spool_dropped == 0
+        budget[0] = 1
+        output.close()  # "b" is delivered before the process "stops"
+
+        server.listen()
+        restarted = NetworkOutput(f"tcp://127.0.0.1:{port}", spool=str(spool), spool_limit=24)
+        restarted.close()
+        assert _read_all(server) == b"CEF:0|c\nCEF:0|d\n"
+        assert spool.read_bytes() == b""
+    finally:
+        server.close()
+
+
+@pytest.mark.parametrize("command", [[], ["listen", "--udp", "127.0.0.1:0"]])
+def test_spool_needs_a_network_output(tmp_path, command):
+    argv = ["--output", str(tmp_path / "out.cef"), "--spool", str(tmp_path / "cef.spool")]
+    with pytest.raises(SystemExit) as excinfo:
+        cli.main([*command, *argv])
+    assert excinfo.value.code == 2
@@ -1,8 +1,20 @@
 from __future__ import annotations
 
+import dataclasses
+import random
+import re
 from datetime import timezone
+from pathlib import Path
 
-from syslogcef.parsing import parse_kv_pairs, parse_syslog
+from syslogcef._datetime import smart_parse
+from syslogcef.parsing import (
+    KV_RE,
+    clear_template_cache,
+    parse_kv_pairs,
+    parse_syslog,
+    template_cache_info,
+)
+from syslogcef.utils import ParsedEvent, ensure_tz
 
 
 def test_parse_rfc3164_line():
@@ -34,3 +46,163 @@ def test_parse_kv_pairs_with_json_fragment():
     kv = parse_kv_pairs(fragment)
     assert kv["user"] == "bob"
     assert kv["action"] == "logout"
+
+
+_RFC5424_RE = re.compile(
+    r"^<(?P<pri>\d+)>(?P<version>\d+)\s+(?P<timestamp>\S+)\s+(?P<hostname>\S+)\s+"
+    r"(?P<appname>\S+)\s+(?P<procid>\S+)\s+(?P<msgid>\S+)\s+"
+    r"(?P<structured>(?:-|(?:\[[^\]]*\])+))\s*(?P<msg>.*)$"
+)
+_RFC3164_RE = re.compile(
+    r"^<(?P<pri>\d+)>(?P<timestamp>[A-Z][a-z]{2}\s+\d{1,2}\s+\d{2}:\d{2}:\d{2})\s+"
+    r"(?P<hostname>\S+)\s+(?P<tag>[\w\-./]+)(?:\[(?P<pid>[^\]]+)\])?:\s*(?P<msg>.*)$"
+)
+
+
+def _reference_parse(line):
+    """The regex cascade the header scanner replaced, kept as a conformance oracle."""
+
+    raw = line.rstrip("\n")
+    result = dict(pri=None, version=None, timestamp=None, hostname=None, app_name=None)
+    result.update(procid=None, msgid=None, message=raw, structured_data={})
+    match = _RFC5424_RE.match(raw)
+    if match:
+        structured = {}
+        for element in re.finditer(r"\[(?P<id>[^\s\]=]+)(?P<data>[^\]]*)\]", match["structured"]):
+            pairs = re.finditer(r"(?P<key>[\w\-.]+)=\"(?P<value>.*?)\"", element["data"])
+            structured[element["id"]] = {pair["key"]: pair["value"] for pair in pairs}
+        result.update(
+            pri=int(match["pri"]),
+            version=int(match["version"]),
+            timestamp=smart_parse(match["timestamp"]),
+            hostname="" if match["hostname"] == "-" else match["hostname"],
+            app_name="" if match["appname"] == "-" else match["appname"],
+            procid=None if match["procid"] == "-" else match["procid"],
+            msgid=None if match["msgid"] == "-" else match["msgid"],
+            message=match["msg"],
+            structured_data=structured,
+        )
+    elif match := _RFC3164_RE.match(raw):
+        result.update(
+            pri=int(match["pri"]),
+            timestamp=smart_parse(match["timestamp"]),
+            hostname=match["hostname"],
+            app_name=match["tag"],
+            procid=match["pid"],
+            message=match["msg"],
+        )
+    result["timestamp"] = ensure_tz(result["timestamp"], None)
+    result["kv_pairs"] = parse_kv_pairs(result["message"])
+    return result
+
+
+def _conformance_corpus():
+    data = Path(__file__).parent / "data"
+    lines = (data / "syslog-conformance.log").read_text(encoding="utf-8").split("\n")
+    for name in ("messages", "secure", "cisco-ios.log", "dnf.log"):
+        for line in (data / name).read_text(encoding="utf-8").splitlines():
+            lines.extend([line, f"<13>{line}"])
+    return lines
+
+
+def test_header_scanner_matches_regex_cascade():
+    for line in _conformance_corpus():
+        parsed = parse_syslog(line)
+        actual = {field: getattr(parsed, field) for field in _reference_parse(line)}
+        assert actual == _reference_parse(line), line
+
+
+def test_structured_data_escapes_and_brackets_in_values():
+    line = (
+        r"<134>1 2023-02-01T12:34:56Z host app - - "
+        r'[origin ip="10.0.0.1" path="C:\\temp\\x" note="a \"quoted\" ] bracket"][meta x="\]"] tail'
+    )
+    parsed = parse_syslog(line)
+    assert parsed.structured_data == {
+        "origin": {"ip": "10.0.0.1", "path": "C:\\temp\\x", "note": 'a "quoted" ] bracket'},
+        "meta": {"x": "]"},
+    }
+    assert parsed.message == "tail"
+
+
+def test_fields_are_extracted_lazily_and_projected():
+    line = '<134>1 2023-02-01T12:34:56Z host app 1 - [meta a.b="1"] user=alice action=login src=1'
+    parsed = parse_syslog(line)
+    event = parsed.as_event(fields=frozenset({"user", "meta.a.b", "missing"}))
+    assert event.fields == {"meta.a.b": "1", "user": "alice"}
+    assert parse_syslog(line).as_event().fields == {
+        "meta.a.b": "1",
+        "user": "alice",
+        "action": "login",
+        "src": "1",
+    }
+    assert event.raw["structured_data"] == {"meta": {"a.b": "1"}}
+    assert event.raw["timestamp"] == "2023-02-01T12:34:56+00:00"
+
+
+def test_lazy_event_supports_dataclass_helpers():
+    event = parse_syslog("<13>Feb  8 04:00:48 host app[1]: user=alice").as_event()
+    copy = dataclasses.replace(event, host="x")
+    assert (copy.host, copy.message, copy.fields) == ("x", event.message, {"user": "alice"})
+    assert copy.raw == event.raw and copy == dataclasses.replace(copy)
+    as_dict = dataclasses.asdict(event)
+    assert as_dict["fields"] == {"user": "alice"} and as_dict["raw"]["app_name"] == "app"
+    assert set(as_dict) == {field.name for field in dataclasses.fields(ParsedEvent)}
+
+
+def test_lazy_syslog_record_is_a_dataclass():
+    line = '<134>1 2023-02-01T12:34:56Z host app 1 - [meta a="1"] user=alice'
+    parsed = parse_syslog(line)
+    assert dataclasses.is_dataclass(parsed) and parsed == parse_syslog(line)
+    assert parsed != parse_syslog(line.replace("alice", "bob"))
+    copy = dataclasses.replace(parse_syslog(line), hostname="x")
+    assert (copy.hostname, copy.kv_pairs, copy.structured_data) == (
+        "x",
+        {"user": "alice"},
+        {"meta": {"a": "1"}},
+    )
+    as_dict = dataclasses.asdict(parse_syslog(line))
+    assert as_dict["kv_pairs"] == {"user": "alice"} and as_dict["structured_data"]["meta"]
+    assert "kv_pairs={'user': 'alice'}" in repr(parse_syslog(line))
+
+
+def test_projection_without_matching_keys_skips_kv_scan(monkeypatch):
+    parsed = parse_syslog("<13>Feb  8 04:00:48 host app[1]: action=login")
+    monkeypatch.setattr("syslogcef.parsing.parse_kv_pairs", None)  # must not be called
+    assert parsed.select_fields(frozenset({"user"})) == {}
+
+
+def _scan_kv_pairs(text):
+    """The generic key/value scan, as an oracle for the template cache."""
+
+    pairs = {}
+    for match in KV_RE.finditer(text):
+        value = match.group("value")
+        pairs[match.group("key")] = value[1:-1] if value[:1] == value[-1:] == '"' else value
+    return pairs
+
+
+def test_template_cache_learns_shapes_and_matches_generic_scan():
+    clear_template_cache()
+    rng = random.Random(5)
+    values = ["1", "abc", '"x y"', '"', '""', "a=b", '"a', 'b"', 'x"y', " ", "=", '"q"r', "é"]
+    for trial in range(5000):
+        keys = trial % 5 + 1
+        message = f"%ASA-6-30201{keys}: " + " ".join(
+            f"k{index}={rng.choice(values)}" for index in range(keys)
+        )
+        message += rng.choice(["", " tail", " x=", " =", ' "'])
+        assert parse_kv_pairs(message) == _scan_kv_pairs(message)
+    info = template_cache_info()
+    assert info.hits > 0 and info.mismatches > 0
+    assert info.currsize <= 5 * 5 * 4
+
+
+def test_template_cache_hits_repeated_shapes():
+    clear_template_cache()
+    lines = [
+        f'type=SYSCALL msg=audit(1675984375.{n}:{n}): syscall=59 pid={n} exe="/usr/bin/x y" key=k'
+        for n in range(100)
+    ]
+    assert [parse_kv_pairs(line) for line in lines] == [_scan_kv_pairs(line) for line in lines]
+    assert template_cache_info() == (98, 2, 0, 1)
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from syslogcef.pipeline import batched, ordered_map
+
+
+def test_batched_splits_tail():
+    assert list(batched(range(5), 2)) == [[0, 1], [2, 3], [4]]
+    with pytest.raises(ValueError):
+        list(batched([], 0))
+
+
+def test_ordered_map_preserves_order_with_bounded_window():
+    in_flight = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def work(batch: list[int]) -> int:
+        nonlocal in_flight, peak
+        with lock:
+            in_flight += 1
+            peak = max(peak, in_flight)
+        time.sleep(0.001 * (batch[0] % 3))
+        with lock:
+            in_flight -= 1
+        return sum(batch)
+
+    batches = [[n, n] for n in range(50)]
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(ordered_map(executor, work, batches, max_in_flight=3))
+    assert [result for _, result in results] == [n * 2 for n in range(50)]
+    assert peak <= 3
+
+
+def test_ordered_map_drains_on_flush_marker():
+    seen: list[int] = []
+
+    def source():
+        yield [1]
+        yield []
+        # every result submitted before the marker is visible before we resume
+        assert seen == [1]
+        yield [2]
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        for _, result in ordered_map(executor, sum, source(), max_in_flight=8):
+            seen.append(result)
+    assert seen == [1, 2]
+
+
+def test_ordered_map_yields_flush_markers_with_on_flush():
+    caller = threading.get_ident()
+
+    def idle(item: list[int]) -> int:
+        assert threading.get_ident() == caller
+        return -1
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        pairs = ordered_map(executor, sum, [[1], [], [2, 3]], max_in_flight=8, on_flush=idle)
+        assert list(pairs) == [([1], 1), ([], -1), ([2, 3], 5)]
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from syslogcef import cli
+from syslogcef.mappings import get_mapping
+from syslogcef.mappings.base import MappingResult
+from syslogcef.policy import PolicySpecError, compile_policies
+from syslogcef.utils import ParsedEvent
+
+MAPPING = get_mapping("default")
+
+
+def _event(host: str = "fw1", priority: int | None = 14) -> ParsedEvent:
+    return ParsedEvent(timestamp=None, host=host, app_name="app", priority=priority, message="x")
+
+
+def _result(signature: str = "sig", severity: int = 3) -> MappingResult:
+    return MappingResult(signature, "name", severity, {})
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_token_bucket_per_host():
+    clock = FakeClock()
+    engine = compile_policies(
+        [{"name": "per-host", "rate": 1, "burst": 2, "per": "host"}], clock=clock
+    )
+    admitted = [engine.admit(_event(), _result(), MAPPING) for _ in range(4)]
+    assert admitted == [True, True, False, False]
+    assert engine.admit(_event(host="fw2"), _result(), MAPPING)
+    clock.now = 1.5  # one and a half tokens refilled
+    assert engine.admit(_event(), _result(), MAPPING)
+    assert not engine.admit(_event(), _result(), MAPPING)
+    assert engine.stats.dropped == {"per-host": 3}
+
+
+def test_sampling_by_severity_band_and_matchers():
+    engine = compile_policies(
+        [
+            {"name": "info", "match": {"syslog_severity": "6-7"}, "sample": 0.25, "seed": 1},
+            {
+                "name": "noisy",
+                "match": {"signature": ["acl-hit"], "severity": [0, "1-2"]},
+                "sample": 0,
+            },
+        ]
+    )
+    kept = sum(engine.admit(_event(priority=14), _result(), MAPPING) for _ in range(4000))
+    assert 800 < kept < 1200
+    # severity 3 (err) is outside the band and never sampled
+    assert all(engine.admit(_event(priority=11), _result(), MAPPING) for _ in range(100))
+    assert not engine.admit(_event(priority=11), _result("acl-hit", 2), MAPPING)
+    assert engine.admit(_event(priority=11), _result("acl-hit", 5), MAPPING)
+    assert engine.stats.dropped["noisy"] == 1
+
+
+@pytest.mark.parametrize(
+    "spec",
+    [
+        {"name": "x"},
+        {"sample": 2},
+        {"rate": 1, "per": "user"},
+        {"rate": 1, "match": {"facility": 1}},
+        {"rate": 1, "burst": "many"},
+    ],
+)
+def test_invalid_policies_are_rejected(spec):
+    with pytest.raises(PolicySpecError):
+        compile_policies([spec])
+
+
+def test_cli_policies_from_mapping_file(tmp_path, capsys):
+    mapping_file = tmp_path / "mapping.json"
+    mapping_file.write_text(
+        json.dumps(
+            {
+                "extensions": {"cs1Label": "site", "cs1": "dc1"},
+                "extends": "linux",
+                "policies": [{"name": "debug", "match": {"syslog_severity": 7}, "sample": 0}],
+            }
+        ),
+        encoding="utf-8",
+    )
+    source = tmp_path / "in.log"
+    source.write_text(
+        "<15>Oct 11 22:14:15 host app: debug chatter\n<11>Oct 11 22:14:16 host app: disk failed\n",
+        encoding="utf-8",
+    )
+    exit_code = cli.main(["--input", str(source), "--mapping-file", str(mapping_file), "--stats"])
+    assert exit_code == 0
+    captured = capsys.readouterr()
+    records = captured.out.splitlines()
+    assert len(records) == 1 and "disk failed" in records[0] and "cs1=dc1" in records[0]
+    assert "processed=2 failed=0" in captured.err
+    assert "policy dropped debug=1" in captured.err
+
+
+def test_cli_counts_policy_drops_in_process_workers(tmp_path, capsys):
+    mapping_file = tmp_path / "mapping.json"
+    mapping_file.write_text(
+        json.dumps({"policies": [{"name": "debug", "match": {"syslog_severity": 7}, "sample": 0}]}),
+        encoding="utf-8",
+    )
+    source = tmp_path / "in.log"
+    source.write_text(
+        "".join(f"<{15 if n % 2 else 11}>Oct 11 22:14:15 host app: event {n}\n" for n in range(40)),
+        encoding="utf-8",
+    )
+    argv = ["--input", str(source), "--mapping-file", str(mapping_file), "--stats"]
+    workers = ["--workers", "2", "--executor", "process", "--batch-size", "5"]
+    assert cli.main([*argv, *workers]) == 0
+    captured = capsys.readouterr()
+    assert len(captured.out.splitlines()) == 20
+    assert "policy dropped debug=20" in captured.err
+
+
+def test_cli_mapping_policies_see_the_routed_source(tmp_path, capsys):
+    mapping_file = tmp_path / "mapping.json"
+    mapping_file.write_text(
+        json.dumps(
+            {
+                "cs1Label": "site",
+                "policies": [{"name": "asa", "match": {"mapping": "cisco"}, "sample": 0}],
+            }
+        ),
+        encoding="utf-8",
+    )
+    source = tmp_path / "in.log"
+    source.write_text(
+        "<166>Oct 11 22:14:15 fw01 1234: %ASA-6-302013: Built outbound TCP connection\n"
+        "<13>Oct 11 22:14:16 app01 svc: plain message\n",
+        encoding="utf-8",
+    )
+    argv = ["--input", str(source), "--source", "auto", "--mapping-file", str(mapping_file)]
+    assert cli.main([*argv, "--stats"]) == 0
+    captured = capsys.readouterr()
+    records = captured.out.splitlines()
+    assert len(records) == 1 and "plain message" in records[0] and "cs1Label=site" in records[0]
+    assert "policy dropped asa=1" in captured.err
+    assert "routed cisco=1 default=1 " in captured.err and "cache_misses=2" in captured.err
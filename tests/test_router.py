@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from syslogcef import cli
+from syslogcef.converters import BatchConverter, _parse_line_to_event, convert_line
+from syslogcef.mappings import get_mapping
+from syslogcef.mappings.router import SourceRouter
+
+DATA = Path(__file__).parent / "data"
+
+SAMPLES = {
+    "vmware": "<14>Jan 12 06:30:00 esx01 vpxd: event_id=42 event=login user=root vm=web01",
+    "f5": "<13>Jan 12 06:30:00 lb01 tmm[1234]: 01070417:5: client_ip=10.0.0.1 vip=/Common/web",
+    "default": "<13>Jan 12 06:30:00 app01 myservice: plain=message",
+}
+
+
+def _parse(line):
+    return _parse_line_to_event(line, default_tz=None)
+
+
+def _mixed_feed():
+    cisco = (DATA / "cisco-ios.log").read_text().splitlines()[:20]
+    feed = [(line, "cisco") for line in cisco] + [("<189>" + line, "cisco") for line in cisco]
+    feed += [("<38>" + line, "linux") for line in (DATA / "secure").read_text().splitlines()[:20]]
+    feed += [(line, "linux") for line in (DATA / "audit.log").read_text().splitlines()[1:20]]
+    feed += [(line, source) for source, line in SAMPLES.items()]
+    return feed
+
+
+def test_router_matches_per_source_conversion():
+    feed = _mixed_feed()
+    router = SourceRouter()
+    routed = BatchConverter("auto", router).convert(line for line, _ in feed)
+    for (line, source), record in zip(feed, routed.records, strict=True):
+        assert router.route(_parse(line)).name == source
+        assert record == BatchConverter(source).convert([line]).records[0], line
+    counts = router.stats.counts
+    assert (counts["cisco"], counts["vmware"], counts["f5"], counts["default"]) == (40, 1, 1, 1)
+    assert counts["linux"] == 39
+    # one miss per (host, app) pair; numeric Cisco sequence tags share one entry
+    assert router.stats.cache_misses < 10
+
+
+def test_router_routes_take_precedence_and_cache_is_bounded():
+    router = SourceRouter(routes={"app01": "vmware", "myservice": "f5"}, cache_size=2)
+    event = _parse(SAMPLES["default"])
+    assert router.route(event).name == "vmware"
+    for index in range(5):
+        router.route(_parse(f"<13>Jan 1 00:00:00 h{index} x: y"))
+    assert len(router._cache) <= 2
+    with pytest.raises(ValueError):
+        SourceRouter(routes={"fw": "juniper"})
+    assert isinstance(get_mapping("auto"), SourceRouter)
+
+
+def test_router_does_not_cache_default_decisions(tmp_path, capsys):
+    source = tmp_path / "asa.log"
+    source.write_text(
+        "<166>Oct 11 22:14:15 fw01 1234: last message repeated 3 times\n"
+        "<166>Oct 11 22:14:16 fw01 1235: %ASA-6-302013: Built outbound TCP connection\n",
+        encoding="utf-8",
+    )
+    assert cli.main(["--input", str(source), "--source", "auto", "--stats"]) == 0
+    assert "routed cisco=1 default=1 " in capsys.readouterr().err
+
+
+def test_auto_mapping_is_shared_and_counts_across_threads():
+    router = get_mapping("auto")
+    assert get_mapping("AUTO") is router
+    misses = router.stats.cache_misses
+    for _ in range(3):
+        convert_line(SAMPLES["vmware"], source="auto")
+    assert router.stats.cache_misses == misses + 1
+
+    shared = SourceRouter()
+    converter = BatchConverter("auto", shared)
+    lines = [SAMPLES["vmware"]] * 500
+    with ThreadPoolExecutor(4) as pool:
+        list(pool.map(converter.convert, [lines] * 8))
+    assert shared.stats.counts["vmware"] == 4000
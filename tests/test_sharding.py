@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+from syslogcef import cli
+from syslogcef.sharding import plan_shards, read_shard_lines
+
+
+def test_plan_shards_aligns_ranges_on_newlines(tmp_path):
+    path = tmp_path / "input.log"
+    lines = [f"line {n} " + "x" * (n % 7) for n in range(40)]
+    path.write_bytes(("\n".join(lines)).encode())
+    shards = plan_shards(str(path), shard_size=32)
+    assert shards[0].start == 0
+    assert shards[-1].end == path.stat().st_size
+    assert all(a.end == b.start for a, b in zip(shards[:-1], shards[1:], strict=True))
+    assert [line for shard in shards for line in read_shard_lines(shard)] == lines
+
+
+def test_plan_shards_empty_file(tmp_path):
+    path = tmp_path / "empty.log"
+    path.write_bytes(b"")
+    assert plan_shards(str(path)) == []
+
+
+def test_converting_a_rewritten_path_reads_the_new_file(tmp_path):
+    source = tmp_path / "input.log"
+    output = tmp_path / "out.cef"
+    argv = ["--input", str(source), "--output", str(output), "--mmap"]
+    source.write_text("<13>Jan 1 00:00:00 h app: one\n", encoding="utf-8")
+    assert cli.main(argv) == 0
+    source.write_text("<13>Jan 1 00:00:00 h app: two\n<13>Jan 1 00:00:00 h app: three\n")
+    assert cli.main(argv) == 0
+    records = output.read_text(encoding="utf-8").splitlines()
+    assert [record.split("msg=")[1] for record in records] == ["two", "three"]
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from syslogcef import cli
+from syslogcef.converters import BatchConverter
+from syslogcef.mappings.base import MappingResult
+from syslogcef.suppress import Suppressor
+from syslogcef.utils import ParsedEvent
+
+DATA = Path(__file__).parent / "data"
+RESULT = MappingResult("LINK-3-UPDOWN", "link state", 5, {})
+
+
+def _event(message: str, host: str = "sw1", timestamp: datetime | None = None) -> ParsedEvent:
+    return ParsedEvent(
+        timestamp=timestamp, host=host, app_name="ios", priority=None, message=message
+    )
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_suppressor_counts_template_repeats_per_window():
+    clock = FakeClock()
+    suppressor = Suppressor(10.0, clock=clock)
+    assert suppressor.offer(_event("Gi0/1 down after 3 flaps"), RESULT)
+    assert not suppressor.offer(_event("Gi0/1 down after 4 flaps"), RESULT)
+    last = _event("Gi0/1 down after 5 flaps")
+    assert not suppressor.offer(last, RESULT)
+    assert suppressor.offer(_event("Gi0/1 down after 5 flaps", host="sw2"), RESULT)
+    assert suppressor.expire() == []
+    clock.now = 10.0
+    assert suppressor.expire() == [(last, RESULT, 2)]
+    # the window closed, so the next repeat is forwarded again
+    assert suppressor.offer(_event("Gi0/1 down after 6 flaps"), RESULT)
+    assert suppressor.stats.suppressed == 2 and suppressor.stats.summaries == 1
+
+
+def test_suppressor_exact_keys_and_key_limit():
+    exact = Suppressor(10.0, exact=True, clock=FakeClock())
+    assert exact.offer(_event("retry 1"), RESULT)
+    assert exact.offer(_event("retry 2"), RESULT)
+
+    bounded = Suppressor(10.0, max_keys=2, clock=FakeClock())
+    for host in ("a", "a", "b", "c"):
+        bounded.offer(_event("x", host=host), RESULT)
+    # "a" was closed early to make room for "c"; its repeat is summarised
+    assert [count for _, _, count in bounded.expire()] == [1]
+    assert bounded.stats.evicted == 1
+    assert bounded.drain() == []
+
+
+def test_suppressor_event_time_windows():
+    start = datetime(2024, 5, 1, tzinfo=timezone.utc)
+    suppressor = Suppressor(60.0, clock=FakeClock(), event_time=True)
+    assert suppressor.offer(_event("flap 1", timestamp=start), RESULT)
+    repeat = _event("flap 2", timestamp=start + timedelta(seconds=30))
+    assert not suppressor.offer(repeat, RESULT)
+    assert suppressor.expire() == []
+    # logged hours later: a new window, however fast the file is replayed
+    assert suppressor.offer(_event("flap 3", timestamp=start + timedelta(hours=2)), RESULT)
+    assert suppressor.expire() == [(repeat, RESULT, 1)]
+    # no timestamp: the clock (epoch 0 here) stands in
+    assert suppressor.offer(_event("other"), RESULT)
+
+
+def test_batch_converter_emits_cnt_summaries():
+    lines = (DATA / "cisco-ios.log").read_text(encoding="utf-8").splitlines()
+    plain = BatchConverter("cisco").convert(lines)
+    converter = BatchConverter("cisco", suppressor=Suppressor(3600.0))
+    first = converter.convert(lines)
+    summaries = converter.release_suppressed(final=True)
+    assert summaries and len(first.records) + len(summaries) < len(plain.records)
+    counts = [int(record.rsplit("cnt=", 1)[1].split(" ", 1)[0]) for record in summaries]
+    assert len(first.records) + sum(counts) == len(plain.records)
+    assert set(first.records) <= set(plain.records)
+
+
+def test_cli_suppress_window(tmp_path, capsys):
+    line = "<187>Oct 11 22:14:15 sw1 ios: %LINK-3-UPDOWN: Interface Gi0/{}, changed state to down\n"
+    source = tmp_path / "flap.log"
+    source.write_text("".join(line.format(n % 3) for n in range(50)), encoding="utf-8")
+    exit_code = cli.main(
+        ["--input", str(source), "--source", "cisco", "--suppress-window", "60", "--stats"]
+    )
+    assert exit_code == 0
+    captured = capsys.readouterr()
+    records = captured.out.splitlines()
+    assert len(records) == 2
+    assert "cnt=" not in records[0] and "cnt=49" in records[1]
+    assert "suppression suppressed=49 summaries=1" in captured.err
+
+
+def test_cli_suppress_window_uses_event_time_for_files(tmp_path, capsys):
+    line = "<187>Oct 11 {}:14:15 sw1 ios: %LINK-3-UPDOWN: Interface Gi0/1, changed state to down\n"
+    source = tmp_path / "day.log"
+    source.write_text("".join(line.format(f"{hour:02d}") for hour in (1, 1, 5, 9)))
+    argv = ["--input", str(source), "--source", "cisco", "--suppress-window", "60", "--stats"]
+    assert cli.main(argv) == 0
+    captured = capsys.readouterr()
+    assert len(captured.out.splitlines()) == 4
+    assert "suppression suppressed=1 summaries=1" in captured.err
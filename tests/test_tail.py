@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import os
+
+import pytest
+
+from syslogcef.tail import FileTailer
+
+
+def _until_idle(batches):
+    lines = []
+    for batch in batches:
+        if not batch:
+            return lines
+        lines.extend(batch)
+    raise AssertionError("tailer stopped")
+
+
+@pytest.mark.parametrize("use_inotify", [True, False])
+def test_tailer_follows_appends_rotation_and_truncation(tmp_path, use_inotify):
+    path = tmp_path / "app.log"
+    path.write_text("one\ntwo\n", encoding="utf-8")
+    tailer = FileTailer(str(path), batch_size=10, poll_interval=0.01, use_inotify=use_inotify)
+    batches = tailer.batches()
+    assert _until_idle(batches) == ["one", "two"]
+
+    with path.open("a", encoding="utf-8") as handle:
+        handle.write("thr")
+        handle.flush()
+        handle.write("ee\n")
+    assert _until_idle(batches) == ["three"]
+
+    with path.open("a", encoding="utf-8") as handle:
+        handle.write("last of old\n")
+    os.rename(path, tmp_path / "app.log.1")
+    path.write_text("fresh\n", encoding="utf-8")
+    assert _until_idle(batches) == ["last of old", "fresh"]
+
+    path.write_text("", encoding="utf-8")
+    path.write_text("x\n", encoding="utf-8")
+    assert _until_idle(batches) == ["x"]
+    batches.close()
+
+
+def test_tailer_checkpoint_resumes_after_restart(tmp_path):
+    path = tmp_path / "app.log"
+    checkpoint = str(tmp_path / "app.offset")
+    path.write_text("a\nb\nc\n", encoding="utf-8")
+    tailer = FileTailer(str(path), batch_size=2, checkpoint=checkpoint, poll_interval=0.01)
+    batches = tailer.batches()
+    first = next(batches)
+    assert first == ["a", "b"]
+    tailer.commit(first)
+    batches.close()
+
+    with path.open("a", encoding="utf-8") as handle:
+        handle.write("d\n")
+    restarted = FileTailer(str(path), batch_size=10, checkpoint=checkpoint, poll_interval=0.01)
+    assert _until_idle(restarted.batches()) == ["c", "d"]
+
+
+def test_tailer_checkpoint_drains_file_rotated_while_down(tmp_path):
+    path = tmp_path / "app.log"
+    checkpoint = str(tmp_path / "app.offset")
+    path.write_text("a\nb\n", encoding="utf-8")
+    tailer = FileTailer(str(path), batch_size=1, checkpoint=checkpoint, poll_interval=0.01)
+    batches = tailer.batches()
+    tailer.commit(next(batches))
+    batches.close()
+
+    os.rename(path, tmp_path / "app.log.1")
+    path.write_text("new\n", encoding="utf-8")
+    restarted = FileTailer(str(path), batch_size=10, checkpoint=checkpoint, poll_interval=0.01)
+    assert _until_idle(restarted.batches()) == ["b", "new"]